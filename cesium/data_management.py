@@ -1,21 +1,31 @@
+import functools
+import io
+import itertools
+import multiprocessing
+from multiprocessing import cpu_count
 import os
+import tarfile
+import warnings
+import zipfile
 import numpy as np
 import pandas as pd
 from . import util
 from . import time_series
+from .store import TimeSeriesStore
 from .time_series import TimeSeries
 
 
-__all__ = ['parse_ts_data', 'parse_headerfile', 'parse_and_store_ts_data']
+__all__ = ['parse_ts_data', 'parse_ts_files', 'iter_time_series',
+           'parse_headerfile', 'parse_and_store_ts_data']
 
 
 # TODO more robust error handling
 def parse_ts_data(filepath, sep=","):
-    """Parses raw time series data file and returns an (n, 3) array of values.
+    """Parses raw time series data file and returns a (3, n) array of values.
 
     Data is expected as text in tabular format with separator `sep`. The output
-    will always have three columns (time, measurement, error), even if the data
-    file contains two or fewer:
+    will always have three rows (time, measurement, error), even if the data
+    file contains two or fewer columns:
 
     - For data containing three columns (time, measurement, error), all
       three are returned.
@@ -24,34 +34,268 @@ def parse_ts_data(filepath, sep=","):
     - For data containing one column, a time column is also added with
       values evenly spaced from 0 to `time_series.DEFAULT_MAX_TIME`.
 
+    Lines starting with '#' and blank lines are skipped, and any columns
+    after the third are ignored.
+
     Parameters
     ----------
-    filename : str
+    filename : str or file-like
         Path to raw time series data to be parsed.
     sep : str, optional
-        Separator of columns in data file; defaults to ','.
+        Separator of columns in data file; defaults to ','. If None, columns
+        are separated by any whitespace.
 
     Returns
     -------
     np.ndarray
-        3-column array of (time, measurement, error) values.
+        (3, n) array of (time, measurement, error) values.
     """
-    ts_data = np.loadtxt(filepath, delimiter=sep, ndmin=2)
-    ts_data = ts_data[:, :3]  # Only using T, M, E
-    if ts_data.shape[0] == 0 or ts_data.shape[1] == 0:
+    ts_data = _read_columns(filepath, sep)[:3]
+    n_columns, n_values = ts_data.shape
+    if n_values == 0 or n_columns == 0:
         raise ValueError("Incomplete or improperly formatted time series data"
                          " file provided.")
-    elif ts_data.shape[1] == 1:
-        ts_data = np.c_[np.linspace(0, time_series.DEFAULT_MAX_TIME,
-                                    len(ts_data)),
-                        ts_data,
-                        np.repeat(time_series.DEFAULT_ERROR_VALUE,
-                                  len(ts_data))]
-    elif ts_data.shape[1] == 2:
-        ts_data = np.c_[ts_data,
-                        np.repeat(time_series.DEFAULT_ERROR_VALUE,
-                                  len(ts_data))]
-    return ts_data.T
+    elif n_columns == 3 and ts_data.flags['C_CONTIGUOUS']:
+        return ts_data
+
+    # Columns are copied once into the rows of the output
+    padded = np.empty((3, n_values))
+    if n_columns == 1:
+        padded[0] = np.linspace(0, time_series.DEFAULT_MAX_TIME, n_values)
+        padded[1] = ts_data[0]
+    else:
+        padded[:n_columns] = ts_data
+    if n_columns < 3:
+        padded[2] = time_series.DEFAULT_ERROR_VALUE
+    return padded
+
+
+def _check_fields(text, sep):
+    """Check that every line of a text table (other than comments and blank
+    lines) has the same number of non-empty fields; returns the number of
+    lines with values.
+    """
+    n_lines = 0
+    n_columns = None
+    for line in text.splitlines():
+        line = line.split(b'#', 1)[0]
+        if not line.strip():
+            continue
+        fields = line.split() if sep is None else line.split(sep)
+        if n_columns is None:
+            n_columns = len(fields)
+        if len(fields) != n_columns or not all(f.strip() for f in fields):
+            raise ValueError("Incomplete or improperly formatted time series "
+                             "data file provided.")
+        n_lines += 1
+    return n_lines
+
+
+_OTHER_BYTES = {}
+
+
+def _other_bytes(sep):
+    """All bytes other than `sep` and newlines (for `bytes.translate`)."""
+    if sep not in _OTHER_BYTES:
+        _OTHER_BYTES[sep] = bytes(bytearray(
+            c for c in range(256) if c not in (ord(sep), ord(b'\n'))))
+    return _OTHER_BYTES[sep]
+
+
+def _line_width(text, lines, sep):
+    """Number of values on every line of a text table, or None if some lines
+    have a different number of values.
+
+    For a single-byte separator, the separators and newlines of the text are
+    compared with those of a table of the width of the first line, which is
+    much cheaper than counting the separators of each line.
+    """
+    if not lines:
+        return None
+    if sep is None:
+        widths = {len(line.split()) for line in lines}
+        return widths.pop() if len(widths) == 1 else None
+    n_columns = lines[0].count(sep) + 1
+    if len(sep) == 1:
+        delimiters = text.translate(None, _other_bytes(sep))
+        if not text.endswith(b'\n'):
+            delimiters += b'\n'
+        if delimiters != (sep * (n_columns - 1) + b'\n') * len(lines):
+            return None
+    elif any(line.count(sep) != n_columns - 1 for line in lines):
+        return None
+    return n_columns
+
+
+def _read_columns(filepath, sep):
+    """Read the columns of a text table of numbers as the rows of an array.
+
+    Tables with the same number of values on every line and no comments or
+    blank lines are parsed by `np.fromstring` in a single pass over the text;
+    other tables, and any that fail to parse this way, are checked line by
+    line and read with the C parser of `pd.read_csv`. Lines with a different
+    number of values than the others, or with empty values, raise a
+    `ValueError`.
+    """
+    if hasattr(filepath, 'read'):
+        text = filepath.read()
+    else:
+        with open(filepath, 'rb') as f:
+            text = f.read()
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    if sep is not None:
+        sep = sep.encode('utf-8')
+
+    lines = text.splitlines()
+    n_columns = _line_width(text, lines, sep) if b'#' not in text else None
+    if n_columns:
+        if sep is not None and (b' ' in text or b'\t' in text):
+            # Values consisting of whitespace are parsed as -1 by
+            # `np.fromstring` (other empty values end the parsing early)
+            _check_fields(text, sep)
+        joined = b' '.join(lines) if sep is None else sep.join(lines)
+        try:
+            with warnings.catch_warnings():
+                # Unparsed text is reported by a warning in recent versions
+                warnings.simplefilter('ignore')
+                values = np.fromstring(joined, sep=' ' if sep is None
+                                       else sep.decode('utf-8'))
+        except ValueError:
+            values = None
+        if values is not None and len(values) == len(lines) * n_columns:
+            return values.reshape(len(lines), n_columns).T
+
+    if _check_fields(text, sep) == 0:
+        return np.empty((0, 0))
+    # Columns of a float DataFrame are stored as the rows of a single array,
+    # so the transpose of `values` is a view with one contiguous row per column
+    return pd.read_csv(io.BytesIO(text), sep=r'\s+' if sep is None
+                       else sep.decode('utf-8'),
+                       header=None, comment='#', dtype='float64',
+                       engine='c', float_precision='high').values.T
+
+
+def parse_ts_files(filepaths, sep=",", n_workers=None, chunksize=None):
+    """Parses many raw time series data files in parallel.
+
+    Files are parsed by `parse_ts_data` in a pool of worker processes, which
+    receive batches of `chunksize` paths and return the parsed values.
+
+    Parameters
+    ----------
+    filepaths : list of str
+        Paths to raw time series data to be parsed.
+    sep : str, optional
+        Separator of columns in data files; defaults to ','.
+    n_workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs; if 1 or
+        fewer, files are parsed in the calling process.
+    chunksize : int, optional
+        Number of files sent to a worker at a time. Defaults to splitting the
+        files into four batches per worker.
+
+    Returns
+    -------
+    list of np.ndarray
+        (3, n) arrays of (time, measurement, error) values of each file.
+    """
+    filepaths = list(filepaths)
+    if n_workers is None:
+        n_workers = cpu_count()
+    n_workers = min(n_workers, len(filepaths))
+    if n_workers <= 1:
+        return [parse_ts_data(path, sep) for path in filepaths]
+    if chunksize is None:
+        chunksize = -(-len(filepaths) // (4 * n_workers))
+    pool = multiprocessing.Pool(n_workers)
+    try:
+        return pool.map(functools.partial(parse_ts_data, sep=sep), filepaths,
+                        chunksize=chunksize)
+    finally:
+        pool.terminate()
+
+
+def _parse_member(member, sep=","):
+    """Parse the contents of a file from an archive (see `iter_archive`)."""
+    name, data = member
+    return util.shorten_fname(name), parse_ts_data(io.BytesIO(data), sep)
+
+
+def iter_time_series(data_path, header_path=None, sep=",", n_workers=1,
+                     batch_size=None):
+    """Parses raw time series data from a single file or archive without
+    extracting it to disk, yielding one `TimeSeries` per file.
+
+    Archive members are read one at a time (see `util.iter_archive`) and
+    parsed in memory. If `n_workers` is greater than 1, members are read in
+    batches of `batch_size` files, which are parsed in a pool of worker
+    processes, so that at most one batch is held in memory at a time.
+
+    Parameters
+    ----------
+    data_path : str
+        Path to an individual time series file or archive of multiple time
+        series files.
+    header_path : str, optional
+        Path to header file containing file names, labels/targets, and
+        meta_features.
+    sep : str, optional
+        Separator of columns in data files; defaults to ','.
+    n_workers : int, optional
+        Number of worker processes used for parsing; defaults to 1 (parse in
+        the calling process). If None, the number of CPUs is used.
+    batch_size : int, optional
+        Number of files parsed by the workers at a time; defaults to 16 per
+        worker.
+
+    Yields
+    ------
+    TimeSeries
+        Time series of each file, named after the file (without extension)
+        and with label and metafeatures from the header file.
+    """
+    if header_path:
+        labels, meta_features = parse_headerfile(header_path)
+        labels = labels.to_dict()
+        records = (meta_features.to_dict('records')
+                   if len(meta_features.columns) > 0
+                   else [{}] * len(meta_features))
+        meta_features = dict(zip(meta_features.index, records))
+    members = util.iter_archive(data_path)
+    if n_workers is None:
+        n_workers = cpu_count()
+    if n_workers <= 1:
+        parsed = (_parse_member(member, sep) for member in members)
+    else:
+        parsed = _parse_members_parallel(members, sep, n_workers,
+                                         batch_size or 16 * n_workers)
+
+    for fname, (t, m, e) in parsed:
+        if header_path:
+            if fname not in labels:
+                raise ValueError("Incomplete header file: no entry for time "
+                                 "series file {}.".format(fname))
+            yield TimeSeries(t, m, e, labels[fname], meta_features[fname],
+                             fname)
+        else:
+            yield TimeSeries(t, m, e, name=fname)
+
+
+def _parse_members_parallel(members, sep, n_workers, batch_size):
+    """Parse archive members in batches in a pool of worker processes."""
+    parse = functools.partial(_parse_member, sep=sep)
+    pool = multiprocessing.Pool(n_workers)
+    try:
+        while True:
+            batch = list(itertools.islice(members, batch_size))
+            if not batch:
+                break
+            for result in pool.map(parse, batch,
+                                   chunksize=-(-len(batch) // n_workers)):
+                yield result
+    finally:
+        pool.terminate()
 
 
 def parse_headerfile(headerfile_path, files_to_include=None):
@@ -96,24 +340,30 @@ def parse_headerfile(headerfile_path, files_to_include=None):
     header.rename(columns={c: 'label' for c in ['label', 'target', 'class',
                                                 'class_label']}, inplace=True)
     labels = (header.label if 'label' in header
-              else pd.Series([None], index=header.index))
+              else pd.Series([None] * len(header), index=header.index))
     feature_data = header.drop(['label', 'class'], axis=1, errors='ignore')
     return labels, feature_data
 
 
 def parse_and_store_ts_data(data_path, output_dir, header_path=None,
-                            cleanup_archive=True, cleanup_header=True, sep=','):
+                            cleanup_archive=True, cleanup_header=True, sep=',',
+                            n_workers=1, store=False):
     """Parses raw time series data from a single file or archive and loads
     metadata from header file (if applicable). Data is stored as files within
     `output_dir`, and the list of these paths is returned.
 
+    Labels and metafeatures are looked up in the header for all files at
+    once, and files are parsed (and saved) in a pool of `n_workers` worker
+    processes.
+
     Parameters
     ----------
     data_path : str
         Path to an individual time series file or tarball of multiple time
         series files to be used for feature generation.
     output_dir : str
-        Directory in which time series files will be saved.
+        Directory in which time series files will be saved, or path of the
+        time series store if `store` is True.
     header_path : str, optional
         Path to header file containing file names, labels/targets, and
         meta_features.
@@ -125,34 +375,80 @@ def parse_and_store_ts_data(data_path, output_dir, header_path=None,
         to True).
     sep : str, optional
         Separator of columns in data file; defaults to ','.
+    n_workers : int, optional
+        Number of worker processes used for parsing; defaults to 1 (parse in
+        the calling process). If None, the number of CPUs is used.
+    store : bool, optional
+        If True, all time series are appended to a single
+        `cesium.store.TimeSeriesStore` at `output_dir` (which is created if
+        it does not exist) instead of being saved as separate files, and
+        archives are read without being extracted (see `iter_time_series`).
+        Defaults to False.
 
     Returns
     -------
-    List of paths to time series files
+    List of paths to time series files, or if `store` is True, pd.Series of
+    the positions of the added time series in the store, indexed by name
     """
-    with util.extract_time_series(data_path, cleanup_archive=cleanup_archive,
-                                  cleanup_files=True) as ts_paths:
-        short_fnames = [util.shorten_fname(f) for f in ts_paths]
-        if header_path:
-            labels, meta_features = parse_headerfile(header_path, ts_paths)
-        else:
-            labels = pd.Series([None], index=short_fnames)
-            meta_features = pd.DataFrame(index=short_fnames)
-
-        all_time_series = []
-        for ts_path in ts_paths:
-            fname = util.shorten_fname(ts_path)
-            t, m, e = parse_ts_data(ts_path, sep)
-            ts_label = labels.loc[fname]
-            ts_meta_features = meta_features.loc[fname]
-            ts_path = '{}.npz'.format(fname)
-            ts_path = os.path.join(output_dir, ts_path)
-            ts = TimeSeries(t, m, e, ts_label, ts_meta_features, fname,
-                            ts_path)
-            ts.save(ts_path)
-            all_time_series.append(ts_path)
+    if n_workers is None:
+        n_workers = cpu_count()
+
+    if store:
+        with TimeSeriesStore(output_dir, 'a') as ts_store:
+            n_stored = len(ts_store)
+            ts_store.extend(iter_time_series(data_path, header_path, sep,
+                                             n_workers))
+            names = ts_store.collection().names[n_stored:]
+            result = pd.Series(np.arange(n_stored, len(ts_store)),
+                               index=names)
+        # As for extracted files, a single (non-archive) data file is always
+        # removed once it has been stored
+        if cleanup_archive or not (tarfile.is_tarfile(data_path) or
+                                   zipfile.is_zipfile(data_path)):
+            util.remove_files(data_path)
+    else:
+        with util.extract_time_series(data_path,
+                                      cleanup_archive=cleanup_archive,
+                                      cleanup_files=True) as ts_paths:
+            short_fnames = [util.shorten_fname(f) for f in ts_paths]
+            if header_path:
+                labels, meta_features = parse_headerfile(header_path,
+                                                         ts_paths)
+                labels = list(labels)
+                meta_features = (meta_features.to_dict('records')
+                                 if len(meta_features.columns) > 0
+                                 else [{}] * len(short_fnames))
+            else:
+                labels = [None] * len(short_fnames)
+                meta_features = [{}] * len(short_fnames)
+            output_paths = [os.path.join(output_dir, '{}.npz'.format(fname))
+                            for fname in short_fnames]
+            args = list(zip(ts_paths, labels, meta_features, short_fnames,
+                            output_paths))
+
+            parse = functools.partial(_parse_and_save, sep=sep)
+            n_workers = min(n_workers, len(args))
+            if n_workers <= 1:
+                result = [parse(arg) for arg in args]
+            else:
+                pool = multiprocessing.Pool(n_workers)
+                try:
+                    result = pool.map(parse, args, chunksize=-(
+                        -len(args) // (4 * n_workers)))
+                finally:
+                    pool.terminate()
 
     if header_path and cleanup_header:
         util.remove_files([header_path])
 
-    return all_time_series
+    return result
+
+
+def _parse_and_save(args, sep=','):
+    """Parse a time series data file and save it with its label and
+    metafeatures (see `parse_and_store_ts_data`), returning the saved path."""
+    ts_path, label, meta_features, name, output_path = args
+    t, m, e = parse_ts_data(ts_path, sep)
+    TimeSeries(t, m, e, label, meta_features, name, output_path).save(
+        output_path)
+    return output_path
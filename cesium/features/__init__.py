@@ -1,3 +1,5 @@
 from .graphs import (CADENCE_FEATS, GENERAL_FEATS, LOMB_SCARGLE_FEATS,
                      generate_dask_graph, feature_categories,
-                     dask_feature_graph, feature_tags)
+                     dask_feature_graph, feature_tags, feature_registry,
+                     register_feature)
+from .registry import Cost, FeatureSpec, FeatureRegistry
@@ -28,10 +28,12 @@ def minimum(x):
     return np.min(x)
 
 
-def percent_beyond_1_std(x, e):
+def percent_beyond_1_std(x, e, moments=None):
     """Percentage of values more than 1 std. dev. from the weighted average."""
-    dists_from_mu = x - weighted_average(x, e)
-    return np.mean(np.abs(dists_from_mu) > weighted_std_dev(x, e))
+    if moments is None:
+        moments = compute_moments(x, e)
+    dists_from_mu = x - moments['weighted_mean']
+    return np.mean(np.abs(dists_from_mu) > get_weighted_std_dev(moments))
 
 
 def percent_close_to_median(x, window_frac=0.1):
@@ -69,5 +71,117 @@ def weighted_average_std_err(x, e):
 
 def weighted_std_dev(x, e):
     """Standard deviation of observed values, weighted by measurement errors."""
-    return np.sqrt(np.average((x - weighted_average(x, e))**2,
-                              weights=1. / (e**2)))
+    w = 1. / (e**2)
+    return np.sqrt(np.average((x - np.average(x, weights=w))**2, weights=w))
+
+
+def compute_moments(x, e):
+    """Compute first through third moments of the observed values and errors.
+
+    Unweighted moments of `x` and `e` and inverse-variance weighted moments of
+    `x` are all computed from a single set of deviations, so that features
+    derived from them (see the `get_*` functions below) do not each make
+    separate passes over the data. Moments are stored in a centered form
+    (count, mean and sums of powers of deviations from the mean) which can be
+    combined across chunks of data using `merge_moments`.
+
+    Returns
+    -------
+    dict
+        Dictionary of accumulated moments.
+    """
+    x = np.asarray(x, dtype='float64')
+    e = np.asarray(e, dtype='float64')
+    n = len(x)
+    if n == 0:
+        return {'n': 0, 'mean': 0., 'M2': 0., 'M3': 0., 'weight_sum': 0.,
+                'weighted_mean': 0., 'weighted_M2': 0., 'err_mean': 0.,
+                'err_M2': 0.}
+    w = 1. / (e**2)
+
+    mean = x.sum() / n
+    dx = x - mean
+    dx2 = dx * dx
+    weight_sum = w.sum()
+    weighted_mean = np.dot(w, x) / weight_sum
+    dwx = x - weighted_mean
+    err_mean = e.sum() / n
+    de = e - err_mean
+
+    return {'n': n, 'mean': mean, 'M2': dx2.sum(), 'M3': np.dot(dx2, dx),
+            'weight_sum': weight_sum, 'weighted_mean': weighted_mean,
+            'weighted_M2': np.dot(w, dwx * dwx),
+            'err_mean': err_mean, 'err_M2': np.dot(de, de)}
+
+
+def merge_moments(a, b):
+    """Combine moments computed by `compute_moments` on two chunks of data.
+
+    Uses the pairwise update formulas of Chan et al. (1979) and Pebay (2008),
+    so the result matches moments computed over the concatenated data.
+    """
+    if a['n'] == 0:
+        return dict(b)
+    if b['n'] == 0:
+        return dict(a)
+
+    na, nb = float(a['n']), float(b['n'])
+    n = na + nb
+    delta = b['mean'] - a['mean']
+    M2 = a['M2'] + b['M2'] + delta**2 * na * nb / n
+    M3 = (a['M3'] + b['M3'] + delta**3 * na * nb * (na - nb) / n**2 +
+          3. * delta * (na * b['M2'] - nb * a['M2']) / n)
+
+    wa, wb = a['weight_sum'], b['weight_sum']
+    weight_sum = wa + wb
+    wdelta = b['weighted_mean'] - a['weighted_mean']
+    weighted_M2 = (a['weighted_M2'] + b['weighted_M2'] +
+                   wdelta**2 * wa * wb / weight_sum)
+
+    edelta = b['err_mean'] - a['err_mean']
+    err_M2 = a['err_M2'] + b['err_M2'] + edelta**2 * na * nb / n
+
+    return {'n': a['n'] + b['n'], 'mean': a['mean'] + delta * nb / n,
+            'M2': M2, 'M3': M3, 'weight_sum': weight_sum,
+            'weighted_mean': a['weighted_mean'] + wdelta * wb / weight_sum,
+            'weighted_M2': weighted_M2,
+            'err_mean': a['err_mean'] + edelta * nb / n, 'err_M2': err_M2}
+
+
+def get_mean(moments):
+    """Mean of observed values."""
+    return moments['mean']
+
+
+def get_std(moments):
+    """Standard deviation of observed values."""
+    return np.sqrt(moments['M2'] / moments['n'])
+
+
+def get_skew(moments):
+    """Skewness of a dataset. Approximately 0 for Gaussian data; undefined
+    (`np.nan`) for constant data, as for `scipy.stats.skew`."""
+    if moments['M2'] == 0:
+        return np.nan
+    n = moments['n']
+    return np.sqrt(n) * moments['M3'] / moments['M2']**1.5
+
+
+def get_weighted_average(moments):
+    """Arithmetic mean of observed values, weighted by measurement errors."""
+    return moments['weighted_mean']
+
+
+def get_weighted_std_dev(moments):
+    """Standard deviation of observed values, weighted by measurement errors."""
+    return np.sqrt(moments['weighted_M2'] / moments['weight_sum'])
+
+
+def get_avg_err(moments):
+    """Mean of the error estimates."""
+    return moments['err_mean']
+
+
+def get_std_err(moments):
+    """Standard deviation of the error estimates."""
+    return np.sqrt(moments['err_M2'] / moments['n'])
@@ -1,4 +1,6 @@
+import re
 import numpy as np
+from dask.core import get_dependencies, istask
 
 from .cadence_features import (cad_prob, delta_t_hist, double_to_single_step,
                                normalize_hist, find_sorted_peaks, peak_bin,
@@ -7,15 +9,18 @@ from .cadence_features import (cad_prob, delta_t_hist, double_to_single_step,
 from .common_functions import (maximum, median, max_slope,
                                median_absolute_deviation, minimum,
                                percent_beyond_1_std, percent_close_to_median,
-                               skew, std, weighted_average)
+                               compute_moments, get_mean, get_std, get_skew,
+                               get_weighted_average, get_avg_err, get_std_err)
 from .amplitude import (amplitude, percent_amplitude, flux_percentile_ratio,
                         percent_difference_flux_percentile)
-from .qso_model import (qso_fit, get_qso_log_chi2_qsonu,
-                        get_qso_log_chi2nuNULL_chi2nu)
-from .stetson import (stetson_j, stetson_k)
-
-from .lomb_scargle import (lomb_scargle_model, get_lomb_frequency,
-                           get_lomb_amplitude, get_lomb_rel_phase,
+from .qso_model import (qso_fit, qso_fit_batch, get_qso_log_chi2_qsonu,
+                        get_qso_log_chi2nuNULL_chi2nu, qso_drw_fit,
+                        qso_drw_fit_batch, get_qso_tau, get_qso_sigma)
+from .stetson import (stetson_mean, stetson_mean_batch, stetson_j, stetson_k)
+
+from .lomb_scargle import (lomb_scargle_model, lomb_scargle_model_first_freq,
+                           get_lomb_frequency, get_lomb_amplitude,
+                           get_lomb_rel_phase,
                            get_lomb_amplitude_ratio, get_lomb_frequency_ratio,
                            get_lomb_signif_ratio, get_lomb_lambda,
                            get_lomb_signif, get_lomb_varrat, get_lomb_trend,
@@ -24,16 +29,19 @@ from .lomb_scargle_fast import lomb_scargle_fast_period
 from .num_alias import num_alias
 from .periodic_model import (periodic_model, get_max_delta_mags,
                              get_min_delta_mags, get_model_phi1_phi2)
-from .period_folding import (period_folding, get_fold2P_slope_percentile,
+from .period_folding import (folded_lightcurve, period_folding,
+                             get_fold2P_slope_percentile,
                              get_medperc90_2p_p, p2p_model,
                              get_p2p_scatter_2praw, get_p2p_scatter_over_mad,
                              get_p2p_scatter_pfold_over_mad,
                              get_p2p_ssqr_diff_over_var)
 from .scatter_res_raw import scatter_res_raw
+from .registry import Cost, FeatureRegistry
 
 
 __all__ = ['CADENCE_FEATS', 'GENERAL_FEATS', 'LOMB_SCARGLE_FEATS',
-           'generate_dask_graph', 'feature_categories', 'dask_feature_graph']
+           'generate_dask_graph', 'feature_categories', 'dask_feature_graph',
+           'feature_registry', 'register_feature']
 
 feature_categories = {
     'Cadence/Error': [
@@ -63,7 +71,8 @@ feature_categories = {
         'minimum', 'percent_amplitude', 'percent_beyond_1_std',
         'percent_close_to_median',
         'percent_difference_flux_percentile', 'period_fast',
-        'qso_log_chi2_qsonu', 'qso_log_chi2nuNULL_chi2nu', 'skew',
+        'qso_log_chi2_qsonu', 'qso_log_chi2nuNULL_chi2nu', 'qso_sigma',
+        'qso_tau', 'skew',
         'std', 'stetson_j', 'stetson_k', 'weighted_average'
         ],
 
@@ -95,18 +104,82 @@ GENERAL_FEATS = feature_categories['General']
 LOMB_SCARGLE_FEATS = feature_categories['Lomb-Scargle (Periodic)']
 
 
-# See http://dask.pydata.org/en/latest/custom-graphs.html
+# See http://dask.pydata.org/en/latest/custom-graphs.html; each feature is a
+# dask task `(func, *args)`, registered along with tags, an estimate of its
+# run time and (where available) a batched variant.
+
+ASTRONOMY_GENERAL = ['Astronomy', 'General']
+ASTRONOMY_CADENCE = ['Astronomy', 'General', 'Cadence']
+ASTRONOMY_ERROR = ['Astronomy', 'Error', 'General']
+ASTRONOMY_PERIODIC = ['Astronomy', 'Periodic', 'Lomb-Scargle']
+
+extra_feature_docs = {
+    'n_epochs': 'Total number of observed values.',
+    'avg_err': 'Mean of the error estimates.',
+    'med_err': 'Median of error estimates.',
+    'std_err': 'Standard deviation of the error estimates.',
+    'total_time': 'Absolute difference between max and min of time values.',
+    'avgt': 'Mean of the time values.',
+    'mean': 'Mean of observed values.',
+    'cads': 'List of differences between successive time values (`np.diff(t)`).',
+    'cads_std': 'Standard deviation of `cads` (discrete difference between times).',
+    'cads_avg': 'Mean value of `cads` (discrete difference between times).',
+    'cads_med': 'Median value of `cads` (discrete difference between times).',
+    'avg_double_to_single_step':
+    'Mean value of ratios (t[i+2] - t[i]) / (t[i+2] - t[i+1]).',
+    'med_double_to_single_step':
+    'Median value of ratios (t[i+2] - t[i]) / (t[i+2] - t[i+1]).',
+    'std_double_to_single_step':
+    'Standard deviation of ratios (t[i+2] - t[i]) / (t[i+2] - t[i+1]).',
+    'all_times_nhist_numpeaks':
+    'Number of peaks (local maxima) in histogram of all possible delta_t\'s.',
+    'all_times_nhist_peak_val':
+    'Peak value in histogram of all possible delta_t\'s.'
+}
+
+
+feature_registry = FeatureRegistry()
+register_feature = feature_registry.register
+dask_feature_graph = feature_registry.graph
+feature_tags = feature_registry.tags
 
-dask_feature_graph = {
+feature_registry.register_graph({
     'n_epochs': (len, 't'),
-    'avg_err': (np.mean, 'e'),
-    'med_err': (np.median, 'e'),
-    'std_err': (np.std, 'e'),
-    'total_time': (lambda x: np.max(x) - np.min(x), 't'),
+    '_moments': (compute_moments, 'm', 'e'),
+    'total_time': (np.ptp, 't'),
     'avgt': (np.mean, 't'),
+    'mean': (get_mean, '_moments'),
+
+    # Standalone features (disconnected nodes)
+    'amplitude': (amplitude, 'm'),
+    'maximum': (maximum, 'm'),
+    'max_slope': (max_slope, 't', 'm'),
+    'median': (median, 'm'),
+    'median_absolute_deviation': (median_absolute_deviation, 'm'),
+    'minimum': (minimum, 'm'),
+    'percent_amplitude': (percent_amplitude, 'm'),
+    'percent_beyond_1_std': (percent_beyond_1_std, 'm', 'e', '_moments'),
+    'percent_close_to_median': (percent_close_to_median, 'm'),
+    'percent_difference_flux_percentile': (
+        percent_difference_flux_percentile, 'm'),
+    'skew': (get_skew, '_moments'),
+    'std': (get_std, '_moments'),
+    'stetson_j': (stetson_j, 'm', [], 0.1, 0.1, '_stetson_mean'),
+    'stetson_k': (stetson_k, 'm', 0.1, '_stetson_mean'),
+    'weighted_average': (get_weighted_average, '_moments')
+}, docs=extra_feature_docs, tags=ASTRONOMY_GENERAL)
+register_feature('_stetson_mean', stetson_mean, 'm', tags=ASTRONOMY_GENERAL,
+                 cost=Cost(5e-4, 3e-4), batch_func=stetson_mean_batch)
+
+feature_registry.register_graph({
+    'avg_err': (get_avg_err, '_moments'),
+    'med_err': (np.median, 'e'),
+    'std_err': (get_std_err, '_moments')
+}, docs=extra_feature_docs, tags=ASTRONOMY_ERROR)
+
+feature_registry.register_graph({
     'cads': (np.diff, 't'),
     'cads_std': (np.std, 'cads'),
-    'mean': (np.mean, 'm'),
     'cads_avg': (np.mean, 'cads'),
     'cads_med': (np.median, 'cads'),
     'cad_probs_1': (cad_prob, 'cads', 1),
@@ -130,7 +203,6 @@ dask_feature_graph = {
     'avg_double_to_single_step': (np.mean, 'double_to_single_step'),
     'med_double_to_single_step': (np.median, 'double_to_single_step'),
     'std_double_to_single_step': (np.std, 'double_to_single_step'),
-    'delta_t_hist': (delta_t_hist, 't'),
     'delta_t_nhist': (normalize_hist, 'delta_t_hist', 'total_time'),
     'nhist_peaks': (find_sorted_peaks, 'delta_t_nhist'),
     'all_times_nhist_numpeaks': (len, 'nhist_peaks'),
@@ -144,87 +216,58 @@ dask_feature_graph = {
     'all_times_nhist_peak1_bin': (peak_bin, 'nhist_peaks', 1),
     'all_times_nhist_peak2_bin': (peak_bin, 'nhist_peaks', 2),
     'all_times_nhist_peak3_bin': (peak_bin, 'nhist_peaks', 3),
-    'all_times_nhist_peak4_bin': (peak_bin, 'nhist_peaks', 4),
+    'all_times_nhist_peak4_bin': (peak_bin, 'nhist_peaks', 4)
+}, docs=extra_feature_docs, tags=ASTRONOMY_CADENCE)
+register_feature('delta_t_hist', delta_t_hist, 't', tags=ASTRONOMY_CADENCE,
+                 cost=Cost(5e-3, 1e-4))
 
-    # Standalone features (disconnected nodes)
-    'amplitude': (amplitude, 'm'),
+feature_registry.register_graph({
     'flux_percentile_ratio_mid20': (flux_percentile_ratio, 'm', 20),
     'flux_percentile_ratio_mid35': (flux_percentile_ratio, 'm', 35),
     'flux_percentile_ratio_mid50': (flux_percentile_ratio, 'm', 50),
     'flux_percentile_ratio_mid65': (flux_percentile_ratio, 'm', 65),
     'flux_percentile_ratio_mid80': (flux_percentile_ratio, 'm', 80),
-    'maximum': (maximum, 'm'),
-    'max_slope': (max_slope, 't', 'm'),
-    'median': (median, 'm'),
-    'median_absolute_deviation': (median_absolute_deviation, 'm'),
-    'minimum': (minimum, 'm'),
-    'percent_amplitude': (percent_amplitude, 'm'),
-    'percent_beyond_1_std': (percent_beyond_1_std, 'm', 'e'),
-    'percent_close_to_median': (percent_close_to_median, 'm'),
-    'percent_difference_flux_percentile': (
-        percent_difference_flux_percentile, 'm'),
-    'skew': (skew, 'm'),
-    'std': (std, 'm'),
-    'stetson_j': (stetson_j, 'm'),
-    'stetson_k': (stetson_k, 'm'),
-    'weighted_average': (weighted_average, 'm', 'e'),
 
     # QSO model features
-    'qso_model': (qso_fit, 't', 'm', 'e'),
     'qso_log_chi2_qsonu': (get_qso_log_chi2_qsonu, 'qso_model'),
     'qso_log_chi2nuNULL_chi2nu': (get_qso_log_chi2nuNULL_chi2nu,
                                   'qso_model'),
-
-    # Fast Lomb-Scargle from Gatspy
-    'period_fast': (lomb_scargle_fast_period, 't', 'm', 'e'),
-
-    '_lomb_model': (lomb_scargle_model, 't', 'm', 'e'),
-    # These could easily be programmatically generated, but this is more readable
-    'freq1_freq': (get_lomb_frequency, '_lomb_model', 1),
-    'freq2_freq': (get_lomb_frequency, '_lomb_model', 2),
-    'freq3_freq': (get_lomb_frequency, '_lomb_model', 3),
-    'freq1_amplitude1': (get_lomb_amplitude, '_lomb_model', 1, 1),
-    'freq1_amplitude2': (get_lomb_amplitude, '_lomb_model', 1, 2),
-    'freq1_amplitude3': (get_lomb_amplitude, '_lomb_model', 1, 3),
-    'freq1_amplitude4': (get_lomb_amplitude, '_lomb_model', 1, 4),
-    'freq2_amplitude1': (get_lomb_amplitude, '_lomb_model', 2, 1),
-    'freq2_amplitude2': (get_lomb_amplitude, '_lomb_model', 2, 2),
-    'freq2_amplitude3': (get_lomb_amplitude, '_lomb_model', 2, 3),
-    'freq2_amplitude4': (get_lomb_amplitude, '_lomb_model', 2, 4),
-    'freq3_amplitude1': (get_lomb_amplitude, '_lomb_model', 3, 1),
-    'freq3_amplitude2': (get_lomb_amplitude, '_lomb_model', 3, 2),
-    'freq3_amplitude3': (get_lomb_amplitude, '_lomb_model', 3, 3),
-    'freq3_amplitude4': (get_lomb_amplitude, '_lomb_model', 3, 4),
-    #        'freq1_rel_phase1': (get_lomb_rel_phase, 'lomb_model', 1, 1),
-    'freq1_rel_phase2': (get_lomb_rel_phase, '_lomb_model', 1, 2),
-    'freq1_rel_phase3': (get_lomb_rel_phase, '_lomb_model', 1, 3),
-    'freq1_rel_phase4': (get_lomb_rel_phase, '_lomb_model', 1, 4),
-    #        'freq2_rel_phase1': (get_lomb_rel_phase, 'lomb_model', 2, 1),
-    'freq2_rel_phase2': (get_lomb_rel_phase, '_lomb_model', 2, 2),
-    'freq2_rel_phase3': (get_lomb_rel_phase, '_lomb_model', 2, 3),
-    'freq2_rel_phase4': (get_lomb_rel_phase, '_lomb_model', 2, 4),
-    #        'freq3_rel_phase1': (get_lomb_rel_phase, 'lomb_model', 3, 1),
-    'freq3_rel_phase2': (get_lomb_rel_phase, '_lomb_model', 3, 2),
-    'freq3_rel_phase3': (get_lomb_rel_phase, '_lomb_model', 3, 3),
-    'freq3_rel_phase4': (get_lomb_rel_phase, '_lomb_model', 3, 4),
-    'freq_amplitude_ratio_21': (get_lomb_amplitude_ratio, '_lomb_model', 2),
-    'freq_amplitude_ratio_31': (get_lomb_amplitude_ratio, '_lomb_model', 3),
-    'freq_frequency_ratio_21': (get_lomb_frequency_ratio, '_lomb_model', 2),
-    'freq_frequency_ratio_31': (get_lomb_frequency_ratio, '_lomb_model', 3),
-    'freq_signif_ratio_21': (get_lomb_signif_ratio, '_lomb_model', 2),
-    'freq_signif_ratio_31': (get_lomb_signif_ratio, '_lomb_model', 3),
+    'qso_tau': (get_qso_tau, '_qso_drw_fit'),
+    'qso_sigma': (get_qso_sigma, '_qso_drw_fit')
+}, tags=['Astronomy'])
+register_feature('qso_model', qso_fit, 't', 'm', 'e', tags=['Astronomy'],
+                 cost=Cost(1e-3, 5e-4), batch_func=qso_fit_batch)
+register_feature('_qso_drw_fit', qso_drw_fit, 't', 'm', 'e',
+                 tags=['Astronomy'], cost=Cost(1e-2, 3e-2, 0.9),
+                 batch_func=qso_drw_fit_batch)
+
+# Fast Lomb-Scargle period
+register_feature('period_fast', lomb_scargle_fast_period, 't', 'm', 'e',
+                 tags=ASTRONOMY_PERIODIC, cost=Cost(5e-3, 6e-3))
+
+register_feature('_lomb_model', lomb_scargle_model, 't', 'm', 'e',
+                 tags=ASTRONOMY_PERIODIC,
+                 cost=Cost(1e-2, 4.5e-2, 1.9, baseline_scale=0.11),
+                 fallback=lomb_scargle_model_first_freq,
+                 fallback_cost=Cost(5e-3, 1.5e-2, 1.9, baseline_scale=3.7e-2))
+register_feature('_periodic_model', periodic_model, '_lomb_model',
+                 tags=ASTRONOMY_PERIODIC, cost=Cost(2e-3))
+register_feature('_period_folded_model', period_folding, 't', 'm', 'e',
+                 '_lomb_model', 0.05, '_folded_lightcurve',
+                 tags=ASTRONOMY_PERIODIC,
+                 cost=Cost(5e-3, 3.5e-2, 1.85, baseline_scale=6.5e-2))
+feature_registry.register_graph({
     'freq1_lambda': (get_lomb_lambda, '_lomb_model'),
     'freq1_signif': (get_lomb_signif, '_lomb_model'),
     'freq_varrat': (get_lomb_varrat, '_lomb_model'),
     'linear_trend': (get_lomb_trend, '_lomb_model'),
     'freq_y_offset': (get_lomb_y_offset, '_lomb_model'),
 
-     # Other features that operate on Lomb-Scargle residuals
+    # Other features that operate on Lomb-Scargle residuals
     'freq_n_alias': (num_alias, '_lomb_model'),
     'scatter_res_raw': (scatter_res_raw, 't', 'm', 'e', '_lomb_model'),
 
-    '_periodic_model': (periodic_model, '_lomb_model'),
-    '_period_folded_model': (period_folding, 't', 'm', 'e', '_lomb_model'),
+    '_folded_lightcurve': (folded_lightcurve, 't', 'freq1_freq'),
 
     'freq_model_max_delta_mags': (get_max_delta_mags, '_periodic_model'),
     'freq_model_min_delta_mags': (get_min_delta_mags, '_periodic_model'),
@@ -235,182 +278,153 @@ dask_feature_graph = {
                                   '_period_folded_model', 90),
     'medperc90_2p_p': (get_medperc90_2p_p, '_period_folded_model'),
 
-    '_p2p_model': (p2p_model, 't', 'm', 'freq1_freq'),
+    '_p2p_model': (p2p_model, 't', 'm', 'freq1_freq', '_folded_lightcurve'),
     'p2p_scatter_2praw': (get_p2p_scatter_2praw, '_p2p_model'),
     'p2p_scatter_over_mad': (get_p2p_scatter_over_mad, '_p2p_model'),
     'p2p_scatter_pfold_over_mad': (get_p2p_scatter_pfold_over_mad,
                                    '_p2p_model'),
     'p2p_ssqr_diff_over_var': (get_p2p_ssqr_diff_over_var, '_p2p_model')
-}
-
-def generate_dask_graph(t, m, e):
+}, tags=ASTRONOMY_PERIODIC)
+
+
+def lomb_scargle_feature_graph(nfreq, nharm):
+    """Generate graph entries for the features of individual Lomb-Scargle
+    frequencies and harmonics.
+
+    Produces `freq{i}_freq`, `freq{i}_amplitude{j}` and `freq{i}_rel_phase{j}`
+    (j > 1; the first harmonic defines the phase) for i = 1..nfreq and
+    j = 1..nharm, as well as the ratios `freq_amplitude_ratio_{i}1`,
+    `freq_frequency_ratio_{i}1` and `freq_signif_ratio_{i}1` for i > 1.
+    """
+    graph = {}
+    for i in range(1, nfreq + 1):
+        graph['freq{}_freq'.format(i)] = (get_lomb_frequency, '_lomb_model', i)
+        for j in range(1, nharm + 1):
+            graph['freq{}_amplitude{}'.format(i, j)] = (get_lomb_amplitude,
+                                                        '_lomb_model', i, j)
+            if j > 1:
+                graph['freq{}_rel_phase{}'.format(i, j)] = (
+                    get_lomb_rel_phase, '_lomb_model', i, j)
+        if i > 1:
+            graph['freq_amplitude_ratio_{}1'.format(i)] = (
+                get_lomb_amplitude_ratio, '_lomb_model', i)
+            graph['freq_frequency_ratio_{}1'.format(i)] = (
+                get_lomb_frequency_ratio, '_lomb_model', i)
+            graph['freq_signif_ratio_{}1'.format(i)] = (
+                get_lomb_signif_ratio, '_lomb_model', i)
+    return graph
+
+
+# Default model size; the graph covers the first four harmonics of each
+# frequency, but the fit always uses all eight
+LOMB_SCARGLE_NFREQ = 3
+LOMB_SCARGLE_NHARM = 8
+feature_registry.register_graph(
+    lomb_scargle_feature_graph(LOMB_SCARGLE_NFREQ, 4), tags=ASTRONOMY_PERIODIC)
+
+_LOMB_FEATURE_RE = re.compile(r'^freq(\d+)_(?:freq|amplitude(\d+)|'
+                              r'rel_phase(\d+))$|'
+                              r'^freq_(?:amplitude|frequency|signif)_ratio_'
+                              r'(\d+)1$')
+# Getters reading the i-th fitted frequency (and j-th harmonic)
+_LOMB_FREQ_GETTERS = (get_lomb_frequency, get_lomb_amplitude,
+                      get_lomb_rel_phase, get_lomb_amplitude_ratio,
+                      get_lomb_frequency_ratio, get_lomb_signif_ratio)
+_LOMB_HARM_GETTERS = (get_lomb_amplitude, get_lomb_rel_phase)
+# Consumers of `_lomb_model` that only use the first fitted frequency
+_LOMB_FIRST_FREQ = (get_lomb_lambda, get_lomb_signif, get_lomb_varrat,
+                    get_lomb_trend, get_lomb_y_offset, periodic_model)
+
+
+def _lomb_model_size(graph, features):
+    """Number of frequencies and harmonics of `_lomb_model` read by the given
+    features, and whether they may depend on the full model.
+
+    Frequencies are fit one at a time, so only the fits up to the largest
+    frequency read by any requested feature need to be computed; features
+    that use e.g. the final residuals, as well as unknown (custom) features,
+    require all `LOMB_SCARGLE_NFREQ` frequencies.
+    """
+    needed = set()
+    stack = list(features)
+    full = False
+    while stack:
+        key = stack.pop()
+        if key in needed:
+            continue
+        if key not in graph:
+            full = True
+            continue
+        needed.add(key)
+        stack.extend(get_dependencies(graph, key))
+
+    nfreq, nharm = 0, 0
+    for key in needed:
+        task = graph[key]
+        if not (istask(task) and any(isinstance(arg, str) and
+                                     arg == '_lomb_model'
+                                     for arg in task[1:])):
+            continue
+        if task[0] in _LOMB_FREQ_GETTERS:
+            nfreq = max(nfreq, task[2])
+            if task[0] in _LOMB_HARM_GETTERS:
+                nharm = max(nharm, task[3])
+        elif task[0] in _LOMB_FIRST_FREQ:
+            nfreq = max(nfreq, 1)
+        else:
+            full = True
+    return nfreq, nharm, full
+
+
+def generate_dask_graph(t, m, e, features_to_use=None, nharm=None):
+    """Generate the feature graph for a single time series.
+
+    If `features_to_use` is given, Lomb-Scargle features of any frequency or
+    harmonic (e.g. `freq4_amplitude6`) are added to the graph as needed, and
+    the Lomb-Scargle model only fits as many frequencies as these features
+    require. This is `LOMB_SCARGLE_NFREQ` for features of the full model (such
+    as `scatter_res_raw`), unless more frequencies are requested, in which
+    case those features use all fitted frequencies.
+
+    Parameters
+    ----------
+    t, m, e : array
+        Time, measurement and error values.
+    features_to_use : list of str, optional
+        Features that will be computed from the graph.
+    nharm : int, optional
+        Number of harmonics of the Lomb-Scargle model fit; fewer harmonics
+        are cheaper to fit but change all Lomb-Scargle feature values.
+        Defaults to `LOMB_SCARGLE_NHARM`, or the highest requested harmonic
+        if larger.
+    """
     full_graph = {'t': t, 'm': m, 'e': e}
     full_graph.update(dask_feature_graph)
+    if features_to_use is None:
+        if nharm is not None:
+            full_graph['_lomb_model'] = (lomb_scargle_model, 't', 'm', 'e',
+                                         0.05, nharm, LOMB_SCARGLE_NFREQ)
+        return full_graph
+
+    for feature in features_to_use:
+        match = _LOMB_FEATURE_RE.match(feature)
+        if feature not in full_graph and match:
+            i, j_amp, j_phase, i_ratio = match.groups()
+            full_graph.update({
+                k: v for k, v in lomb_scargle_feature_graph(
+                    int(i or i_ratio), int(j_amp or j_phase or 1)).items()
+                if k not in full_graph})
+
+    nfreq, nharm_used, full = _lomb_model_size(full_graph, features_to_use)
+    if full:
+        nfreq = max(LOMB_SCARGLE_NFREQ, nfreq)
+    if nharm is None:
+        nharm = max(LOMB_SCARGLE_NHARM, nharm_used)
+    elif nharm < nharm_used:
+        raise ValueError("Requested features use {} harmonics but nharm={}"
+                         .format(nharm_used, nharm))
+    if nfreq > 0:
+        full_graph['_lomb_model'] = (lomb_scargle_model, 't', 'm', 'e', 0.05,
+                                     nharm, nfreq)
     return full_graph
 
-
-extra_feature_docs = {
-    'n_epochs': 'Total number of observed values.',
-    'avg_err': 'Mean of the error estimates.',
-    'med_err': 'Median of error estimates.',
-    'std_err': 'Standard deviation of the error estimates.',
-    'total_time': 'Absolute difference between max and min of time values.',
-    'avgt': 'Mean of the time values.',
-    'mean': 'Mean of observed values.',
-    'cads': 'List of differences between successive time values (`np.diff(t)`).',
-    'cads_std': 'Standard deviation of `cads` (discrete difference between times).',
-    'cads_avg': 'Mean value of `cads` (discrete difference between times).',
-    'cads_med': 'Median value of `cads` (discrete difference between times).',
-    'avg_double_to_single_step':
-    'Mean value of ratios (t[i+2] - t[i]) / (t[i+2] - t[i+1]).',
-    'med_double_to_single_step':
-    'Median value of ratios (t[i+2] - t[i]) / (t[i+2] - t[i+1]).',
-    'std_double_to_single_step':
-    'Standard deviation of ratios (t[i+2] - t[i]) / (t[i+2] - t[i+1]).',
-    'all_times_nhist_numpeaks':
-    'Number of peaks (local maxima) in histogram of all possible delta_t\'s.',
-    'all_times_nhist_peak_val':
-    'Peak value in histogram of all possible delta_t\'s.'
-}
-
-
-feature_tags = {
-    'n_epochs': ['Astronomy', 'General'],
-    'avg_err': ['Astronomy', 'Error', 'General'],
-    'med_err': ['Astronomy', 'Error', 'General'],
-    'std_err': ['Astronomy', 'Error', 'General'],
-    'total_time': ['Astronomy', 'General'],
-    'avgt': ['Astronomy', 'General'],
-    'cads': ['Astronomy', 'General', 'Cadence'],
-    'cads_std': ['Astronomy', 'General', 'Cadence'],
-    'mean': ['Astronomy', 'General'],
-    'cads_avg': ['Astronomy', 'General', 'Cadence'],
-    'cads_med': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_1': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_10': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_20': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_30': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_40': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_50': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_100': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_500': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_1000': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_5000': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_10000': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_50000': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_100000': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_500000': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_1000000': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_5000000': ['Astronomy', 'General', 'Cadence'],
-    'cad_probs_10000000': ['Astronomy', 'General', 'Cadence'],
-    'double_to_single_step': ['Astronomy', 'General', 'Cadence'],
-    'avg_double_to_single_step': ['Astronomy', 'General', 'Cadence'],
-    'med_double_to_single_step': ['Astronomy', 'General', 'Cadence'],
-    'std_double_to_single_step': ['Astronomy', 'General', 'Cadence'],
-    'delta_t_hist': ['Astronomy', 'General', 'Cadence'],
-    'delta_t_nhist': ['Astronomy', 'General', 'Cadence'],
-    'nhist_peaks': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_numpeaks': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak_val': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak_1_to_2': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak_1_to_3': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak_2_to_3': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak_1_to_4': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak_2_to_4': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak_3_to_4': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak1_bin': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak2_bin': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak3_bin': ['Astronomy', 'General', 'Cadence'],
-    'all_times_nhist_peak4_bin': ['Astronomy', 'General', 'Cadence'],
-
-    # Standalone features (disconnected nodes)
-    'amplitude': ['Astronomy', 'General'],
-    'flux_percentile_ratio_mid20': ['Astronomy'],
-    'flux_percentile_ratio_mid35': ['Astronomy'],
-    'flux_percentile_ratio_mid50': ['Astronomy'],
-    'flux_percentile_ratio_mid65': ['Astronomy'],
-    'flux_percentile_ratio_mid80': ['Astronomy'],
-    'maximum': ['Astronomy', 'General'],
-    'max_slope': ['Astronomy', 'General'],
-    'median': ['Astronomy', 'General'],
-    'median_absolute_deviation': ['Astronomy', 'General'],
-    'minimum': ['Astronomy', 'General'],
-    'percent_amplitude': ['Astronomy', 'General'],
-    'percent_beyond_1_std': ['Astronomy', 'General'],
-    'percent_close_to_median': ['Astronomy', 'General'],
-    'percent_difference_flux_percentile': ['Astronomy', 'General'],
-    'skew': ['Astronomy', 'General'],
-    'std': ['Astronomy', 'General'],
-    'stetson_j': ['Astronomy', 'General'],
-    'stetson_k': ['Astronomy', 'General'],
-    'weighted_average': ['Astronomy', 'General'],
-
-    # QSO model features
-    'qso_model': ['Astronomy'],
-    'qso_log_chi2_qsonu': ['Astronomy'],
-    'qso_log_chi2nuNULL_chi2nu': ['Astronomy'],
-
-    # Fast Lomb-Scargle from Gatspy
-    'period_fast': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-
-    '_lomb_model': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    # These could easily be programmatically generated, but this is more readable
-    'freq1_freq': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq2_freq': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq3_freq': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq1_amplitude1': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq1_amplitude2': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq1_amplitude3': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq1_amplitude4': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq2_amplitude1': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq2_amplitude2': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq2_amplitude3': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq2_amplitude4': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq3_amplitude1': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq3_amplitude2': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq3_amplitude3': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq3_amplitude4': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    #        'freq1_rel_phase1': (get_lomb_rel_phase, 'lomb_model', 1, 1),
-    'freq1_rel_phase2': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq1_rel_phase3': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq1_rel_phase4': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    #        'freq2_rel_phase1': (get_lomb_rel_phase, 'lomb_model', 2, 1),
-    'freq2_rel_phase2': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq2_rel_phase3': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq2_rel_phase4': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    #        'freq3_rel_phase1': (get_lomb_rel_phase, 'lomb_model', 3, 1),
-    'freq3_rel_phase2': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq3_rel_phase3': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq3_rel_phase4': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq_amplitude_ratio_21': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq_amplitude_ratio_31': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq_frequency_ratio_21': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq_frequency_ratio_31': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq_signif_ratio_21': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq_signif_ratio_31': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq1_lambda': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq1_signif': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq_varrat': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'linear_trend': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq_y_offset': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-
-     # Other features that operate on Lomb-Scargle residuals
-    'freq_n_alias': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'scatter_res_raw': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-
-    '_periodic_model': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    '_period_folded_model': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-
-    'freq_model_max_delta_mags': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq_model_min_delta_mags': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'freq_model_phi1_phi2': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'fold2P_slope_10percentile': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'fold2P_slope_90percentile': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'medperc90_2p_p': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-
-    '_p2p_model': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'p2p_scatter_2praw': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'p2p_scatter_over_mad': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'p2p_scatter_pfold_over_mad': ['Astronomy', 'Periodic', 'Lomb-Scargle'],
-    'p2p_ssqr_diff_over_var': ['Astronomy', 'Periodic', 'Lomb-Scargle']
-}
@@ -35,11 +35,12 @@ def lomb_scargle_model(time, signal, error, sys_err=0.05, nharm=8, nfreq=3, tone
 
     """
 
-    dy0 = np.sqrt(error**2 + sys_err**2)
+    # Fit in double precision regardless of the precision of the inputs
+    dy0 = np.sqrt(np.asarray(error, dtype='float64')**2 + sys_err**2)
 
     wt = 1. / dy0**2
-    time = time.copy() - min(time) # speeds up lomb_scargle code to have min(time)==0
-    signal = signal.copy()
+    time = np.asarray(time, dtype='float64') - min(time) # speeds up lomb_scargle code to have min(time)==0
+    signal = np.array(signal, dtype='float64')
 
     chi0 = np.dot(signal**2, wt)
 
@@ -77,6 +78,18 @@ def lomb_scargle_model(time, signal, error, sys_err=0.05, nharm=8, nfreq=3, tone
     return model_dict
 
 
+def lomb_scargle_model_first_freq(time, signal, error, sys_err=0.05, nharm=8,
+                                  nfreq=3, tone_control=5.0):
+    """Approximation of `lomb_scargle_model` that only fits the first
+    frequency, at a fraction of the cost; `nfreq` is ignored.
+
+    Features of the first frequency are unchanged, whereas features of the
+    residuals of the full model are approximated by those of the first fit.
+    """
+    return lomb_scargle_model(time, signal, error, sys_err, nharm, 1,
+                              tone_control)
+
+
 def lprob2sigma(lprob):
     """Translate a log_e(probability) to units of Gaussian sigmas."""
     if lprob > -36.:
@@ -1,19 +1,131 @@
 import numpy as np
-import gatspy
 
 
-def lomb_scargle_fast_period(t, m, e):
+def _extirpolate(x, y, n, order=4):
+    """Spread values `y` at non-integer positions `x` onto an integer grid of
+    size `n` by Lagrange extirpolation (Press & Rybicki 1989), so that sums of
+    smooth functions over the irregular positions become sums over the grid.
+    """
+    grid = np.zeros(n, dtype=y.dtype)
+    integers = (x % 1 == 0)
+    np.add.at(grid, x[integers].astype(int), y[integers])
+    x, y = x[~integers], y[~integers]
+
+    lo = np.clip(np.floor(x - order // 2).astype(int), 0, n - order)
+    offsets = np.arange(order)
+    numerator = y * np.prod(x - lo - offsets[:, np.newaxis], axis=0)
+    for k in offsets:
+        # prod_{j != k} (k - j)
+        denominator = (np.prod(k - offsets[:k]) *
+                       np.prod(k - offsets[k + 1:]))
+        np.add.at(grid, lo + k, numerator / (denominator * (x - lo - k)))
+    return grid
+
+
+def _trig_sums(t, h, f0, df, numf, oversampling=5, order=4):
+    """Approximate sum_j h_j * {sin, cos}(2*pi*f*t_j) on the frequency grid
+    f = f0 + df * arange(numf) using extirpolation onto an FFT grid."""
+    n_fft = 1 << int(np.ceil(np.log2(numf * oversampling)))
+    t0 = t.min()
+    if f0 > 0:
+        h = h * np.exp(2j * np.pi * f0 * (t - t0))
+    tnorm = ((t - t0) * n_fft * df) % n_fft
+    grid = np.fft.ifft(_extirpolate(tnorm, h.astype(complex), n_fft, order))
+    grid = grid[:numf]
+    if t0 != 0:
+        grid *= np.exp(2j * np.pi * t0 * (f0 + df * np.arange(numf)))
+    return n_fft * grid.imag, n_fft * grid.real
+
+
+def fast_lomb_scargle(t, y, dy, f0, df, numf):
+    """Generalized (floating mean) Lomb-Scargle periodogram on a regular
+    frequency grid, normalized to [0, 1].
+
+    Uses the O(N log N) algorithm of Press & Rybicki (1989) with the
+    floating-mean model of Zechmeister & Kurster (2009); values are
+    approximate for very small datasets (fewer than ~50 points).
+
+    Parameters
+    ----------
+    t, y, dy : array_like
+        Times, values and errors.
+    f0, df : float
+        Lowest frequency and frequency spacing.
+    numf : int
+        Number of frequencies.
+
+    Returns
+    -------
+    (numf,) array
+        Periodogram power at frequencies f0 + df * arange(numf).
+    """
+    w = 1. / dy**2
+    w /= w.sum()
+    y = y - np.dot(w, y)
+
+    Sh, Ch = _trig_sums(t, w * y, f0, df, numf)
+    S2, C2 = _trig_sums(t, w, 2 * f0, 2 * df, numf)
+    S, C = _trig_sums(t, w, f0, df, numf)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tan_2omega_tau = (S2 - 2 * S * C) / (C2 - (C * C - S * S))
+    tan_2omega_tau[np.isnan(tan_2omega_tau)] = 0.
+
+    # half-angle identities in place of arctan/sin/cos of omega*tau
+    C2w = 1. / np.sqrt(1. + tan_2omega_tau**2)
+    S2w = tan_2omega_tau * C2w
+    Cw = np.sqrt(0.5 * (1. + C2w))
+    Sw = np.sign(S2w) * np.sqrt(0.5 * (1. - C2w))
+
+    YY = np.dot(w, y**2)
+    YC = Ch * Cw + Sh * Sw
+    YS = Sh * Cw - Ch * Sw
+    CC = 0.5 * (1. + C2 * C2w + S2 * S2w) - (C * Cw + S * Sw)**2
+    SS = 0.5 * (1. - C2 * C2w - S2 * S2w) - (S * Cw - C * Sw)**2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        power = (YC * YC / CC + YS * YS / SS) / YY
+    power[~np.isfinite(power)] = 0.
+    return power
+
+
+def lomb_scargle_fast_period(t, m, e, first_pass_coverage=5,
+                             final_pass_coverage=500, n_candidates=5):
     """Fits a simple sinuosidal model
 
         y(t) = A sin(2*pi*w*t + phi) + c
 
     and returns the estimated period 1/w. Much faster than fitting the
     full multi-frequency model used by `features.lomb_scargle`.
+
+    Periods between 2 * dt / len(t) and the baseline dt are scanned with
+    `first_pass_coverage` grid points per periodogram peak width; the
+    `n_candidates` highest distinct peaks are then refined on a grid with
+    `final_pass_coverage` points per peak width. The search is independent
+    of `lomb_scargle_model`, whose grid search uses a different statistic
+    (detrended, multi-harmonic and with inflated errors), so the periods
+    match those of gatspy's `LombScargleFast` whether or not the full model
+    is also computed.
     """
     dt = t.max() - t.min()
-    opt_args = {'period_range': (2 * dt / len(t), dt), 'quiet': True}
-    model = gatspy.periodic.LombScargleFast(fit_period=True,
-                                            optimizer_kwds=opt_args,
-                                            silence_warnings=True)
-    model.fit(t, m, e)
-    return model.best_period
+    width = 1. / dt
+    f_min, f_max = 1. / dt, len(t) / (2. * dt)
+
+    step = width / first_pass_coverage
+    numf = len(np.arange(f_min, f_max + step, step))
+    power = fast_lomb_scargle(t, m, e, f_min, step, numf)
+
+    # highest peaks, each at least one peak width apart
+    n_peak = int(1 + first_pass_coverage)
+    candidates = np.zeros(n_candidates)
+    for i in range(n_candidates):
+        j = np.argmax(power)
+        candidates[i] = f_min + step * j
+        power[max(0, j - n_peak):(j + n_peak)] = power.min()
+
+    fine_step = width / final_pass_coverage
+    numf_fine = int(2 * step // fine_step)
+    offsets = -step + fine_step * np.arange(numf_fine)
+    fine_power = np.array([fast_lomb_scargle(t, m, e, f - step, fine_step,
+                                             numf_fine)
+                           for f in candidates])
+    i, j = np.unravel_index(np.argmax(fine_power), fine_power.shape)
+    return 1. / (candidates[i] + offsets[j])
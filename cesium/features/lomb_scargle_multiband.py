@@ -0,0 +1,102 @@
+import numpy as np
+
+from .lomb_scargle import fit_lomb_scargle
+from .lomb_scargle_fast import fast_lomb_scargle
+
+
+def _joint_power(times, signals, errors, f0, df, numf):
+    """Fraction of the total chi^2 (summed over bands) explained by a single
+    sinusoid with a shared frequency and per-band amplitude, phase and offset,
+    on the grid f0 + df * arange(numf)."""
+    chi2_explained = np.zeros(numf)
+    chi2_total = 0.
+    for t, y, dy in zip(times, signals, errors):
+        w = 1. / dy**2
+        chi0 = np.dot(w, (y - np.dot(w, y) / w.sum())**2)
+        chi2_explained += chi0 * fast_lomb_scargle(t, y, dy, f0, df, numf)
+        chi2_total += chi0
+    return chi2_explained / chi2_total
+
+
+def _detrend(time, signal, error):
+    """Remove a weighted linear trend from a single band."""
+    w = 1. / error**2
+    X = np.vstack((np.ones_like(time), time)).T
+    coef = np.linalg.lstsq(X * np.sqrt(w)[:, np.newaxis],
+                           signal * np.sqrt(w), rcond=-1)[0]
+    return signal - X.dot(coef)
+
+
+def lomb_scargle_multiband_model(times, signals, errors, sys_err=0.05,
+                                 nharm=8, nfreq=3, tone_control=5.0,
+                                 freq_zoom=10):
+    """Simultaneous multi-frequency fit of several bands sharing frequencies.
+
+    For each of `nfreq` frequencies, a joint periodogram (a single sinusoid
+    with a shared frequency and independent amplitude, phase and offset in
+    each band) is computed for all bands in one sweep over the same frequency
+    grid used by `lomb_scargle_model`, and its peak is refined on a grid
+    `freq_zoom` times finer. Each band is then fit with `nharm` harmonics at
+    that shared frequency and the fits are subtracted before searching for the
+    next frequency.
+
+    Parameters
+    ----------
+    times, signals, errors : list of array_like
+        Time, data and measurement error values for each band.
+    nharm : int
+        Number of harmonics to fit for each frequency.
+    nfreq : int
+        Number of frequencies to fit.
+
+    Returns
+    -------
+    list of dict
+        One dictionary per band, in the format returned by
+        `lomb_scargle_model`.
+    """
+    dy0 = [np.sqrt(np.asarray(e, dtype='float64')**2 + sys_err**2)
+           for e in errors]
+    baseline = (max(np.max(t) for t in times) -
+                min(np.min(t) for t in times))
+    # as in lomb_scargle_model, time is measured from the start of each band
+    times = [np.asarray(t, dtype='float64') - np.min(t) for t in times]
+    signals = [np.array(s, dtype='float64') for s in signals]
+    chi0 = [np.dot(s**2, 1. / dy**2) for s, dy in zip(signals, dy0)]
+
+    # same frequency grid as lomb_scargle_model, for the combined baseline
+    f0 = 1. / baseline
+    df = 0.8 / baseline
+    fmax = 33.
+    numf = int((fmax - f0) / df)
+
+    models = [{'freq_fits': []} for t in times]
+    lambda0_range = [-np.log10(len(t)) for t in times]
+    for i in range(nfreq):
+        detrend_order = 1 if i == 0 else 0
+        search = ([_detrend(t, s, dy) for t, s, dy in zip(times, signals, dy0)]
+                  if detrend_order else signals)
+        j = np.argmax(_joint_power(times, search, dy0, f0, df, numf))
+        f_lo = f0 + df * (j - 0.5)
+        k = np.argmax(_joint_power(times, search, dy0, f_lo, df / freq_zoom,
+                                   freq_zoom + 1))
+        freq = f_lo + k * df / freq_zoom
+
+        for b, (t, dy, model) in enumerate(zip(times, dy0, models)):
+            fit = fit_lomb_scargle(t, signals[b], dy, freq, 0., 1,
+                                   tone_control=tone_control,
+                                   lambda0_range=[lambda0_range[b], 8],
+                                   nharm=nharm, detrend_order=detrend_order)
+            if i == 0:
+                model['trend'] = fit['trend_coef'][1]
+            model['freq_fits'].append(fit)
+            signals[b] -= fit['model']
+            model['freq_fits'][-1]['resid'] = signals[b].copy()
+            if i == 0:
+                model['varrat'] = np.dot(signals[b]**2, 1. / dy**2) / chi0[b]
+            model['chi2'] = fit['chi2']
+
+    for model in models:
+        model.update({'nfreq': nfreq, 'nharm': nharm, 'f0': f0, 'df': df,
+                      'numf': numf})
+    return models
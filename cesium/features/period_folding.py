@@ -3,14 +3,54 @@ from . import lomb_scargle as ls
 from . import common_functions as cf
 
 
+def folded_lightcurve_batch(x, frequencies):
+    """Fold times at several trial frequencies and sort each folded series.
+
+    Times are folded relative to the first observation, i.e. the phases
+    `(x - min(x)) % (1 / frequency)`; all trial periods are folded and sorted
+    at once along the second axis of a single 2d array.
+
+    Parameters
+    ----------
+    x : (n,) array
+        Observation times.
+    frequencies : (n_freq,) array
+        Trial frequencies.
+
+    Returns
+    -------
+    (folded_times, sort_inds) : tuple of (n_freq, n) arrays
+        Sorted folded times and the corresponding sort permutations of `x`.
+    """
+    x = np.asarray(x) - np.min(x)
+    periods = 1. / np.asarray(frequencies, dtype='float64')
+    folded = x % periods[:, np.newaxis]
+    sort_inds = np.argsort(folded, axis=1)
+    return folded[np.arange(len(folded))[:, np.newaxis], sort_inds], sort_inds
+
+
+def folded_lightcurve(x, frequency):
+    """
+    Fold times at the given frequency (period P) and at half of it (2P),
+    storing the sorted folded times and sort permutations for each so they
+    can be shared by all features computed from the folded light curve.
+    """
+    folded, sort_inds = folded_lightcurve_batch(x, [frequency,
+                                                    0.5 * frequency])
+    return {'frequency': frequency, 'offset': np.min(x),
+            't_1per_fold': folded[0], 't_1per_sort_inds': sort_inds[0],
+            't_2per_fold': folded[1], 't_2per_sort_inds': sort_inds[1]}
+
+
 # TODO is this worth it since it doubles running time?
-def period_folding(x, y, dy, lomb_model, sys_err=0.05):
+def period_folding(x, y, dy, lomb_model, sys_err=0.05, folded=None):
     """
     This section is used to calculate Dubath (10. Percentile90:2P/P),
     which requires regenerating a model using 2P where P is the original found period
 
     NOTE: this essentially runs everything a second time, so makes feature
-    generation take roughly twice as long.
+    generation take roughly twice as long. The 2P sort permutation can be
+    reused from a precomputed `folded_lightcurve` of the same frequency.
     """
     out_dict = {}
     model_vals = np.zeros(len(y))
@@ -49,7 +89,14 @@ def period_folding(x, y, dy, lomb_model, sys_err=0.05):
     # adequately model shapes such as RRLyr skewed sawtooth, multi minima of rvtau
     # without getting the scatter from using additional LS found frequencies.
     t_2per_fold = np.array(x % (1. / freq_2p))
-    t_2per_sort_inds = np.argsort(t_2per_fold)
+    if folded is None:
+        t_2per_sort_inds = np.argsort(t_2per_fold)
+    else:
+        # Phases here are measured from t=0 rather than from min(x), which
+        # just rotates the sorted order of the shared fold
+        shift = (1. / freq_2p) - folded['offset'] % (1. / freq_2p)
+        n_wrap = np.searchsorted(folded['t_2per_fold'], shift)
+        t_2per_sort_inds = np.roll(folded['t_2per_sort_inds'], -n_wrap)
     t_2per_fold = t_2per_fold[t_2per_sort_inds]
     y_2per_fold = np.array(model_vals)[t_2per_sort_inds]
     out_dict['folded_slopes'] = slopes = np.diff(y_2per_fold) / np.diff(t_2per_fold)
@@ -57,30 +104,25 @@ def period_folding(x, y, dy, lomb_model, sys_err=0.05):
     return out_dict
 
 
-def p2p_model(x, y, frequency):
+def p2p_model(x, y, frequency, folded=None):
     """
     Compute features that compare the residuals of data folded by estimated
     period from Lomb-Scargle model with residuals folded by twice the estimated
-    period.
+    period. The sort permutations can be reused from a precomputed
+    `folded_lightcurve` of the same frequency.
     """
+    if folded is None:
+        folded = folded_lightcurve(x, frequency)
 
     sumsqr_diff_unfold = np.sum((np.diff(y)**2))
     median_diff = np.median(np.abs(np.diff(y)))
     mad = cf.median_absolute_deviation(y)
-    x = x.copy()
-    x = x - min(x)
 
-    t_2per_fold = np.array(x % (2. / frequency))
-    t_2per_sort_inds = np.argsort(t_2per_fold)
-    t_2per_fold = t_2per_fold[t_2per_sort_inds]
-    y_2per_fold = np.array(y)[t_2per_sort_inds]
+    y_2per_fold = np.array(y)[folded['t_2per_sort_inds']]
     sumsqr_diff_2per_fold = np.sum(np.diff(y_2per_fold)**2)
 
     ### eta feature from arXiv 1101.3316 Kim QSO paper:
-    t_1per_fold = np.array(x % (1. / frequency))
-    t_1per_sort_inds = np.argsort(t_1per_fold)
-    t_1per_fold = t_1per_fold[t_1per_sort_inds]
-    y_1per_fold = np.array(y)[t_1per_sort_inds]
+    y_1per_fold = np.array(y)[folded['t_1per_sort_inds']]
     median_1per_fold_diff = np.median(np.abs(np.diff(y_1per_fold)))
 
     out_dict = {}
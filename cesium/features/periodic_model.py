@@ -1,5 +1,137 @@
 import numpy as np
-from scipy import optimize
+
+
+def _harmonic_coefs(amplitudes, phases):
+    """Sine and cosine coefficients of sum_j A_j * sin(2*pi*j*t + ph_j)."""
+    amplitudes = np.atleast_2d(np.asarray(amplitudes, dtype='float64'))
+    phases = np.atleast_2d(np.asarray(phases, dtype='float64'))
+    return amplitudes * np.cos(phases), amplitudes * np.sin(phases)
+
+
+def _harmonic_eval(sin_coefs, cos_coefs, t, order=0):
+    """Evaluate the `order`-th derivative of the harmonic model of each series
+    at the (n_series,) phases `t`."""
+    omega = 2. * np.pi * np.arange(1, sin_coefs.shape[1] + 1)
+    arg = omega * t[:, np.newaxis]
+    scale = omega**order
+    # d/dt rotates (sin, cos) -> (cos, -sin)
+    sin_term = sin_coefs * scale
+    cos_term = cos_coefs * scale
+    for i in range(order):
+        sin_term, cos_term = -cos_term, sin_term
+    return (sin_term * np.sin(arg) + cos_term * np.cos(arg)).sum(axis=1)
+
+
+def _model_extrema(sin_coefs, cos_coefs, n_grid=512, n_newton=6):
+    """Locate all local maxima and minima in [0, 1) of each harmonic model.
+
+    The derivative of every model is evaluated on a regular phase grid with a
+    single matrix product; each sign change brackets an extremum, which is
+    then polished by Newton iterations on the derivative (kept within the
+    bracketing grid cell).
+
+    Returns
+    -------
+    (maxima, minima) : tuple of (n_series, n_max) arrays
+        Sorted extremum locations for each series, padded with NaNs.
+    """
+    n_series, nharm = sin_coefs.shape
+    grid = np.arange(n_grid) / n_grid
+    omega = 2. * np.pi * np.arange(1, nharm + 1)
+    arg = omega[:, np.newaxis] * grid
+    deriv = ((sin_coefs * omega).dot(np.cos(arg)) -
+             (cos_coefs * omega).dot(np.sin(arg)))
+    rising = deriv > 0
+    next_rising = np.roll(rising, -1, axis=1)
+
+    extrema = []
+    for is_max in [True, False]:
+        crossings = (rising & ~next_rising) if is_max else (~rising &
+                                                            next_rising)
+        rows, cols = np.nonzero(crossings)
+        lo = grid[cols]
+        d_lo = deriv[rows, cols]
+        d_hi = deriv[rows, (cols + 1) % n_grid]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = np.where(d_lo != d_hi, d_lo / (d_lo - d_hi), 0.)
+        t = lo + np.clip(frac, 0., 1.) / n_grid
+        s, c = sin_coefs[rows], cos_coefs[rows]
+        for i in range(n_newton):
+            d1 = _harmonic_eval(s, c, t, 1)
+            d2 = _harmonic_eval(s, c, t, 2)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                step = np.where(d2 != 0., d1 / d2, 0.)
+            t = np.clip(t - step, lo, lo + 1. / n_grid)
+        t = t % 1.
+
+        counts = np.bincount(rows, minlength=n_series)
+        out = np.full((n_series, max(counts.max(), 1)), np.nan)
+        order = np.lexsort((t, rows))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        out[rows[order], np.arange(len(rows)) - starts[rows[order]]] = t[order]
+        extrema.append(out)
+    return tuple(extrema)
+
+
+def _climb(sin_coefs, cos_coefs, extrema, t0, is_max):
+    """Move from `t0` to the extremum whose basin contains it, i.e. the
+    nearest maximum (minimum) reached by ascending (descending) the model.
+    Series without extrema stay at `t0`."""
+    slope = _harmonic_eval(sin_coefs, cos_coefs, t0, 1)
+    forward = (slope > 0) if is_max else (slope < 0)
+    base = np.floor(t0)
+    frac = t0 - base
+    valid = ~np.isnan(extrema)
+    counts = valid.sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        n_before = (extrema < frac[:, np.newaxis]).sum(axis=1)
+        n_upto = (extrema <= frac[:, np.newaxis]).sum(axis=1)
+    # next extremum at or to the right (wrapping to the following cycle)
+    i_next = np.where(n_before < counts, n_before, 0)
+    right = extrema[np.arange(len(t0)), i_next] + (n_before >= counts)
+    # previous extremum at or to the left (wrapping to the preceding cycle)
+    i_prev = np.where(n_upto > 0, n_upto - 1, np.maximum(counts - 1, 0))
+    left = extrema[np.arange(len(t0)), i_prev] - (n_upto == 0)
+    return np.where(counts > 0, base + np.where(forward, right, left), t0)
+
+
+def periodic_model_batch(amplitudes, phases, n_grid=512):
+    """Compute `periodic_model` features for a batch of harmonic models.
+
+    Parameters
+    ----------
+    amplitudes, phases : (n_series, nharm) arrays
+        Harmonic amplitudes and relative phases of the first Lomb-Scargle
+        frequency of each series (time is measured in units of its period).
+    n_grid : int, optional
+        Number of phase grid points used to bracket the extrema.
+
+    Returns
+    -------
+    list of dict
+        Dictionaries of model features, one per series.
+    """
+    sin_coefs, cos_coefs = _harmonic_coefs(amplitudes, phases)
+    maxima, minima = _model_extrema(sin_coefs, cos_coefs, n_grid)
+
+    # Starting at 5% of phase (fudge/magic number), alternately locate the
+    # model maximum (magnitude minimum) and minimum following each extremum
+    min_1_a = _climb(sin_coefs, cos_coefs, maxima,
+                     np.full(len(sin_coefs), 0.05), True)
+    max_2_a = _climb(sin_coefs, cos_coefs, minima, min_1_a + 0.01, False)
+    min_3_a = _climb(sin_coefs, cos_coefs, maxima, max_2_a + 0.01, True)
+    max_4_a = _climb(sin_coefs, cos_coefs, minima, min_3_a + 0.01, False)
+
+    def model_f(t):
+        return _harmonic_eval(sin_coefs, cos_coefs, t)
+
+# TODO !!! is this wrong? seems like it should be a minus
+    phi1_phi2 = (min_3_a - max_2_a) / (max_4_a / min_3_a)
+    min_delta_mags = np.abs(model_f(min_1_a) - model_f(min_3_a))
+    max_delta_mags = np.abs(model_f(max_2_a) - model_f(max_4_a))
+    return [{'phi1_phi2': phi1_phi2[i], 'min_delta_mags': min_delta_mags[i],
+             'max_delta_mags': max_delta_mags[i]}
+            for i in range(len(sin_coefs))]
 
 
 # TODO what is this exactly?
@@ -8,35 +140,9 @@ def periodic_model(lomb_model):
     Compute features related to the extreme points of the fitted Lomb Scargle
     model.
     """
-    out_dict = {}
-
     A = lomb_model['freq_fits'][0]['amplitude']
     ph = lomb_model['freq_fits'][0]['rel_phase']
-
-    def model_f(t):
-        return (A[0] * np.sin(2. * np.pi      * t + ph[0]) +
-                A[1] * np.sin(2. * np.pi * 2. * t + ph[1]) +
-                A[2] * np.sin(2. * np.pi * 3. * t + ph[2]) +
-                A[3] * np.sin(2. * np.pi * 4. * t + ph[3]) +
-                A[4] * np.sin(2. * np.pi * 5. * t + ph[4]) +
-                A[5] * np.sin(2. * np.pi * 6. * t + ph[5]) +
-                A[6] * np.sin(2. * np.pi * 7. * t + ph[6]) +
-                A[7] * np.sin(2. * np.pi * 8. * t + ph[7]))
-
-    def model_neg(t):
-        return -1. * model_f(t)
-
-    # Start finding 1st minima, at 5% of phase (fudge/magic number) > 0.018
-    min_1_a = optimize.fmin(model_neg, 0.05, disp=False)[0]
-    max_2_a = optimize.fmin(model_f, min_1_a + 0.01, disp=False)[0]
-    min_3_a = optimize.fmin(model_neg, max_2_a + 0.01, disp=False)[0]
-    max_4_a = optimize.fmin(model_f, min_3_a + 0.01, disp=False)[0]
-
-# TODO !!! is this wrong? seems like it should be a minus
-    out_dict['phi1_phi2'] = (min_3_a - max_2_a) / (max_4_a / min_3_a)
-    out_dict['min_delta_mags'] = abs(model_f(min_1_a) - model_f(min_3_a))
-    out_dict['max_delta_mags'] = abs(model_f(max_2_a) - model_f(max_4_a))
-    return out_dict
+    return periodic_model_batch([A], [ph])[0]
 
 
 def get_max_delta_mags(model):
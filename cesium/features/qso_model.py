@@ -1,17 +1,21 @@
 import numpy as np
-from scipy.stats import norm
-from scipy.linalg import solveh_banded, cholesky_banded
-from scipy.special import gammaln, betainc, gammaincc
+from scipy.linalg import cholesky_banded, cho_solve_banded
+from scipy.special import gammaln, betainc, gammaincc, ndtri
 
 
 # TODO duplicate
 def lprob2sigma(lprob):
-    """Translates a log_e(probability) to units of Gaussian sigmas."""
-    if lprob>-36.:
-      sigma = norm.ppf(1.-0.5*np.exp(1.*lprob))
-    else:
-      sigma = np.sqrt( np.log(2./np.pi) - 2.*np.log(8.2) - 2.*lprob )
-    return float(sigma)
+    """Translates a log_e(probability) to units of Gaussian sigmas.
+
+    Accepts scalars or arrays of log-probabilities.
+    """
+    lprob = np.asarray(lprob, dtype='float64')
+    with np.errstate(over='ignore'):
+        sigma = np.where(lprob > -36.,
+                         ndtri(1. - 0.5 * np.exp(np.minimum(lprob, 0.))),
+                         np.sqrt(np.log(2./np.pi) - 2.*np.log(8.2)
+                                 - 2.*np.minimum(lprob, -36.)))
+    return float(sigma) if sigma.ndim == 0 else sigma
 
 
 def chol_inverse_diag(t):
@@ -30,6 +34,97 @@ def chol_inverse_diag(t):
     return B
 
 
+def tridiag_inverse_band(ab, chol=None):
+    """Diagonal and first off-diagonal of the inverse of a symmetric positive
+    definite tridiagonal matrix, in the same banded form as `chol_inverse_diag`.
+
+    Uses the forward pivots (from the upper Cholesky factor `chol`, computed
+    if not provided) and the pivots of the reversed matrix, so that
+
+        inv[i,i] = 1 / (fwd_i + bwd_i - a[i,i])
+        inv[i,i+1] = -a[i,i+1] / fwd_i * inv[i+1,i+1]
+
+    which avoids the per-row Python recurrence of `chol_inverse_diag`.
+    """
+    if chol is None:
+        chol = cholesky_banded(ab)
+    ab_rev = np.zeros_like(ab)
+    ab_rev[1] = ab[1, ::-1]
+    ab_rev[0, 1:] = ab[0, :0:-1]
+    fwd = chol[1]**2
+    bwd = cholesky_banded(ab_rev)[1, ::-1]**2
+
+    B = np.zeros_like(ab)
+    B[1] = 1. / (fwd + bwd - ab[1])
+    B[0, 1:] = -ab[0, 1:] / fwd[:-1] * B[1, 1:]
+    return B
+
+
+def _lprob_beta(a, x):
+    """log_e of the regularized incomplete beta function I_x(a, a), with an
+    asymptotic form where it underflows."""
+    prob = betainc(a, a, x)
+    with np.errstate(divide='ignore'):
+        return np.where(prob <= 0,
+                        a*np.log(x) - np.log(a) + gammaln(2*a) - 2*gammaln(a),
+                        np.log(prob))
+
+
+def _lprob_gamma(nu, x):
+    """log_e of the chi^2 survival function with an asymptotic form where it
+    underflows."""
+    prob = gammaincc(0.5*nu, 0.5*x)
+    with np.errstate(divide='ignore'):
+        return np.where(prob <= 0,
+                        (0.5*nu-1)*np.log(x) - 0.5*x - 0.5*nu*np.log(2)
+                        - gammaln(0.5*nu),
+                        np.log(prob))
+
+
+def _empty_engine_dict():
+    out_dict = {}
+    out_dict['chi2_qso/nu']=999; out_dict['chi2_qso/nu_extra']=0.;
+    out_dict['signif_qso']=0.; out_dict['signif_not_qso']=0.;  out_dict['signif_vary']=0.
+    out_dict['chi2_qso/nu_NULL']=0.; out_dict['chi2/nu']=0.; out_dict['nu']=0
+    out_dict['model']=[]; out_dict['dmodel']=[];
+    out_dict['class']='ambiguous'
+    return out_dict
+
+
+def _stack_series(times, datas, errors):
+    """Concatenate series for evaluation as one block tridiagonal system.
+
+    To make sure all dt>0, only the first point and every point following a
+    positive time step are kept; series with fewer than 2 distinct times are
+    omitted. Returns None if no series remain, otherwise a dict containing the
+    indices of the retained series (`keep`), the retained points of each
+    (`index`), their lengths (`lens`), and the concatenated time steps,
+    data and errors.
+    """
+    keep, index, dts = [], [], []
+    for k in range(len(times)):
+        time = np.asarray(times[k], dtype='float64')
+        dt = abs(time[1:]-time[:-1])
+        g = np.where(dt>0.)[0]
+        # must have at least 2 data points
+        if len(g) <= 0:
+            continue
+        gg = np.zeros(len(g)+1,dtype='int64'); gg[1:] = g+1
+        keep.append(k)
+        index.append(gg)
+        dts.append(dt[g])
+    if not keep:
+        return None
+
+    return {'keep': np.array(keep), 'index': index,
+            'lens': np.array([len(gg) for gg in index]),
+            'dt': np.concatenate(dts),
+            'data': np.concatenate([np.asarray(datas[k], dtype='float64')[gg]
+                                    for k, gg in zip(keep, index)]),
+            'error': np.concatenate([np.asarray(errors[k], dtype='float64')[gg]
+                                     for k, gg in zip(keep, index)])}
+
+
 def qso_engine(time,data,error,ltau=3.,lvar=-1.7,sys_err=0.,return_model=False):
     """Calculates the fit quality of a damped random walk to a qso lightcurve.
     The formalism is from Rybicki & Press (1994; arXiv:comp-gas/9405004)
@@ -62,140 +157,428 @@ def qso_engine(time,data,error,ltau=3.,lvar=-1.7,sys_err=0.,return_model=False):
         Data variance is D
         Full covariance C^(-1) = (L+D)^(-1) = T [T+D^(-1)]^(-1) D^(-1)
         Code takes advantage of the tridiagonality of T and T+D^(-1).
+        See qso_engine_batch for details of the computation.
     """
+    return qso_engine_batch([time], [data], [error], ltau=ltau, lvar=lvar,
+                            sys_err=sys_err, return_model=return_model)[0]
 
-    out_dict = {}
-    out_dict['chi2_qso/nu']=999; out_dict['chi2_qso/nu_extra']=0.;
-    out_dict['signif_qso']=0.; out_dict['signif_not_qso']=0.;  out_dict['signif_vary']=0.
-    out_dict['chi2_qso/nu_NULL']=0.; out_dict['chi2/nu']=0.; out_dict['nu']=0
-    out_dict['model']=[]; out_dict['dmodel']=[];
-    out_dict['class']='ambiguous'
-
-    lvar0 = np.log10(0.5) + lvar + ltau
 
-    ln = len(data)
-    dt = abs(time[1:]-time[:-1])
+def qso_engine_batch(times, datas, errors, ltau=3., lvar=-1.7, sys_err=0.,
+                     return_model=False):
+    """Batched version of qso_engine for a list of (possibly ragged) series.
 
-    # first make sure all dt>0
-    g = np.where(dt>0.)[0]; lg = len(g)
-    # must have at least 2 data points
-    if lg <= 0:
-        return out_dict
+    The tridiagonal systems for all series are stacked into a single block
+    tridiagonal system (with zero coupling between series), so one banded
+    Cholesky factorization of Tp=T+D^(-1) is shared by both right-hand sides
+    and by the log-determinant of the whole batch. The log-determinant of T
+    is known in closed form (det L = prod(1 - r_i^2)), and the inverse
+    diagonal of Tp is obtained from forward and reverse pivots instead of a
+    Python recurrence (see tridiag_inverse_band).
 
-    if return_model:
-        model = 1.*data; dmodel = -1.*error
-
-    if lg < ln:
-      dt = dt[g]
-      gg = np.zeros(lg+1,dtype='int64'); gg[1:] = g+1
-      dat = data[gg]; wt = 1./(sys_err**2+error[gg]**2)
-      ln = lg+1
-    else:
-      dat = 1.*data
-      wt = 1./(sys_err**2+error**2)
+    Input:
+        times, datas, errors - lists of arrays, one per series
+        ltau, lvar - scalars or arrays with one value per series
 
-    out_dict['nu'] = ln-1.
-    varx = np.var(dat)
-    dat0 = (dat * wt).sum() / wt.sum()
-    out_dict['chi2/nu'] = ((dat - dat0)**2 * wt).sum() / out_dict['nu']
+    Output:
+        list of dictionaries as returned by qso_engine
+    """
+    n_series = len(times)
+    ltau = np.broadcast_to(np.asarray(ltau, dtype='float64'), (n_series,))
+    lvar = np.broadcast_to(np.asarray(lvar, dtype='float64'), (n_series,))
+    out_dicts = [_empty_engine_dict() for i in range(n_series)]
+
+    stack = _stack_series(times, datas, errors)
+    if stack is None:
+        return out_dicts
+    keep, gg_all, lens, dt = stack['keep'], stack['index'], stack['lens'], stack['dt']
+    starts = np.concatenate(([0], np.cumsum(lens)[:-1]))
+    ends = starts + lens
+    dat, err = stack['data'], stack['error']
+    wt = 1./(sys_err**2+err**2)
+    ln = lens.astype('float64')
+    nu = ln-1.
+
+    def seg_sum(x):
+        return np.add.reduceat(x, starts)
+
+    varx = seg_sum((dat - np.repeat(seg_sum(dat)/ln, lens))**2)/ln
+    dat0 = seg_sum(dat*wt)/seg_sum(wt)
+    chi2nu = seg_sum((dat - np.repeat(dat0, lens))**2 * wt)/nu
 
     # define tridiagonal matrix T = L^(-1)
     # sparse matrix form: ab[u + i - j, j] == a[i,j]   i<=j, (here u=1)
-    T = np.zeros((2,ln),dtype='float64')
-    arg = dt*np.exp(-np.log(10)*ltau); ri = np.exp(-arg); ei = 1./(1./ri-ri)
-    T[0,1:] = -ei; T[1,:-1] = 1.+ri*ei; T[1,1:] += ri*ei; T[1,ln-1] += 1.
-    T0 = np.median(T[1,:]); T /= T0
+    # off-diagonal entries linking consecutive series are left at zero
+    links = np.ones(len(dat), dtype=bool); links[starts] = False
+    arg = dt*np.exp(-np.log(10)*np.repeat(ltau[keep], lens-1))
+    ri = np.exp(-arg); ei = 1./(1./ri-ri)
+    T = np.zeros((2,len(dat)),dtype='float64')
+    T[0,links] = -ei; T[1,:] = 1.
+    T[1,np.flatnonzero(links)-1] += ri*ei
+    T[1,links] += ri*ei
+    T0 = np.array([np.median(T[1,s:e]) for s, e in zip(starts, ends)])
+    T /= np.repeat(T0, lens)
 
     # equation for chi2_qso is [ (dat-x0) T Tp^(-1) D^(-1) (dat-x0) ]  , where Tp=T+D^(-1) and D^(-1)=wt
+    lvar0 = np.log10(0.5) + lvar[keep] + ltau[keep]
     fac = np.exp(np.log(10)*lvar0)/T0
     Tp = 1.*T
-    Tp[1,:] += wt*fac
-    # solve Tp*z=y for z (y=wt*dat)
-    # This works for scipy __version__>='0.9.0' on anathem (20120809)
-    b1 = (wt*dat).reshape((1,ln))
-    b2 = b1.T
-    #(Tpc,z) = solveh_banded(Tp,b2)
-    z = solveh_banded(Tp,b2)
-    Tpc = cholesky_banded(Tp) # the solveh_banded() function used to return the cholesky matrix, now we get seperately
-    z = z.T
-    z = z[0,:]
-    c1 = wt.reshape((1,ln))
-    c2 = c1.T
-    #(Tpc,z0) = solveh_banded(Tp,c2)
-    z0 = solveh_banded(Tp,c2)
-    #HAS NOT CHANGED#Tpc2 = cholesky_banded(Tp)
-    z0 = z0.T
-    z0 = z0[0,:]
-
+    Tp[1,:] += wt*np.repeat(fac, lens)
+    # factor Tp once; solve Tp*z=y for y=wt*dat and y=wt simultaneously
+    Tpc = cholesky_banded(Tp)
+    z, z0 = cho_solve_banded((Tpc, False), np.c_[wt*dat, wt]).T
 
     #finally, get u=T*z
     u = T[1,:]*z; u[1:] += T[0,1:]*z[:-1]; u[:-1] += T[0,1:]*z[1:]
     u0 = T[1,:]*z0; u0[1:] += T[0,1:]*z0[:-1]; u0[:-1] += T[0,1:]*z0[1:]
 
     # magnitude offset x0, error = 1./sqrt(u0sum)
-    u0sum = u0.sum(); x0 = u.sum()/u0sum;
+    u0sum = seg_sum(u0); x0 = seg_sum(u)/u0sum
+    x0_rep = np.repeat(x0, lens)
 
     # fit statistic
-    out_dict['chi2_qso/nu'] = np.dot(dat-x0,u-u0*x0)/out_dict['nu']
+    chi2_qso_nu = seg_sum((dat-x0_rep)*(u-u0*x0_rep))/nu
 
     # -2*log(likelihood) = chi2_qso + ldet_C + log(u0sum)
     #   first term: use chi2_qso/nu for goodness of fit with fixed parameters;
     #   all terms: use chi2_qso/nu + chi2_qso/nu_extra for fitting with variable parameters
-    # get log of determinant for use later
-    Tc = cholesky_banded(T)
-    ldet_Tp = 2*np.log(Tpc[1,:]).sum()
-    ldet_T = 2*np.log(Tc[1,:]).sum()
-    ldet_C = ldet_Tp-ldet_T-np.log(wt).sum()
-    out_dict['chi2_qso/nu_extra'] = (ldet_C + np.log(u0sum))/out_dict['nu']
+    # log det(T) follows from det(L) = prod(1 - r_i^2) for the normalized L
+    ldet_Tp = seg_sum(2*np.log(Tpc[1,:]))
+    ldet_T = (-np.add.reduceat(np.log(-np.expm1(-2.*arg)), starts - np.arange(len(keep)))
+              - ln*np.log(T0))
+    ldet_C = ldet_Tp-ldet_T-seg_sum(np.log(wt))
+    chi2_qso_nu_extra = (ldet_C + np.log(u0sum))/nu
 
     # get trace of C^(-1) for significance calculation
-    Tpm = chol_inverse_diag(Tpc)
+    Tpm = tridiag_inverse_band(Tp, Tpc)
     diagC = T[1,:]*wt*Tpm[1,:]
     diagC[:-1] += T[0,1:]*wt[0:-1]*Tpm[0,1:]
     diagC[1:] += T[0,1:]*wt[1:]*Tpm[0,1:]
-    TrC = diagC.sum()
+    TrC = seg_sum(diagC)
 
     # significance in sigma units (large means false alarm unlikely)
     # (expected value of chi2_qso under the NULL hypothesis is TrC*varx)
-    out_dict['chi2_qso/nu_NULL'] = TrC*varx/out_dict['nu']
-    a=ln/2.; x = (out_dict['chi2_qso/nu']+1.e-8)/(out_dict['chi2_qso/nu_NULL']+out_dict['chi2_qso/nu']+1.e-8)
-    prob = betainc(a,a,x)
-    if prob <= 0:
-      lprob = a*np.log(x) - np.log(a) + gammaln(2*a) - 2*gammaln(a)
-    else:
-      lprob = np.log(prob)
-    out_dict['signif_qso'] = lprob2sigma(lprob)
-
-    a=ln/2.; x = 1./(1.+out_dict['chi2_qso/nu'])
-    prob = betainc(a,a,x)
-    if prob <= 0:
-      lprob = a*np.log(x) - np.log(a) + gammaln(2*a) - 2*gammaln(a)
-    else:
-      lprob = np.log(prob)
-    out_dict['signif_not_qso'] = lprob2sigma(lprob)
-
-    x = out_dict['chi2/nu']*out_dict['nu']
-    prob = gammaincc(0.5*out_dict['nu'],0.5*x)
-    if prob <= 0:
-      lprob = (0.5*out_dict['nu']-1)*np.log(x) - 0.5*x - 0.5*out_dict['nu']*np.log(2) - gammaln(0.5*out_dict['nu'])
-    else:
-      lprob = np.log( prob )
-    out_dict['signif_vary'] = lprob2sigma(lprob)
-
-    if out_dict['signif_vary'] > 3:
-        if out_dict['signif_qso'] > 3:
-            out_dict['class']='qso'
-        elif out_dict['signif_not_qso'] > 3:
-            out_dict['class']='not_qso'
-
-    # best-fit model for the lightcurve
-    if return_model:
-      model[gg] = dat - (u-u0*x0)/diagC
-      dmodel[gg] = 1./np.sqrt(diagC)
-      out_dict['model'] = model
-      out_dict['dmodel'] = dmodel
+    chi2_qso_nu_NULL = TrC*varx/nu
+    a = ln/2.
+    x = (chi2_qso_nu+1.e-8)/(chi2_qso_nu_NULL+chi2_qso_nu+1.e-8)
+    signif_qso, signif_not_qso, signif_vary = lprob2sigma(
+        [_lprob_beta(a, x), _lprob_beta(a, 1./(1.+chi2_qso_nu)),
+         _lprob_gamma(nu, chi2nu*nu)])
+
+    for i, k in enumerate(keep):
+        out_dict = out_dicts[k]
+        out_dict['nu'] = nu[i]
+        out_dict['chi2/nu'] = chi2nu[i]
+        out_dict['chi2_qso/nu'] = chi2_qso_nu[i]
+        out_dict['chi2_qso/nu_extra'] = chi2_qso_nu_extra[i]
+        out_dict['chi2_qso/nu_NULL'] = chi2_qso_nu_NULL[i]
+        out_dict['signif_qso'] = float(signif_qso[i])
+        out_dict['signif_not_qso'] = float(signif_not_qso[i])
+        out_dict['signif_vary'] = float(signif_vary[i])
+
+        if out_dict['signif_vary'] > 3:
+            if out_dict['signif_qso'] > 3:
+                out_dict['class']='qso'
+            elif out_dict['signif_not_qso'] > 3:
+                out_dict['class']='not_qso'
+
+        # best-fit model for the lightcurve
+        if return_model:
+            s, e, gg = starts[i], ends[i], gg_all[i]
+            model = 1.*np.asarray(datas[k], dtype='float64')
+            dmodel = -1.*np.asarray(errors[k], dtype='float64')
+            model[gg] = dat[s:e] - (u[s:e]-u0[s:e]*x0[i])/diagC[s:e]
+            dmodel[gg] = 1./np.sqrt(diagC[s:e])
+            out_dict['model'] = model
+            out_dict['dmodel'] = dmodel
+
+    return out_dicts
+
+
+def _drw_neg2_loglike(lens, dt, dat, wt, ltau, lvar, gradient=False):
+    """-2*log(likelihood) of a damped random walk for stacked series.
+
+    `lens`, `dt`, `dat`, `wt` describe a stack of series as produced by
+    _stack_series and `ltau`, `lvar` hold one parameter value per series. The
+    likelihood is marginalized over the mean magnitude, i.e. it equals
+    nu*(chi2_qso/nu + chi2_qso/nu_extra) from qso_engine.
+
+    With S = 0.5*var*tau*R the signal covariance, K = R^(-1) (tridiagonal),
+    N = D the noise covariance, W = N^(-1) and M = K + s2*W, we use
+
+        C^(-1) = K M^(-1) W = W - s2 W M^(-1) W
+        R C^(-1) R = (R - M^(-1)) / s2
+        S C^(-1) x = x - N C^(-1) x
+
+    so that the likelihood and its derivatives with respect to ltau and lvar
+    only require one banded factorization of M and the band of M^(-1); all
+    operations are O(n).
+
+    Returns the values (and, if `gradient` is True, an (n_series, 2) array of
+    derivatives with respect to (ltau, lvar)) for each series.
+    """
+    ln10 = np.log(10)
+    nseg = len(lens)
+    starts = np.concatenate(([0], np.cumsum(lens)[:-1]))
+    link_starts = starts - np.arange(nseg)
+    links = np.ones(len(dat), dtype=bool); links[starts] = False
+    right = np.flatnonzero(links); left = right - 1
+
+    def seg_sum(x):
+        return np.add.reduceat(x, starts)
+
+    def link_sum(x):
+        return np.add.reduceat(x, link_starts)
+
+    def tridiag_dot(ab, x):
+        y = ab[1]*x; y[1:] += ab[0,1:]*x[:-1]; y[:-1] += ab[0,1:]*x[1:]
+        return y
+
+    s2 = np.exp(ln10*(np.log10(0.5) + lvar + ltau))
+    s2_rep = np.repeat(s2, lens)
+    arg = dt*np.exp(-ln10*np.repeat(ltau, lens-1))
+    ri = np.exp(-arg); omr2 = -np.expm1(-2.*arg)  # 1 - r^2
+
+    # K = R^(-1) for R_ij = exp(-|t_i-t_j|/tau), in upper banded form
+    K = np.zeros((2,len(dat)),dtype='float64')
+    K[0,right] = -ri/omr2; K[1,:] = 1.
+    K[1,left] += ri*ri/omr2; K[1,right] += ri*ri/omr2
+    M = 1.*K
+    M[1,:] += s2_rep*wt
+    Mc = cholesky_banded(M)
+    z, z0 = cho_solve_banded((Mc, False), np.c_[wt*dat, wt]).T
+    u = tridiag_dot(K, z); u0 = tridiag_dot(K, z0)
+
+    u0sum = seg_sum(u0); x0 = seg_sum(u)/u0sum
+    resid = dat - np.repeat(x0, lens)
+    a = u - u0*np.repeat(x0, lens)  # C^(-1) (dat - x0)
+    chi2 = seg_sum(resid*a)
+    # log det C = log det M - log det K - log det W, det K^(-1) = prod(1-r^2)
+    ldet_C = seg_sum(2*np.log(Mc[1,:]) - np.log(wt)) + link_sum(np.log(omr2))
+    neg2ll = chi2 + ldet_C + np.log(u0sum)
+    if not gradient:
+        return neg2ll
+
+    # dG/dtheta = -a dC a + Tr(C^(-1) dC) - b dC b / (1 C^(-1) 1), b = C^(-1) 1
+    Minv = tridiag_inverse_band(M, Mc)
+    noise = 1./wt
+    cinv_diag = wt - s2_rep*wt**2*Minv[1,:]
+    # dS/dlvar = ln(10) S
+    grad_var = ln10*(-seg_sum(a*resid - a*noise*a)
+                     + lens - seg_sum(noise*cinv_diag)
+                     - seg_sum(u0 - u0*noise*u0)/u0sum)
+
+    # dS/dltau = ln(10) S - s2 R (dK/dltau) R
+    dri = ln10*ri*arg
+    dK_diag = np.zeros(len(dat))
+    dq = 2.*ri/omr2**2*dri
+    dK_diag[left] += dq; dK_diag[right] += dq
+    dK_off = -(1. + ri*ri)/omr2**2*dri
+
+    def dK_quad(x):
+        return seg_sum(dK_diag*x*x) + 2*link_sum(dK_off*x[left]*x[right])
+
+    Ra = (resid - noise*a)/s2_rep
+    Rb = (1. - noise*u0)/s2_rep
+    tr_dK = (seg_sum(dK_diag*(1. - Minv[1,:]))
+             + 2*link_sum(dK_off*(ri - Minv[0,right])))
+    grad_tau = grad_var + (s2*dK_quad(Ra) - tr_dK + s2*dK_quad(Rb)/u0sum)
+
+    return neg2ll, np.c_[grad_tau, grad_var]
+
+
+def _drw_evaluate(stack, wt, sel, ltau, lvar, gradient=False,
+                  max_size=2**20):
+    """Evaluate _drw_neg2_loglike for the (possibly repeated) series `sel` of
+    a stack, each with its own parameters; series are processed in chunks of
+    at most `max_size` points."""
+    lens_all = stack['lens']
+    starts_all = np.concatenate(([0], np.cumsum(lens_all)[:-1]))
+    link_starts_all = starts_all - np.arange(len(lens_all))
+    out = np.empty(len(sel)); grad = np.empty((len(sel), 2))
+
+    sizes = np.cumsum(lens_all[sel])
+    chunk_ids = (sizes - 1) // max_size
+    for c in np.unique(chunk_ids):
+        idx = np.flatnonzero(chunk_ids == c)
+        lens = lens_all[sel[idx]]
+        offsets = np.cumsum(lens) - lens
+        pts = (np.repeat(starts_all[sel[idx]] - offsets, lens)
+               + np.arange(lens.sum()))
+        link_offsets = np.cumsum(lens - 1) - (lens - 1)
+        link_pts = (np.repeat(link_starts_all[sel[idx]] - link_offsets,
+                              lens - 1) + np.arange((lens - 1).sum()))
+        result = _drw_neg2_loglike(lens, stack['dt'][link_pts],
+                                   stack['data'][pts], wt[pts], ltau[idx],
+                                   lvar[idx], gradient=gradient)
+        if gradient:
+            out[idx], grad[idx] = result
+        else:
+            out[idx] = result
+
+    return (out, grad) if gradient else out
+
+
+def drw_likelihood_batch(times, datas, errors, ltau, lvar, sys_err=0.,
+                         gradient=False):
+    """Damped random walk likelihood for a batch of series.
+
+    Returns -2*log(likelihood) (marginalized over the mean magnitude) of the
+    qso_engine covariance model for each series, and optionally its gradient
+    with respect to (ltau, lvar); each evaluation is O(n) in the number of
+    epochs. Series with fewer than 2 distinct times give NaN.
 
-    return out_dict
+    Input:
+        times, datas, errors - lists of arrays, one per series
+        ltau, lvar - scalars or arrays with one value per series
+    """
+    n_series = len(times)
+    ltau = np.broadcast_to(np.asarray(ltau, dtype='float64'), (n_series,))
+    lvar = np.broadcast_to(np.asarray(lvar, dtype='float64'), (n_series,))
+    out = np.full(n_series, np.nan); grad = np.full((n_series, 2), np.nan)
+
+    stack = _stack_series(times, datas, errors)
+    if stack is not None:
+        keep = stack['keep']
+        wt = 1./(sys_err**2+stack['error']**2)
+        result = _drw_evaluate(stack, wt, np.arange(len(keep)), ltau[keep],
+                               lvar[keep], gradient=gradient)
+        if gradient:
+            out[keep], grad[keep] = result
+        else:
+            out[keep] = result
+
+    return (out, grad) if gradient else out
+
+
+def qso_drw_fit_batch(times, datas, errors, sys_err=0., ltau_range=(-2., 4.),
+                      ltau_step=0.5, n_grid=9, n_polish=8):
+    """Maximum-likelihood damped random walk parameters for a batch of series.
+
+    The likelihood of drw_likelihood_batch is first evaluated for all series
+    on a grid of log10(tau) (within `ltau_range`, in steps of about
+    `ltau_step`) and `n_grid` values of log10 of the DRW variance (spanning
+    1e-3 to 10 times the variance of each series), all stacked into a few
+    large banded systems. The best grid point is then polished with Newton
+    steps, using the analytic gradient and a finite-difference Hessian of the
+    gradient, again for all series at once.
+
+    Fits that end on a bound of `ltau_range` are not maxima of the
+    likelihood (tau is too short or too long to be constrained by the data),
+    so their parameters are returned as NaN.
+
+    Input:
+        times, datas, errors - lists of arrays, one per series
+
+    Output:
+        list of dictionaries containing best-fit ltau and lvar (as used by
+        qso_engine), tau = 10**ltau, sigma = sqrt(10**lvar) (i.e.,
+        covariance 0.5*sigma^2*tau*exp(-|dt|/tau)), and the minimized
+        -2*log(likelihood)
+    """
+    n_series = len(times)
+    out_dicts = [{'ltau': np.nan, 'lvar': np.nan, 'tau': np.nan,
+                  'sigma': np.nan, 'neg2_loglike': np.nan}
+                 for i in range(n_series)]
+    stack = _stack_series(times, datas, errors)
+    if stack is None:
+        return out_dicts
+
+    keep, lens = stack['keep'], stack['lens']
+    nseg = len(keep)
+    starts = np.concatenate(([0], np.cumsum(lens)[:-1]))
+    wt = 1./(sys_err**2+stack['error']**2)
+    dat = stack['data']
+    mean = np.add.reduceat(dat, starts)/lens
+    varx = np.add.reduceat((dat - np.repeat(mean, lens))**2, starts)/lens
+    lvar0_center = np.log10(np.maximum(varx, np.finfo(float).tiny))
+
+    ltau_lo, ltau_hi = ltau_range
+    ltau_grid = np.linspace(ltau_lo, ltau_hi, max(2, int(np.ceil(
+        (ltau_hi - ltau_lo) / ltau_step)) + 1))
+    lvar0_grid = np.linspace(-3., 1., n_grid)
+    lvar0_lo, lvar0_hi = lvar0_center - 3., lvar0_center + 1.
+
+    def lvar_from(ltau, lvar0):
+        return lvar0 - np.log10(0.5) - ltau
+
+    # grid search over all series and grid points at once
+    g_tau, g_var0 = [x.ravel() for x in np.meshgrid(ltau_grid, lvar0_grid)]
+    sel = np.tile(np.arange(nseg), len(g_tau))
+    p_tau = np.repeat(g_tau, nseg)
+    p_var0 = np.repeat(g_var0, nseg) + np.tile(lvar0_center, len(g_tau))
+    values = _drw_evaluate(stack, wt, sel, p_tau, lvar_from(p_tau, p_var0))
+    values = np.where(np.isfinite(values), values, np.inf).reshape(-1, nseg)
+    best = values.argmin(axis=0)
+    ltau = g_tau[best]
+    lvar = lvar_from(ltau, g_var0[best] + lvar0_center)
+    fval = values[best, np.arange(nseg)]
+
+    # Newton polishing with finite-difference Hessian of the analytic gradient
+    h = 1e-4
+    idx = np.arange(nseg)
+    for i in range(n_polish):
+        sel3 = np.tile(idx, 3)
+        _, grads = _drw_evaluate(stack, wt, sel3,
+                                 np.r_[ltau, ltau + h, ltau],
+                                 np.r_[lvar, lvar, lvar + h], gradient=True)
+        g, g_dtau, g_dvar = np.split(grads, 3)
+        H = np.stack(((g_dtau - g) / h, (g_dvar - g) / h), axis=1)
+        H = 0.5*(H + H.transpose(0, 2, 1))
+        det = H[:, 0, 0]*H[:, 1, 1] - H[:, 0, 1]**2
+        newton_ok = (det > 0) & (H[:, 0, 0] > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = -np.stack((H[:, 1, 1]*g[:, 0] - H[:, 0, 1]*g[:, 1],
+                              H[:, 0, 0]*g[:, 1] - H[:, 0, 1]*g[:, 0]),
+                             axis=1) / det[:, np.newaxis]
+        # fall back to a short steepest descent step otherwise
+        gnorm = np.sqrt((g**2).sum(axis=1))[:, np.newaxis]
+        step = np.where(newton_ok[:, np.newaxis], step,
+                        -0.1*g/np.maximum(gnorm, 1e-300))
+        # at an ltau bound with the gradient pointing outward, only lvar moves
+        pinned = (((ltau <= ltau_lo) & (g[:, 0] > 0)) |
+                  ((ltau >= ltau_hi) & (g[:, 0] < 0)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var_step = np.where(H[:, 1, 1] > 0, -g[:, 1]/H[:, 1, 1],
+                                -0.1*np.sign(g[:, 1]))
+        step[pinned] = np.stack((np.zeros(pinned.sum()), var_step[pinned]),
+                                axis=1)
+        step = np.clip(step, -0.5, 0.5)
+
+        # backtrack until the likelihood improves
+        improved = np.zeros(nseg, dtype=bool)
+        for scale in [1., 0.5, 0.25, 0.125]:
+            todo = np.flatnonzero(~improved)
+            if len(todo) == 0:
+                break
+            new_tau = np.clip(ltau[todo] + scale*step[todo, 0],
+                              ltau_lo, ltau_hi)
+            new_var = np.clip(lvar[todo] + scale*step[todo, 1],
+                              lvar_from(new_tau, lvar0_lo[todo]),
+                              lvar_from(new_tau, lvar0_hi[todo]))
+            new_f = _drw_evaluate(stack, wt, todo, new_tau, new_var)
+            better = np.isfinite(new_f) & (new_f < fval[todo])
+            ltau[todo[better]] = new_tau[better]
+            lvar[todo[better]] = new_var[better]
+            fval[todo[better]] = new_f[better]
+            improved[todo[better]] = True
+        if not improved.any():
+            break
+
+    at_bound = (ltau <= ltau_lo) | (ltau >= ltau_hi)
+    ltau[at_bound] = np.nan
+    lvar[at_bound] = np.nan
+    for i, k in enumerate(keep):
+        out_dicts[k] = {'ltau': ltau[i], 'lvar': lvar[i],
+                        'tau': 10**ltau[i], 'sigma': np.sqrt(10**lvar[i]),
+                        'neg2_loglike': fval[i]}
+    return out_dicts
+
+
+def qso_drw_fit(time, data, error, sys_err=0., ltau_range=(-2., 4.)):
+    """Maximum-likelihood damped random walk parameters for a single series.
+    See qso_drw_fit_batch for details."""
+    return qso_drw_fit_batch([time], [data], [error], sys_err=sys_err,
+                             ltau_range=ltau_range)[0]
 
 
 def qso_fit(time, data, error, filter='g', mag0=19., sys_err=0.0, return_model=False):
@@ -227,7 +610,19 @@ def qso_fit(time, data, error, filter='g', mag0=19., sys_err=0.0, return_model=F
           (2) signif_not_qso > 3: not_qso
     """
 
-    data = data.copy() - np.median(data) + mag0
+    return qso_fit_batch([time], [data], [error], filter=filter, mag0=mag0,
+                         sys_err=sys_err, return_model=return_model)[0]
+
+
+def qso_fit_batch(times, datas, errors, filter='g', mag0=19., sys_err=0.0,
+                  return_model=False):
+    """Batched version of qso_fit for a list of (possibly ragged) series; all
+    series are evaluated with a single call to qso_engine_batch.
+
+    Returns a list of dictionaries as returned by qso_fit.
+    """
+    datas = [np.asarray(data, dtype='float64') - np.median(data) + mag0
+             for data in datas]
     pars={}
     pars['u'] = [-3.90, 0.12, 2.73, -0.02]
     pars['g'] = [-4.10, 0.14, 2.92, -0.07]
@@ -239,33 +634,45 @@ def qso_fit(time, data, error, filter='g', mag0=19., sys_err=0.0, return_model=F
     lvar = par[0]+par[1]*(mag0-19.)
     ltau = par[2]+par[3]*(mag0-19.)
 
-    adict = qso_engine(time, data, error, ltau=ltau, lvar=lvar, return_model=return_model, sys_err=sys_err)
-
-    out_dict={}
-    out_dict['lvar']=lvar
-    out_dict['ltau']=ltau
-    out_dict['chi2/nu']=adict['chi2/nu']
-    out_dict['nu'] = adict['nu']
-    out_dict['chi2_qso/nu']=adict['chi2_qso/nu']
-    out_dict['chi2_qso/nu_NULL']=adict['chi2_qso/nu_NULL']
-    out_dict['signif_qso']=adict['signif_qso']
-    out_dict['signif_not_qso']=adict['signif_not_qso']
-    out_dict['signif_vary']=adict['signif_vary']
-    out_dict['class']=adict['class'];
-    out_dict['chi2qso_nu_nuNULL_ratio'] = out_dict['chi2_qso/nu'] / out_dict['chi2_qso/nu_NULL']
-
-    ### Nat has converged upon the following being the most significant featues,
-    #    Joey believes it is best to jut use these features only (so now the others are disabled in
-    #       __init__.py and qso_extractor.py
-    out_dict['log_chi2_qsonu'] = np.log(out_dict['chi2_qso/nu'])
-    out_dict['log_chi2nuNULL_chi2nu'] = np.log(out_dict['chi2_qso/nu_NULL'] / out_dict['chi2_qso/nu'])
-    ###
-
-    if return_model:
-      out_dict['model'] = adict['model']
-      out_dict['dmodel'] = adict['dmodel']
-
-    return out_dict
+    adicts = qso_engine_batch(times, datas, errors, ltau=ltau, lvar=lvar,
+                              return_model=return_model, sys_err=sys_err)
+
+    out_dicts = []
+    for adict in adicts:
+        out_dict={}
+        out_dict['lvar']=lvar
+        out_dict['ltau']=ltau
+        out_dict['chi2/nu']=adict['chi2/nu']
+        out_dict['nu'] = adict['nu']
+        out_dict['chi2_qso/nu']=adict['chi2_qso/nu']
+        out_dict['chi2_qso/nu_NULL']=adict['chi2_qso/nu_NULL']
+        out_dict['signif_qso']=adict['signif_qso']
+        out_dict['signif_not_qso']=adict['signif_not_qso']
+        out_dict['signif_vary']=adict['signif_vary']
+        out_dict['class']=adict['class'];
+
+        # statistics are undefined for series with < 2 distinct times
+        if adict['nu'] == 0:
+            out_dict['chi2qso_nu_nuNULL_ratio'] = np.nan
+            out_dict['log_chi2_qsonu'] = np.nan
+            out_dict['log_chi2nuNULL_chi2nu'] = np.nan
+        else:
+            out_dict['chi2qso_nu_nuNULL_ratio'] = out_dict['chi2_qso/nu'] / out_dict['chi2_qso/nu_NULL']
+
+            ### Nat has converged upon the following being the most significant featues,
+            #    Joey believes it is best to jut use these features only (so now the others are disabled in
+            #       __init__.py and qso_extractor.py
+            out_dict['log_chi2_qsonu'] = np.log(out_dict['chi2_qso/nu'])
+            out_dict['log_chi2nuNULL_chi2nu'] = np.log(out_dict['chi2_qso/nu_NULL'] / out_dict['chi2_qso/nu'])
+            ###
+
+        if return_model:
+          out_dict['model'] = adict['model']
+          out_dict['dmodel'] = adict['dmodel']
+
+        out_dicts.append(out_dict)
+
+    return out_dicts
 
 
 def get_qso_log_chi2_qsonu(qso_model):
@@ -276,3 +683,14 @@ def get_qso_log_chi2_qsonu(qso_model):
 def get_qso_log_chi2nuNULL_chi2nu(qso_model):
     """Natural log of expected chi2/nu for non-qso variable."""
     return qso_model['log_chi2nuNULL_chi2nu']
+
+
+def get_qso_tau(drw_fit):
+    """Maximum-likelihood damped random walk timescale tau."""
+    return drw_fit['tau']
+
+
+def get_qso_sigma(drw_fit):
+    """Maximum-likelihood damped random walk amplitude sigma (covariance
+    0.5*sigma^2*tau*exp(-|dt|/tau))."""
+    return drw_fit['sigma']
@@ -0,0 +1,232 @@
+import pickle
+from collections import namedtuple, OrderedDict
+
+import numpy as np
+from dask.core import get_dependencies, istask
+
+
+__all__ = ['Cost', 'FeatureSpec', 'FeatureRegistry', 'DEFAULT_COST']
+
+
+class Cost(namedtuple('Cost', ['const', 'scale', 'exponent',
+                               'baseline_scale'])):
+    """Estimated run time (in seconds) of a single feature node as a function
+    of the number of epochs and the time baseline of the time series:
+
+        const + scale * (n_epochs / 1000) ** exponent
+              + baseline_scale * (n_epochs / 1000) * (baseline / 100)
+
+    where the last term accounts for searches over frequency grids whose size
+    is proportional to the baseline (as in Lomb-Scargle fitting); a baseline
+    of 100 is assumed if none is given.
+
+    The estimates are rough (measured on a single core for typical
+    light curves) and are intended for planning work, not for timing it.
+    """
+    __slots__ = ()
+
+    def __new__(cls, const=0., scale=0., exponent=1., baseline_scale=0.):
+        return super(Cost, cls).__new__(cls, const, scale, exponent,
+                                        baseline_scale)
+
+    def estimate(self, n_epochs, baseline=None):
+        """Estimated run time for series of `n_epochs` spanning `baseline`
+        (scalars or arrays)."""
+        n_epochs = np.asarray(n_epochs, dtype='float64') / 1000.
+        baseline = 1. if baseline is None else np.asarray(baseline) / 100.
+        return (self.const + self.scale * n_epochs ** self.exponent +
+                self.baseline_scale * n_epochs * baseline)
+
+
+# Cheap O(n) reductions make up most of the graph
+DEFAULT_COST = Cost(1e-4, 5e-5, 1.)
+
+
+class FeatureSpec(namedtuple('FeatureSpec', ['name', 'task', 'tags', 'cost',
+                                             'batch_func', 'doc', 'fallback',
+                                             'fallback_cost'])):
+    """Definition of a single node of the feature graph.
+
+    Attributes
+    ----------
+    name : str
+        Name of the feature (or intermediate value, if prefixed by '_').
+    task : tuple
+        dask task computing the value, i.e. `(func, arg1, arg2, ...)`, where
+        arguments naming other features (or 't', 'm', 'e') are dependencies.
+    tags : tuple of str
+        Tags used to organize features.
+    cost : Cost
+        Model of the run time of the node.
+    batch_func : callable or None
+        Vectorized variant of `task[0]` evaluating a batch of series at once:
+        arguments that are dependencies are passed as lists (one entry per
+        series), other arguments are passed unchanged, and a sequence of
+        per-series results is returned. Used when featurizing batches of time
+        series (or windows) for nodes that only depend on 't', 'm' and 'e'.
+    doc : str or None
+        Description of the feature; if None, the docstring of the function is
+        used.
+    fallback : callable or None
+        Cheaper approximation of `task[0]`, taking the same arguments, that
+        can be used when computing the exact value would exceed a time budget.
+    fallback_cost : Cost or None
+        Model of the run time of `fallback`.
+    """
+    __slots__ = ()
+
+    @property
+    def func(self):
+        return self.task[0]
+
+    @property
+    def vectorized(self):
+        """Whether a batched variant of the node is available."""
+        return self.batch_func is not None
+
+    @property
+    def picklable(self):
+        """Whether the task can be sent to another process."""
+        try:
+            pickle.dumps(self.task)
+        except Exception:
+            return False
+        return True
+
+    @property
+    def description(self):
+        """One-paragraph description of the feature."""
+        if self.doc is not None:
+            return self.doc
+        return ' '.join(line.strip() for line in
+                        (self.func.__doc__ or '').split('\n\n')[0]
+                        .strip().split('\n'))
+
+
+class FeatureRegistry(object):
+    """Collection of feature definitions along with their metadata.
+
+    The dask graph of all registered features is available as `graph`, and
+    the tags of each feature as `tags`; both are updated as features are
+    registered, so the registry can be extended at any time (see `register`).
+    """
+    def __init__(self):
+        self.specs = OrderedDict()
+        self.graph = {}
+        self.tags = {}
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def __getitem__(self, name):
+        return self.specs[name]
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def register(self, name, func, *args, **kwargs):
+        """Add a feature to the registry.
+
+        Parameters
+        ----------
+        name : str
+            Name of the feature.
+        func : callable
+            Function computing the feature.
+        *args
+            Arguments of `func`; strings naming other features (or 't', 'm',
+            'e' for the time series itself) are replaced by their values.
+        tags : list of str, optional
+            Tags used to organize features.
+        cost : Cost, optional
+            Model of the run time of the feature; defaults to that of a cheap
+            linear-time reduction.
+        batch_func : callable, optional
+            Vectorized variant of `func` (see `FeatureSpec`).
+        doc : str, optional
+            Description of the feature, if the docstring of `func` is not
+            appropriate.
+        fallback : callable, optional
+            Cheaper approximation of `func` (see `FeatureSpec`).
+        fallback_cost : Cost, optional
+            Model of the run time of `fallback`; defaults to `cost`.
+        replace : bool, optional
+            Whether an existing feature of the same name may be replaced.
+            Defaults to False.
+
+        Returns
+        -------
+        FeatureSpec
+        """
+        tags = kwargs.pop('tags', ())
+        cost = kwargs.pop('cost', DEFAULT_COST)
+        batch_func = kwargs.pop('batch_func', None)
+        doc = kwargs.pop('doc', None)
+        fallback = kwargs.pop('fallback', None)
+        fallback_cost = kwargs.pop('fallback_cost', None)
+        replace = kwargs.pop('replace', False)
+        if kwargs:
+            raise TypeError("Unexpected keyword arguments: {}"
+                            .format(', '.join(sorted(kwargs))))
+        if not callable(func):
+            raise TypeError("Feature function for '{}' is not callable"
+                            .format(name))
+        if name in self.specs and not replace:
+            raise ValueError("Feature '{}' is already registered".format(name))
+        if fallback is not None and fallback_cost is None:
+            fallback_cost = cost
+        spec = FeatureSpec(name, (func,) + args, tuple(tags), cost,
+                           batch_func, doc, fallback, fallback_cost)
+        self.specs[name] = spec
+        self.graph[name] = spec.task
+        self.tags[name] = list(spec.tags)
+        return spec
+
+    def register_graph(self, graph, docs=None, **kwargs):
+        """Add all tasks of a dask graph `{name: (func, *args)}` to the
+        registry, with common metadata `kwargs` (see `register`); `docs` may
+        map feature names to descriptions.
+        """
+        docs = docs or {}
+        for name, task in graph.items():
+            self.register(name, *task, doc=docs.get(name), **kwargs)
+
+    def required(self, features, graph=None):
+        """Names of all nodes needed to compute `features` (including the
+        features themselves).
+
+        If given, `graph` is used to look up dependencies instead of the
+        registered tasks, e.g. for graphs with additional custom features.
+        """
+        graph = self.graph if graph is None else graph
+        needed = set()
+        stack = list(features)
+        while stack:
+            key = stack.pop()
+            if key in needed or key not in graph:
+                continue
+            needed.add(key)
+            stack.extend(get_dependencies(graph, key))
+        return needed
+
+    def node_costs(self, features, n_epochs, baseline=None, graph=None):
+        """Estimated run time of each node needed to compute `features` for
+        series of `n_epochs` spanning `baseline` (scalars or arrays); nodes
+        missing from the registry are assumed to have `DEFAULT_COST`.
+        """
+        graph = self.graph if graph is None else graph
+        return {name: (self.specs[name].cost if name in self.specs
+                       else DEFAULT_COST).estimate(n_epochs, baseline)
+                for name in self.required(features, graph)
+                if istask(graph[name])}
+
+    def cost(self, features, n_epochs, baseline=None, graph=None):
+        """Estimated total run time of computing `features` for series of
+        `n_epochs` spanning `baseline` (scalars or arrays); shared
+        dependencies are counted once.
+        """
+        return sum(self.node_costs(features, n_epochs, baseline,
+                                   graph).values(), 0.)
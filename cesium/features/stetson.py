@@ -17,14 +17,15 @@ def stetson_mean(x, weight=100., alpha=2., beta=2., tol=1.e-6, nmax=20):
     return mu
 
 
-def stetson_j(x, y=[], dx=0.1, dy=0.1):
+def stetson_j(x, y=[], dx=0.1, dy=0.1, x0=None):
     """
     Robust covariance statistic between pairs of observations x,y
     whose uncertainties are dx,dy. If y is not given, calculates a robust
-    variance for x.
+    variance for x. A precomputed `stetson_mean` of x can be passed as x0.
     """
     n = len(x)
-    x0 = stetson_mean(x, 1./dx**2)
+    if x0 is None:
+        x0 = stetson_mean(x, 1./dx**2)
     delta_x = np.sqrt(n / (n - 1.)) * (x - x0) / dx
 
     if (len(y) > 0):
@@ -37,9 +38,106 @@ def stetson_j(x, y=[], dx=0.1, dy=0.1):
     return np.mean(np.sign(p_k) * np.sqrt(np.abs(p_k)))
 
 
-def stetson_k(x, dx=0.1):
+def stetson_k(x, dx=0.1, x0=None):
     """A robust kurtosis statistic."""
     n = len(x)
-    x0 = stetson_mean(x, 1./dx**2)
+    if x0 is None:
+        x0 = stetson_mean(x, 1./dx**2)
     delta_x = np.sqrt(n / (n - 1.)) * (x - x0) / dx
     return 1. / 0.798 * np.mean(np.abs(delta_x)) / np.sqrt(np.mean(delta_x**2))
+
+
+def _pad_batch(x):
+    """Convert a batch of series into a NaN-padded 2d array.
+
+    `x` can be a (n_series, n) array, possibly padded with NaNs, or a list of
+    1d arrays of different lengths. Returns the padded array along with a
+    boolean mask of valid entries.
+    """
+    if isinstance(x, np.ndarray) and x.ndim == 2:
+        padded = x.astype('float64')
+    else:
+        lengths = [len(x_i) for x_i in x]
+        padded = np.full((len(x), max(lengths) if lengths else 0), np.nan)
+        for i, x_i in enumerate(x):
+            padded[i, :lengths[i]] = x_i
+    return padded, ~np.isnan(padded)
+
+
+def stetson_mean_batch(x, weight=100., alpha=2., beta=2., tol=1.e-6, nmax=20):
+    """Compute `stetson_mean` for a batch of series simultaneously.
+
+    The reweighting iterations are applied to all series at once; series
+    whose means have converged are masked out of subsequent updates, so each
+    result matches the value computed by `stetson_mean` for that series.
+
+    Parameters
+    ----------
+    x : (n_series, n) array or list of (n_i,) arrays
+        Batch of series; 2d arrays may be padded with NaNs.
+    weight : float or (n_series,) array, optional
+        Inverse variance weight(s) of the observations.
+
+    Returns
+    -------
+    (n_series,) array
+        Iteratively weighted mean of each series.
+    """
+    x, mask = _pad_batch(x)
+    weight = np.broadcast_to(np.asarray(weight, dtype='float64'),
+                             (len(x),))[:, np.newaxis]
+    counts = mask.sum(axis=1)
+    x_filled = np.where(mask, x, 0.)
+
+    mu = np.nanmedian(x, axis=1) if x.size else np.zeros(len(x))
+    active = counts > 0
+    for i in range(nmax):
+        if not active.any():
+            break
+        rows = np.flatnonzero(active)
+        resid_err = (np.abs(x_filled[rows] - mu[rows, np.newaxis])
+                     * np.sqrt(weight[rows]))
+        weight1 = np.where(mask[rows],
+                           weight[rows] / (1. + (resid_err / alpha)**beta), 0.)
+        weight1 /= (weight1.sum(axis=1) / counts[rows])[:, np.newaxis]
+        diff = (x_filled[rows] * weight1).sum(axis=1) / counts[rows] - mu[rows]
+        mu[rows] += diff
+        converged = ((np.abs(diff) < tol * np.abs(mu[rows])) |
+                     (np.abs(diff) < tol))
+        active[rows[converged]] = False
+
+    return mu
+
+
+def _stetson_deltas_batch(x, dx=0.1, x0=None):
+    """Normalized residuals from the Stetson mean for a batch of series."""
+    x, mask = _pad_batch(x)
+    n = mask.sum(axis=1)[:, np.newaxis]
+    if x0 is None:
+        x0 = stetson_mean_batch(x, 1./dx**2)
+    delta_x = np.sqrt(n / (n - 1.)) * (x - np.asarray(x0)[:, np.newaxis]) / dx
+    return delta_x, mask
+
+
+def stetson_j_batch(x, dx=0.1, x0=None):
+    """Compute `stetson_j` (robust variance form) for a batch of series.
+
+    See `stetson_mean_batch` for the accepted input formats; a precomputed
+    array of Stetson means can be passed as `x0`.
+    """
+    delta_x, mask = _stetson_deltas_batch(x, dx, x0)
+    p_k = np.where(mask, delta_x**2 - 1., 0.)
+    return (np.sign(p_k) * np.sqrt(np.abs(p_k))).sum(axis=1) / mask.sum(axis=1)
+
+
+def stetson_k_batch(x, dx=0.1, x0=None):
+    """Compute `stetson_k` for a batch of series.
+
+    See `stetson_mean_batch` for the accepted input formats; a precomputed
+    array of Stetson means can be passed as `x0`.
+    """
+    delta_x, mask = _stetson_deltas_batch(x, dx, x0)
+    delta_x = np.where(mask, delta_x, 0.)
+    n = mask.sum(axis=1)
+    return (1. / 0.798 * (np.abs(delta_x).sum(axis=1) / n) /
+            np.sqrt((delta_x**2).sum(axis=1) / n))
@@ -102,7 +102,7 @@ def test_lcmodel():
 
 
 def test_lomb_scargle_fast_regular():
-    """Test gatspy's fast Lomb-Scargle period estimate on regularly-sampled
+    """Test fast Lomb-Scargle period estimate on regularly-sampled
     periodic data.
 
     Note: this model fits only a single sinusoid with no additional harmonics,
@@ -118,7 +118,7 @@ def test_lomb_scargle_fast_regular():
 
 
 def test_lomb_scargle_fast_irregular():
-    """Test gatspy's fast Lomb-Scargle period estimate on irregularly-sampled
+    """Test fast Lomb-Scargle period estimate on irregularly-sampled
     periodic data.
 
     Note: this model fits only a single sinusoid with no additional harmonics,
@@ -133,6 +133,41 @@ def test_lomb_scargle_fast_irregular():
     npt.assert_allclose(f['period_fast'], 1. / frequencies[0], rtol=3e-2)
 
 
+def test_lomb_scargle_fast_reference():
+    """Test fast Lomb-Scargle period estimate against the values returned by
+    gatspy's LombScargleFast for the sample time series."""
+    from cesium import data_management
+    data_dir = os.path.join(os.path.dirname(__file__), 'data')
+    expected = {'257141.dat': 27.448091498509122,
+                '245486.dat': 22.916348882185687,
+                '247327.dat': 348.582432044199}
+    for filename, period in expected.items():
+        t, m, e = data_management.parse_ts_data(os.path.join(data_dir,
+                                                             filename))
+        f = generate_features(t, m, e, ['period_fast'])
+        npt.assert_allclose(f['period_fast'], period, rtol=1e-10)
+
+
+def test_fast_lomb_scargle_periodogram():
+    """Test FFT-based periodogram against direct floating-mean least squares."""
+    from cesium.features.lomb_scargle_fast import fast_lomb_scargle
+    times, values, errors = irregular_random(size=200)
+    errors += 0.1
+    f0, df, numf = 0.05, 0.01, 300
+    power = fast_lomb_scargle(times, values, errors, f0, df, numf)
+
+    w = 1. / errors**2
+    chi2_ref = np.sum(w * (values - np.average(values, weights=w))**2)
+    expected = np.zeros(numf)
+    for i, freq in enumerate(f0 + df * np.arange(numf)):
+        X = np.vstack((np.ones_like(times), np.sin(2 * np.pi * freq * times),
+                       np.cos(2 * np.pi * freq * times))).T
+        coef = np.linalg.lstsq(X * np.sqrt(w)[:, None], values * np.sqrt(w),
+                               rcond=-1)[0]
+        expected[i] = 1. - np.sum(w * (values - X.dot(coef))**2) / chi2_ref
+    npt.assert_allclose(power, expected, atol=1e-3)
+
+
 def test_max():
     """Test maximum value feature."""
     times, values, errors = irregular_random()
@@ -212,6 +247,91 @@ def test_qso_features():
     npt.assert_allclose(f['qso_log_chi2nuNULL_chi2nu'], -0.456526327522)
 
 
+
+def test_qso_batch():
+    """Test batched QSO model fit against single-series fits."""
+    from cesium.features import qso_model
+    series = [irregular_random(seed=i, size=size)
+              for i, size in enumerate([50, 13, 201])]
+    times, values, errors = zip(*series)
+    batch = qso_model.qso_fit_batch(times, values, errors, return_model=True)
+    for (t, m, e), fit in zip(series, batch):
+        single = qso_model.qso_fit(t, m, e, return_model=True)
+        for key in ['log_chi2_qsonu', 'log_chi2nuNULL_chi2nu', 'signif_vary',
+                    'model', 'dmodel']:
+            npt.assert_allclose(fit[key], single[key])
+    npt.assert_allclose(batch[0]['log_chi2_qsonu'], 6.9844064754)
+
+    # Inverse band agrees with the recursive Cholesky-based computation
+    from scipy.linalg import cholesky_banded
+    state = np.random.RandomState(0)
+    ab = np.vstack((state.uniform(-1, 1, 20), state.uniform(2, 3, 20)))
+    npt.assert_allclose(qso_model.tridiag_inverse_band(ab)[:, 1:],
+                        qso_model.chol_inverse_diag(cholesky_banded(ab))[:, 1:])
+
+
+def drw_series(state, tau, lvar, baseline, size=200, n_series=20):
+    """Damped random walks observed at random times with errors of 0.02."""
+    s2 = 0.5 * 10**lvar * tau
+    times, values, errors = [], [], []
+    for i in range(n_series):
+        t = np.sort(state.uniform(0., baseline, size))
+        r = np.exp(-np.diff(t) / tau)
+        x = np.empty(len(t))
+        x[0] = state.normal(0., np.sqrt(s2))
+        for j in range(1, len(t)):
+            x[j] = (r[j - 1] * x[j - 1] +
+                    state.normal(0., np.sqrt(s2 * (1. - r[j - 1]**2))))
+        times.append(t)
+        values.append(19. + x + state.normal(0., 0.02, len(t)))
+        errors.append(np.full(len(t), 0.02))
+    return times, values, errors
+
+
+def test_qso_drw_fit():
+    """Test damped random walk likelihood gradient and parameter recovery."""
+    from cesium.features import qso_model
+    state = np.random.RandomState(0)
+    tau, lvar = 100., -3.
+    times, values, errors = drw_series(state, tau, lvar, 2000.)
+
+    f, grad = qso_model.drw_likelihood_batch(times, values, errors, 1.7, -2.8,
+                                             gradient=True)
+    h = 1e-6
+    f_tau = qso_model.drw_likelihood_batch(times, values, errors, 1.7 + h, -2.8)
+    f_var = qso_model.drw_likelihood_batch(times, values, errors, 1.7, -2.8 + h)
+    npt.assert_allclose(grad[:, 0], (f_tau - f) / h, rtol=1e-3, atol=1e-2)
+    npt.assert_allclose(grad[:, 1], (f_var - f) / h, rtol=1e-3, atol=1e-2)
+
+    fits = qso_model.qso_drw_fit_batch(times, values, errors)
+    npt.assert_allclose(np.median([fit['ltau'] for fit in fits]),
+                        np.log10(tau), atol=0.15)
+    npt.assert_allclose(np.median([fit['lvar'] for fit in fits]), lvar,
+                        atol=0.15)
+    single = qso_model.qso_drw_fit(times[0], values[0], errors[0])
+    npt.assert_allclose(single['tau'], fits[0]['tau'])
+    assert all(fit['neg2_loglike'] <= f_i for fit, f_i in zip(fits, f))
+
+
+def test_qso_drw_fit_bounds():
+    """Test fits of short damped random walk timescales and of timescales
+    outside the fitted range."""
+    from cesium.features import qso_model
+    state = np.random.RandomState(0)
+    tau, lvar = 0.2, -1.
+    times, values, errors = drw_series(state, tau, lvar, 50.)
+    fits = qso_model.qso_drw_fit_batch(times, values, errors)
+    ltau = np.array([fit['ltau'] for fit in fits])
+    assert np.isfinite(ltau).all() and (ltau < 0.).all()
+    npt.assert_allclose(np.median(ltau), np.log10(tau), atol=0.15)
+
+    # Fits at a bound of the timescale range are not maxima
+    fits = qso_model.qso_drw_fit_batch(times, values, errors,
+                                       ltau_range=(0., 4.))
+    assert all(np.isnan(fit['tau']) and np.isnan(fit['sigma'])
+               for fit in fits)
+
+
 def test_skew():
     """Test statistical skew feature."""
     from scipy import stats
@@ -219,6 +339,9 @@ def test_skew():
     f = generate_features(times, values, errors, ['skew'])
     npt.assert_allclose(f['skew'], stats.skew(values))
 
+    f = generate_features(times, np.ones_like(values), errors, ['skew'])
+    assert np.isnan(f['skew'])
+
 
 def test_std():
     """Test standard deviation feature."""
@@ -247,6 +370,26 @@ def test_stetson():
     npt.assert_allclose(f['stetson_k'], 1.0087218792719013)
 
 
+def test_stetson_batch():
+    """Test batched Stetson features against single-series values."""
+    from cesium.features import stetson
+    batch = [irregular_random(seed=i, size=size)[1]
+             for i, size in enumerate([201, 50, 13])]
+    means = stetson.stetson_mean_batch(batch)
+    npt.assert_allclose(means, [stetson.stetson_mean(x) for x in batch])
+    npt.assert_allclose(stetson.stetson_j_batch(batch, x0=means),
+                        [stetson.stetson_j(x) for x in batch])
+    npt.assert_allclose(stetson.stetson_k_batch(batch),
+                        [stetson.stetson_k(x) for x in batch])
+
+    # NaN-padded 2d input is equivalent to a ragged list
+    padded = np.full((len(batch), 201), np.nan)
+    for i, x in enumerate(batch):
+        padded[i, :len(x)] = x
+    npt.assert_allclose(stetson.stetson_j_batch(padded),
+                        [stetson.stetson_j(x) for x in batch])
+
+
 def test_weighted_average():
     """Test weighted average and distance from weighted average features."""
     times, values, errors = irregular_random()
@@ -264,3 +407,24 @@ def test_weighted_average():
                                       ['percent_beyond_1_std'])
     npt.assert_equal(f['percent_beyond_1_std'],
                      np.mean(np.abs(stds_from_weighted_avg) > 1.))
+
+
+def test_merge_moments():
+    """Test that moments merged across chunks match the full data."""
+    from cesium.features import common_functions as cf
+    times, values, errors = irregular_random(size=201)
+    full = cf.compute_moments(values, errors)
+    merged = cf.compute_moments(values[:0], errors[:0])
+    for start, stop in [(0, 17), (17, 100), (100, 101), (101, 201)]:
+        merged = cf.merge_moments(merged, cf.compute_moments(values[start:stop],
+                                                             errors[start:stop]))
+    assert merged['n'] == full['n']
+    for key in full:
+        npt.assert_allclose(merged[key], full[key])
+
+    npt.assert_allclose(cf.get_mean(merged), np.mean(values))
+    npt.assert_allclose(cf.get_std(merged), np.std(values))
+    npt.assert_allclose(cf.get_skew(merged), cf.skew(values))
+    npt.assert_allclose(cf.get_weighted_std_dev(merged),
+                        cf.weighted_std_dev(values, errors))
+    npt.assert_allclose(cf.get_std_err(merged), np.std(errors))
@@ -44,3 +44,81 @@ def test_feature_generation():
 
     npt.assert_equal(features_extracted, features_expected)
     npt.assert_array_almost_equal(values_computed, values_expected)
+
+
+def test_lomb_scargle_model_size():
+    """Test that Lomb-Scargle model size adapts to the requested features."""
+    import dask
+    import pytest
+    from cesium.features.tests.util import irregular_periodic
+    frequencies = np.array([2.1, 5.3, 0.4])
+    amplitudes = np.array([[4, 2, 1, 0.5, 0.2, 0.1], [1, 0.5, 0, 0, 0, 0],
+                           [0.5, 0, 0, 0, 0, 0]])
+    t, m, e = irregular_periodic(frequencies, amplitudes, 0.1)
+    full = generate_features(t, m, e, ['freq1_amplitude1', 'freq2_freq',
+                                       'freq1_signif'])
+
+    features = ['freq1_amplitude1', 'freq2_freq', 'freq1_signif']
+    graph = graphs.generate_dask_graph(t, m, e, features)
+    assert graph['_lomb_model'][5:] == (8, 2)
+    npt.assert_allclose(dask.get(graph, features),
+                        [full[f] for f in features])
+
+    graph = graphs.generate_dask_graph(t, m, e, ['freq1_freq', 'freq_varrat'])
+    assert graph['_lomb_model'][5:] == (8, 1)
+    graph = graphs.generate_dask_graph(t, m, e, ['scatter_res_raw'])
+    assert graph['_lomb_model'][5:] == (8, graphs.LOMB_SCARGLE_NFREQ)
+    graph = graphs.generate_dask_graph(t, m, e, ['freq1_freq', 'custom'])
+    assert graph['_lomb_model'][5:] == (8, graphs.LOMB_SCARGLE_NFREQ)
+
+    # Features for arbitrary frequencies/harmonics are generated on demand
+    graph = graphs.generate_dask_graph(t, m, e, ['freq4_amplitude10',
+                                                 'freq_signif_ratio_41'])
+    assert graph['_lomb_model'][5:] == (10, 4)
+    assert 'freq4_rel_phase10' in graph
+
+    graph = graphs.generate_dask_graph(t, m, e, ['freq1_amplitude2'], nharm=2)
+    assert graph['_lomb_model'][5:] == (2, 1)
+    npt.assert_allclose(dask.get(graph, 'freq1_amplitude2'), 2., rtol=0.1)
+    with pytest.raises(ValueError):
+        graphs.generate_dask_graph(t, m, e, ['freq1_amplitude4'], nharm=2)
+
+
+def test_feature_registry():
+    """Test feature metadata and registration of new features."""
+    import dask
+    import pytest
+    from cesium.features.registry import Cost, FeatureRegistry
+    registry = graphs.feature_registry
+    assert registry.graph is graphs.dask_feature_graph
+    assert registry.tags is graphs.feature_tags
+    for feature in sum(graphs.feature_categories.values(), []):
+        assert feature in registry
+        assert registry[feature].description
+        assert registry[feature].picklable
+    assert registry['_qso_drw_fit'].vectorized
+    assert not registry['n_epochs'].vectorized
+
+    # Shared dependencies are only counted once
+    n_epochs = [100, 10000]
+    cost = registry.cost(['freq1_freq', 'freq1_amplitude1'], n_epochs)
+    npt.assert_allclose(cost,
+                        registry['_lomb_model'].cost.estimate(n_epochs) +
+                        2 * registry['freq1_freq'].cost.estimate(n_epochs))
+    assert cost[1] > cost[0]
+    assert (registry.cost(['_lomb_model'], 1000) >
+            registry.cost(graphs.CADENCE_FEATS, 1000))
+
+    registry = FeatureRegistry()
+    registry.register('_range', np.ptp, 'm', tags=['General'])
+    registry.register('half_range', lambda x: x / 2., '_range',
+                      cost=Cost(1e-6))
+    assert not registry['half_range'].picklable
+    assert registry.required(['half_range']) == {'half_range', '_range'}
+    graph = dict(registry.graph, m=np.array([1., 3., 4.]))
+    assert dask.get(graph, 'half_range') == 1.5
+    with pytest.raises(ValueError):
+        registry.register('_range', np.ptp, 'm')
+    registry.register('_range', np.max, 'm', replace=True)
+    assert registry['_range'].func is np.max
+    assert registry.tags == {'_range': [], 'half_range': []}
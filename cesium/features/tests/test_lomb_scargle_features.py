@@ -229,3 +229,78 @@ def test_scatter_res_raw():
     value_mad = np.median(np.abs(values - np.median(values)))
     f = generate_features(times, values, errors, ['scatter_res_raw'])
     npt.assert_allclose(f['scatter_res_raw'], resid_mad / value_mad, atol=3e-2)
+
+
+def brute_force_periodic_model(A, ph, step=1e-5):
+    """Extremum features of the harmonic model found by walking along a dense
+    phase grid from each starting point to the extremum it climbs to."""
+    t = np.arange(-1., 3., step)
+    f = sum(A_j * np.sin(2. * np.pi * (j + 1) * t + ph_j)
+            for j, (A_j, ph_j) in enumerate(zip(A, ph)))
+
+    def climb(t0, is_max):
+        sign = 1. if is_max else -1.
+        i = int(round((t0 - t[0]) / step))
+        direction = 1 if sign * (f[i + 1] - f[i]) > 0 else -1
+        while sign * (f[i + direction] - f[i]) > 0:
+            i += direction
+        return t[i]
+
+    min_1_a = climb(0.05, True)
+    max_2_a = climb(min_1_a + 0.01, False)
+    min_3_a = climb(max_2_a + 0.01, True)
+    max_4_a = climb(min_3_a + 0.01, False)
+    f_at = lambda x: f[int(round((x - t[0]) / step))]
+    return {'phi1_phi2': (min_3_a - max_2_a) / (max_4_a / min_3_a),
+            'min_delta_mags': abs(f_at(min_1_a) - f_at(min_3_a)),
+            'max_delta_mags': abs(f_at(max_2_a) - f_at(max_4_a))}
+
+
+def test_periodic_model_batch():
+    """Test extremum features of the harmonic model against known values and
+    a brute-force search for the extrema."""
+    from cesium.features import periodic_model
+    # Pure sinusoid: extrema at 0.25 + k and 0.75 + k
+    amplitudes = np.zeros((3, 8))
+    amplitudes[0, 0] = 1.
+    amplitudes[1:] = np.random.RandomState(0).exponential(size=(2, 8))
+    phases = np.random.RandomState(1).uniform(-np.pi, np.pi, (3, 8))
+    phases[0] = 0.
+    batch = periodic_model.periodic_model_batch(amplitudes, phases)
+    npt.assert_allclose(batch[0]['phi1_phi2'], 0.5 / (1.75 / 1.25))
+    npt.assert_allclose(batch[0]['min_delta_mags'], 0., atol=1e-12)
+    npt.assert_allclose(batch[0]['max_delta_mags'], 0., atol=1e-12)
+    for A, ph, fit in zip(amplitudes, phases, batch):
+        expected = brute_force_periodic_model(A, ph)
+        for key in ['phi1_phi2', 'min_delta_mags', 'max_delta_mags']:
+            npt.assert_allclose(fit[key], expected[key], rtol=1e-4, atol=1e-6)
+
+
+def test_folded_lightcurve():
+    """Test shared phase-folding intermediate and its batched variant."""
+    from cesium.features import period_folding
+    times, values, errors = irregular_random()
+    frequencies = np.array([0.3, 1.7, 5.1])
+    folded, sort_inds = period_folding.folded_lightcurve_batch(times,
+                                                               frequencies)
+    for i, frequency in enumerate(frequencies):
+        phase = (times - times.min()) % (1. / frequency)
+        npt.assert_allclose(folded[i], np.sort(phase))
+        npt.assert_allclose(phase[sort_inds[i]], np.sort(phase))
+
+    fold = period_folding.folded_lightcurve(times, frequencies[1])
+    npt.assert_allclose(fold['t_2per_fold'],
+                        np.sort((times - times.min()) % (2. / frequencies[1])))
+    p2p = period_folding.p2p_model(times, values, frequencies[1])
+    p2p_shared = period_folding.p2p_model(times, values, frequencies[1], fold)
+    for key in p2p:
+        npt.assert_allclose(p2p[key], p2p_shared[key])
+
+    lomb_model = lomb_scargle.lomb_scargle_model(times, values, errors)
+    fold = period_folding.folded_lightcurve(
+        times, lomb_model['freq_fits'][0]['freq'])
+    npt.assert_allclose(
+        period_folding.period_folding(times, values, errors,
+                                      lomb_model)['folded_slopes'],
+        period_folding.period_folding(times, values, errors, lomb_model,
+                                      folded=fold)['folded_slopes'])
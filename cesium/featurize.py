@@ -1,24 +1,130 @@
 import copy
+import functools
+import heapq
+import signal
+import threading
+import time
 from collections import Iterable
+import multiprocessing
+from multiprocessing import cpu_count
 import numpy as np
 import pandas as pd
 import dask
 import dask.threaded
 from dask import delayed
-from dask.compatibility import reraise
-from dask.threaded import pack_exception
+from dask.core import get_dependencies, ishashable, istask
 from sklearn.preprocessing import Imputer
 
 from . import time_series
-from .time_series import TimeSeries
-from .features import generate_dask_graph
+from .time_series import TimeSeries, TimeSeriesCollection
+from .store import TimeSeriesStore
+from .transport import SharedTimeSeriesData
+from .windows import window_bounds, window_starts, window_statistics
+from .features import generate_dask_graph, feature_registry
+from .features.lomb_scargle_multiband import lomb_scargle_multiband_model
 
 __all__ = ['featurize_time_series', 'featurize_single_ts',
-           'featurize_ts_files', 'assemble_featureset']
+           'featurize_ts_files', 'assemble_featureset',
+           'estimate_featurization_cost', 'featurize_windows',
+           'TimeBudgetExceeded', 'Featurizer']
+
+
+class TimeBudgetExceeded(Exception):
+    """Value of a feature that was not computed because of a time budget."""
+
+
+class _NodeTimeout(BaseException):
+    """Raised inside a feature function that exceeds its time budget."""
+
+
+def _raise_node_timeout(signum, frame):
+    raise _NodeTimeout()
+
+
+class _TimeBudget(object):
+    """Enforces time budgets while evaluating the feature graph of a single
+    time series channel (see `featurize_single_ts`).
+
+    Each task of the graph is evaluated by `run`, which skips the task if the
+    deadline for the time series has passed, uses the fallback of the feature
+    (if any) instead of the feature function if the latter is predicted to
+    exceed the remaining budget, and, when called in the main thread of a
+    POSIX system, interrupts a feature function that runs for longer than the
+    remaining budget. Skipped and interrupted tasks, and all tasks depending on
+    them, evaluate to `TimeBudgetExceeded`; each such event (or use of a
+    fallback) is recorded in `events`.
+    """
+    def __init__(self, deadline, node_time_budget, n_epochs, baseline,
+                 specs):
+        self.deadline = deadline
+        self.node_time_budget = node_time_budget
+        self.n_epochs = n_epochs
+        self.baseline = baseline
+        self.specs = specs
+        self.events = []
+        self._approximations = []
+
+    def _exceeded(self, key, event):
+        self.events.append((key, event))
+        return TimeBudgetExceeded("Feature '{}' {} (time budget exceeded)"
+                                  .format(key, event))
+
+    def run(self, key, func, *args):
+        for arg in args:
+            if isinstance(arg, TimeBudgetExceeded):
+                return arg
+        limit = min(self.node_time_budget, self.deadline - time.time())
+        if limit <= 0:
+            return self._exceeded(key, 'skipped')
+
+        approximate = False
+        spec = self.specs.get(key)
+        if spec is not None and (
+                spec.cost.estimate(self.n_epochs, self.baseline) > limit):
+            if (spec.fallback is None or spec.fallback_cost.estimate(
+                    self.n_epochs, self.baseline) > limit):
+                return self._exceeded(key, 'skipped')
+            self.events.append((key, 'fallback'))
+            func = spec.fallback
+            approximate = True
+        approximate_input = any(arg is value for arg in args
+                                for value in self._approximations)
+
+        try:
+            result = self._call(func, args, limit)
+        except _NodeTimeout:
+            return self._exceeded(key, 'interrupted')
+        except Exception:
+            # Approximations may lack values used by dependent features
+            if approximate_input:
+                return TimeBudgetExceeded("Feature '{}' unavailable from "
+                                          "approximate inputs".format(key))
+            raise
+        if approximate:
+            self._approximations.append(result)
+        return result
+
+    @staticmethod
+    def _call(func, args, limit):
+        # Signal handlers can only be set in the main thread
+        if (np.isinf(limit) or not hasattr(signal, 'setitimer') or
+                not isinstance(threading.current_thread(),
+                               threading._MainThread)):
+            return func(*args)
+        handler = signal.signal(signal.SIGALRM, _raise_node_timeout)
+        signal.setitimer(signal.ITIMER_REAL, limit)
+        try:
+            return func(*args)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM,
+                          signal.SIG_DFL if handler is None else handler)
 
 
 def featurize_single_ts(ts, features_to_use, custom_script_path=None,
-                        custom_functions=None, raise_exceptions=True):
+                        custom_functions=None, raise_exceptions=True,
+                        multiband=False, time_budget=None,
+                        node_time_budget=None):
     """Compute feature values for a given single time-series. Data is
     returned as dictionaries/lists of lists.
 
@@ -40,72 +146,394 @@ def featurize_single_ts(ts, features_to_use, custom_script_path=None,
         If True, exceptions during feature computation are raised immediately;
         if False, exceptions are supressed and `np.nan` is returned for the
         given feature and any dependent features. Defaults to True.
+    multiband : bool, optional
+        If True, Lomb-Scargle features of multichannel time series are
+        computed from a single joint fit with frequencies shared by all
+        channels (see `lomb_scargle_multiband_model`) rather than from
+        independent fits of each channel. Defaults to False.
+    time_budget : float, optional
+        Maximum time (in seconds) to spend on the time series. Features that
+        would exceed the remaining budget are replaced by a cheaper
+        approximation where one is available (see
+        `cesium.features.registry.FeatureSpec`), or are not computed. Features
+        that are not computed, or whose computation is interrupted after
+        exceeding the budget, are set to `np.nan`, along with any dependent
+        features, regardless of `raise_exceptions`. Interruption is only
+        possible when running in the main thread (e.g. with the synchronous or
+        multiprocessing schedulers); otherwise the budget is enforced between
+        features. Defaults to None (no limit).
+    node_time_budget : float, optional
+        Maximum time (in seconds) to spend on any single feature (or
+        intermediate value), enforced as for `time_budget`. Defaults to None
+        (no limit).
 
     Returns
     -------
     dict
         Dictionary with feature names as keys, lists of feature values (one per
-        channel) as values.
+        channel) as values. If a time budget is given, the number of features
+        (or intermediate values) per channel that were skipped, interrupted or
+        approximated is included as `time_budget_exceeded`.
+    """
+    feature_values = _featurize_single_ts_values(
+        ts, features_to_use, custom_script_path, custom_functions,
+        raise_exceptions, multiband, time_budget, node_time_budget)
+    index = pd.MultiIndex.from_product(
+        (_output_feature_names(features_to_use, time_budget, node_time_budget),
+         range(ts.n_channels)), names=('feature', 'channel'))
+    return pd.Series(feature_values.ravel(), index=index)
+
+
+def _output_feature_names(features_to_use, time_budget=None,
+                          node_time_budget=None):
+    """Names of the features returned by `featurize_single_ts`."""
+    feature_names = list(features_to_use)
+    if time_budget is not None or node_time_budget is not None:
+        feature_names.append('time_budget_exceeded')
+    return feature_names
+
+
+def _featurize_single_ts_values(ts, features_to_use, custom_script_path=None,
+                                custom_functions=None, raise_exceptions=True,
+                                multiband=False, time_budget=None,
+                                node_time_budget=None):
+    """Compute the features of `featurize_single_ts` as a plain
+    (n_features, n_channels) array, with features ordered as in
+    `_output_feature_names`.
+    """
+    return _FeaturePlan(features_to_use, custom_functions, raise_exceptions,
+                        multiband, time_budget, node_time_budget).values(ts)
+
+
+def _batch_plan(features_to_use, custom_script_path=None,
+                custom_functions=None, raise_exceptions=True, multiband=False,
+                time_budget=None, node_time_budget=None):
+    """`_FeaturePlan` for the arguments of `_featurize_single_ts_values`,
+    shared by all time series of a batch."""
+    return _FeaturePlan(features_to_use, custom_functions, raise_exceptions,
+                        multiband, time_budget, node_time_budget)
+
+
+def _schedule(graph, keys):
+    """Tasks of `graph` needed to compute `keys`, as a list of `(key, task)`
+    in which every task follows the tasks it depends on."""
+    order = []
+    visited = set()
+
+    def visit(key):
+        if key in visited or key not in graph:
+            return
+        visited.add(key)
+        for dependency in get_dependencies(graph, key):
+            visit(dependency)
+        if istask(graph[key]):
+            order.append((key, graph[key]))
+
+    for key in keys:
+        visit(key)
+    return order
+
+
+def _evaluate(arg, cache):
+    """Value of a task argument given the values `cache` of graph keys,
+    following the conventions of dask graphs."""
+    if istask(arg):
+        return arg[0](*[_evaluate(a, cache) for a in arg[1:]])
+    elif isinstance(arg, list):
+        return [_evaluate(a, cache) for a in arg]
+    elif ishashable(arg) and arg in cache:
+        return cache[arg]
+    else:
+        return arg
+
+
+# Maximum number of time series whose vectorized nodes are evaluated at once
+VECTORIZED_BATCH_SIZE = 256
+
+
+class _FeaturePlan(object):
+    """Precompiled evaluation of a fixed list of features.
+
+    The feature graph (including any custom features) is generated and
+    reduced to the tasks needed for `features_to_use` once, in dependency
+    order, so that featurizing each channel of a time series only requires
+    evaluating these tasks in turn. See `featurize_single_ts` for the
+    parameters.
     """
-    # Initialize empty feature array for all channels
-    feature_values = np.empty((len(features_to_use), ts.n_channels))
-    for (t_i, m_i, e_i), i in zip(ts.channels(), range(ts.n_channels)):
-        feature_graph = generate_dask_graph(t_i, m_i, e_i)
-        feature_graph.update(ts.meta_features)
+    def __init__(self, features_to_use, custom_functions=None,
+                 raise_exceptions=True, multiband=False, time_budget=None,
+                 node_time_budget=None):
+        self.features_to_use = list(features_to_use)
+        self.raise_exceptions = raise_exceptions
+        self.multiband = multiband
+        self.time_budget = time_budget
+        self.node_time_budget = node_time_budget
+        self.use_budget = (time_budget is not None or
+                           node_time_budget is not None)
 
+        graph = generate_dask_graph(None, None, None, self.features_to_use)
         if custom_functions:
             # If values in custom_functions are functions, add calls to graph
             if all(hasattr(v, '__call__') for v in custom_functions.values()):
-                feature_graph.update({feat: f(t_i, m_i, e_i)
-                                      for feat, f in custom_functions.items()})
+                graph.update({feat: (f, 't', 'm', 'e')
+                              for feat, f in custom_functions.items()})
             # Otherwise, custom_functions is another dask graph
             else:
-                feature_graph.update(custom_functions)
+                graph.update(custom_functions)
+        self.graph = graph
+        self.tasks = _schedule(graph, self.features_to_use)
+        # Registered nodes (unless replaced by custom functions), whose costs
+        # and fallbacks are used to enforce time budgets
+        self.specs = {key: feature_registry[key] for key, task in graph.items()
+                      if key in feature_registry and istask(task) and
+                      task[0] is feature_registry[key].func}
+        self.constants = {key: value for key, value in graph.items()
+                          if not istask(value)}
 
-        # Do not execute in parallel; parallelization has already taken place
-        # at the level of time series, so we compute features for a single time
-        # series in serial.
-        if raise_exceptions:
-            raise_callback = reraise
-        else:
-            raise_callback = lambda e, tb: None
-        dask_values = dask.get(feature_graph, features_to_use,
-                               raise_exception=raise_callback,
-                               pack_exception=pack_exception)
-        feature_values[:, i] = [x if not isinstance(x, Exception) else np.nan
-                                for x in dask_values]
-    index = pd.MultiIndex.from_product((features_to_use, range(ts.n_channels)),
-                                       names=('feature', 'channel'))
-    return pd.Series(feature_values.ravel(), index=index)
+    @property
+    def feature_names(self):
+        return _output_feature_names(self.features_to_use, self.time_budget,
+                                     self.node_time_budget)
+
+    def values(self, ts, precomputed=None):
+        """Feature values of `ts` as an (n_features, n_channels) array, with
+        features ordered as in `feature_names`; `precomputed` may give the
+        values of some nodes of the feature graph for each channel, as a list
+        of dictionaries (see `batch_values`)."""
+        # The joint model is only fit if some channel requires `_lomb_model`;
+        # tasks keep the arguments of the single-band fit of each channel, so
+        # that the registered fallback can be used under a time budget, and
+        # any further arguments (`sys_err`, `nharm`, `nfreq`) are passed on
+        multiband_models = []
+
+        def multiband_lomb_model(i, t, m, e, *args):
+            if not multiband_models:
+                multiband_models.extend(lomb_scargle_multiband_model(
+                    *(tuple(zip(*ts.channels())) + args)))
+            return multiband_models[i]
+
+        tasks = self.tasks
+        # Metafeatures replace any features of the same name
+        if any(key in self.graph for key in ts.meta_features):
+            graph = dict(self.graph)
+            graph.update(ts.meta_features)
+            tasks = _schedule(graph, self.features_to_use)
+
+        deadline = time.time() + (np.inf if self.time_budget is None
+                                  else self.time_budget)
+        feature_values = np.empty((len(self.feature_names), ts.n_channels))
+        for i, (t_i, m_i, e_i) in enumerate(ts.channels()):
+            channel_tasks = tasks
+            if self.multiband and ts.n_channels > 1:
+                channel_tasks = [(key, (functools.partial(
+                                      multiband_lomb_model, i),) + task[1:]
+                                  if key == '_lomb_model' else task)
+                                 for key, task in tasks]
+            cache = dict(self.constants)
+            if precomputed is not None:
+                channel_tasks = [(key, task) for key, task in channel_tasks
+                                 if key not in precomputed[i]]
+                cache.update(precomputed[i])
+            cache.update(ts.meta_features)
+            cache.update({'t': t_i, 'm': m_i, 'e': e_i})
+            feature_values[:, i] = self._evaluate_tasks(channel_tasks, cache,
+                                                        deadline)
+        return feature_values
+
+    def batch_values(self, ts_list):
+        """Feature values of each time series of `ts_list` (see `values`).
+
+        Nodes with a vectorized variant (see `FeatureSpec.batch_func`) are
+        evaluated for all channels of up to `VECTORIZED_BATCH_SIZE` series at
+        once.
+        """
+        ts_list = list(ts_list)
+        return [self.values(ts, precomputed) for ts, precomputed in
+                zip(ts_list, self.batch_precomputed(ts_list))]
+
+    def batch_precomputed(self, ts_list):
+        """Values of the vectorized nodes (see `_batch_values`) for each
+        channel of each time series of `ts_list`, as a list (one entry per
+        series) of lists of dictionaries (one per channel), to be passed to
+        `values`."""
+        precomputed = []
+        for start in range(0, len(ts_list), VECTORIZED_BATCH_SIZE):
+            chunk = ts_list[start:start + VECTORIZED_BATCH_SIZE]
+            channels = [channel for ts in chunk for channel in ts.channels()]
+            batched = self._batch_values(self.tasks, channels)
+            offset = 0
+            for ts in chunk:
+                precomputed.append([{key: values[offset + i]
+                                     for key, values in batched.items()}
+                                    for i in range(ts.n_channels)])
+                offset += ts.n_channels
+        return precomputed
+
+    def _batch_values(self, tasks, channels):
+        """Values of the nodes among `tasks` that have a vectorized variant
+        (see `FeatureSpec.batch_func`) and only depend on `t`, `m` and `e`,
+        computed for all `channels` (a list of `(t, m, e)`) at once.
+
+        Returns a dictionary of lists of values, one per channel. Nodes whose
+        batched evaluation fails are left out, so that they are evaluated
+        (and fail, if need be) separately for each channel. Time budgets
+        apply to each series separately, so no nodes are batched if a budget
+        is set.
+        """
+        if self.use_budget or len(channels) < 2:
+            return {}
+        inputs = dict(zip(['t', 'm', 'e'], [list(x) for x in zip(*channels)]))
+        batched = {}
+        for key, task in tasks:
+            spec = self.specs.get(key)
+            if (spec is None or not spec.vectorized or
+                    not set(get_dependencies(self.graph, key)) <= set(inputs)):
+                continue
+            args = [inputs[arg] if ishashable(arg) and arg in inputs else arg
+                    for arg in task[1:]]
+            try:
+                batched[key] = list(spec.batch_func(*args))
+            except Exception:
+                continue
+        return batched
+
+    def window_values(self, t, m, e, starts, ends, meta_features={}):
+        """Feature values of the windows `t[starts[k]:ends[k]]` (and likewise
+        for `m` and `e`) of a single channel, as an (n_windows, n_features)
+        array.
+
+        Features that can be computed for all windows at once (see
+        `cesium.windows.window_statistics`), as well as nodes with a
+        vectorized variant, are filled in directly, so that only the remaining
+        tasks are evaluated for each window. Windows must contain at least one
+        value.
+        """
+        stats = window_statistics([key for key, task in
+                                   self._remaining_tasks(meta_features)],
+                                  t, m, e, starts, ends)
+        stats.update(self._batch_values(
+            self._remaining_tasks(meta_features, stats),
+            [(t[start:end], m[start:end], e[start:end])
+             for start, end in zip(starts, ends)]))
+        tasks = self._remaining_tasks(meta_features, stats)
+
+        deadline = time.time() + (np.inf if self.time_budget is None
+                                  else self.time_budget)
+        feature_values = np.empty((len(starts), len(self.feature_names)))
+        for k, (start, end) in enumerate(zip(starts, ends)):
+            cache = dict(self.constants)
+            cache.update(meta_features)
+            cache.update({'t': t[start:end], 'm': m[start:end],
+                          'e': e[start:end]})
+            cache.update({key: values[k] for key, values in stats.items()})
+            feature_values[k] = self._evaluate_tasks(tasks, cache, deadline)
+        return feature_values
+
+    def precomputed_values(self, precomputed):
+        """Feature values given the values `precomputed` of some nodes of the
+        feature graph (which may include the inputs `t`, `m` and `e`), as a
+        list ordered as `feature_names`.
+
+        Only the tasks needed to compute the features from these values are
+        evaluated.
+        """
+        cache = dict(self.constants)
+        cache.update(precomputed)
+        return self._evaluate_tasks(self._remaining_tasks(precomputed), cache,
+                                    np.inf)
+
+    def _remaining_tasks(self, *precomputed):
+        """Tasks needed to compute the features, in order, given the values of
+        the keys of the dictionaries `precomputed`."""
+        graph = dict(self.graph)
+        for values in precomputed:
+            graph.update(dict.fromkeys(values))
+        return _schedule(graph, self.features_to_use)
+
+    def _evaluate_tasks(self, tasks, cache, deadline):
+        """Evaluate `tasks` in order given the values `cache` of the input
+        arrays `t`, `m`, `e` (and any other precomputed keys), returning the
+        values of `feature_names`."""
+        budget = None
+        if self.use_budget:
+            budget = _TimeBudget(deadline, np.inf if self.node_time_budget
+                                 is None else self.node_time_budget,
+                                 len(cache['t']), np.ptp(cache['t']),
+                                 self.specs)
+        for key, task in tasks:
+            cache[key] = self._run(key, task, cache, budget)
+        values = [np.nan if isinstance(cache[feature], Exception)
+                  else cache[feature] for feature in self.features_to_use]
+        if budget is not None:
+            values.append(len(budget.events))
+        return values
+
+    def _run(self, key, task, cache, budget):
+        args = [_evaluate(arg, cache) for arg in task[1:]]
+        # Failures propagate to all dependent features
+        for arg in args:
+            if isinstance(arg, Exception):
+                return arg
+        try:
+            if budget is not None:
+                return budget.run(key, task[0], *args)
+            return task[0](*args)
+        except Exception as e:
+            if self.raise_exceptions:
+                raise
+            return e
 
 
 def assemble_featureset(features_list, time_series=None,
-                        meta_features_list=None, names=None):
+                        meta_features_list=None, names=None,
+                        feature_names=None):
     """Transforms raw feature data (as returned by `featurize_single_ts`) into
     a pd.DataFrame.
 
     Parameters
     ----------
-    features_list : list of pd.Series
+    features_list : list of pd.Series or list of array
         List of series (one per time series file) with (feature name, channel)
-        multiindex.
-    time_series : list of TimeSeries
+        multiindex, or, if `feature_names` is given, list of
+        (n_features, n_channels) arrays of feature values (one per time
+        series).
+    time_series : list of TimeSeries or TimeSeriesCollection
         If provided, the name and metafeatures from the time series objects
         will be used, overriding the `meta_features_list` and `names` values.
     meta_features_list : list of dict
         If provided, the columns of `metadata` will be added to the featureset.
     names : list of str
         If provided, the (row) index of the featureset will be set accordingly.
+    feature_names : list of str, optional
+        Names of the features (rows) of the arrays in `features_list`. The
+        featureset is filled in directly from the arrays, which is much faster
+        than combining series for large numbers of time series; time series
+        with fewer channels than others have missing values for the additional
+        channels.
 
     Returns
     -------
     pd.DataFrame
         DataFrame with columns containing feature values, indexed by name.
     """
-    if time_series is not None:
+    if isinstance(time_series, TimeSeriesCollection):
+        meta_features_list = time_series.meta_features_list()
+        names = time_series.names
+    elif time_series is not None:
         meta_features_list, names = zip(*[(ts.meta_features, ts.name)
                                           for ts in time_series])
-    if len(features_list) > 0:
+    if feature_names is not None:
+        n_channels = max([values.shape[1] for values in features_list] or [1])
+        feature_values = np.full((len(features_list), len(feature_names),
+                                  n_channels), np.nan)
+        for i, values in enumerate(features_list):
+            feature_values[i, :, :values.shape[1]] = values
+        columns = pd.MultiIndex.from_product((feature_names,
+                                              range(n_channels)),
+                                             names=('feature', 'channel'))
+        feat_df = pd.DataFrame(feature_values.reshape(len(features_list), -1),
+                               index=names, columns=columns)
+    elif len(features_list) > 0:
         feat_df = pd.concat(features_list, axis=1, ignore_index=True).T
         feat_df.index = names
     else:
@@ -120,12 +548,163 @@ def assemble_featureset(features_list, time_series=None,
     return feat_df
 
 
+def estimate_featurization_cost(ts, features_to_use):
+    """Estimate the time (in seconds) needed to compute the given features for
+    a time series, based on the number of epochs and time baseline of each
+    channel (see `cesium.features.registry.Cost`).
+
+    Parameters
+    ----------
+    ts : TimeSeries or TimeSeriesCollection object
+        Time series to be featurized.
+    features_to_use : list of str
+        List of feature names to be generated; custom features are not
+        accounted for.
+
+    Returns
+    -------
+    float or array
+        Estimated run time of `featurize_single_ts` (for each time series of
+        a `TimeSeriesCollection`).
+    """
+    if isinstance(ts, TimeSeriesCollection):
+        n_epochs = ts.n_epochs
+        costs = feature_registry.cost(features_to_use, n_epochs,
+                                      ts.baselines())
+        return np.bincount(np.repeat(np.arange(len(ts)), ts.n_channels),
+                           weights=np.broadcast_to(costs, n_epochs.shape),
+                           minlength=len(ts))
+    return sum(feature_registry.cost(features_to_use, len(t), np.ptp(t))
+               for t, m, e in ts.channels())
+
+
+def _balance_batches(costs, n_batches):
+    """Split work items into at most `n_batches` groups of similar total cost.
+
+    Items are assigned in order of decreasing cost to the group with the
+    lowest total so far (longest processing time first), so that each group
+    starts with its most expensive items and any item costing more than an
+    even share of the total ends up in a group of its own.
+
+    Returns a list of lists of item indices, each sorted by decreasing cost.
+    """
+    order = np.argsort(-np.asarray(costs), kind='mergesort')
+    loads = [(0., i) for i in range(min(n_batches, len(costs)))]
+    batches = [[] for load in loads]
+    for j in order:
+        load, i = heapq.heappop(loads)
+        batches[i].append(j)
+        heapq.heappush(loads, (load + costs[j], i))
+    return batches
+
+
+def _subset(time_series, indices):
+    """Time series `indices` of a list of time series or of a
+    `TimeSeriesCollection`."""
+    if isinstance(time_series, TimeSeriesCollection):
+        return time_series.take(indices)
+    return [time_series[i] for i in indices]
+
+
+def _timed_batch_values(plan, ts_list):
+    """Feature values of each time series of `ts_list` (see
+    `_FeaturePlan.batch_values`) along with the time taken for each series;
+    the time spent on vectorized nodes is split between the series in
+    proportion to their number of values."""
+    ts_list = list(ts_list)
+    start = time.time()
+    precomputed = plan.batch_precomputed(ts_list)
+    batch_time = time.time() - start
+    sizes = np.array([sum(len(t) for t, m, e in ts.channels())
+                      for ts in ts_list], dtype='float64')
+    shares = batch_time * sizes / max(sizes.sum(), 1.)
+    results = []
+    for ts, channel_values, share in zip(ts_list, precomputed, shares):
+        start = time.time()
+        features = plan.values(ts, channel_values)
+        results.append((features, time.time() - start + share))
+    return results
+
+
+def _featurize_batch(ts_list, *args):
+    """Featurize a list of time series in order (see `featurize_single_ts`),
+    returning the feature values and the time taken for each series."""
+    return _timed_batch_values(_batch_plan(*args), ts_list)
+
+
+def _featurize_shared_batch(shared, indices, meta_features, *args):
+    """Featurize the time series `indices` of a `SharedTimeSeriesData`
+    in order (see `featurize_single_ts`), storing the feature values in the
+    shared array and returning the time taken for each series."""
+    ts_list = [shared.get(i, meta) for i, meta in zip(indices, meta_features)]
+    results = []
+    for i, (features, elapsed) in zip(indices, _timed_batch_values(
+            _batch_plan(*args), ts_list)):
+        shared.set_features(i, features)
+        results.append((None, elapsed))
+    shared.flush()
+    return results
+
+
 # TODO should this be changed to use TimeSeries objects? or maybe an optional
 # argument for TimeSeries? some redundancy here...
-def featurize_time_series(times, values, errors=None, features_to_use=[],
+def _prepare_inputs(times, values, errors, meta_features, names):
+    """Fill in missing inputs of `featurize_time_series` and convert them to
+    lists of values (one per time series), names and a metafeature
+    DataFrame."""
+    if times is None:
+        times = copy.deepcopy(values)
+        if isinstance(times, np.ndarray) and (times.ndim == 1
+                                              or 1 in times.shape):
+            times[:] = np.linspace(0., time_series.DEFAULT_MAX_TIME,
+                                   times.size)
+        else:
+            for t in times:
+                if isinstance(t, np.ndarray) and (t.ndim == 1 or 1 in t.shape):
+                    t[:] = np.linspace(0., time_series.DEFAULT_MAX_TIME,
+                                       t.size)
+                else:
+                    for t_i in t:
+                        t_i[:] = np.linspace(0., time_series.DEFAULT_MAX_TIME,
+                                             t_i.size)
+
+    if errors is None:
+        errors = copy.deepcopy(values)
+        if isinstance(errors, np.ndarray) and (errors.ndim == 1
+                                               or 1 in errors.shape):
+            errors[:] = time_series.DEFAULT_ERROR_VALUE
+        else:
+            for e in errors:
+                if isinstance(e, np.ndarray) and (e.ndim == 1 or 1 in e.shape):
+                    e[:] = time_series.DEFAULT_ERROR_VALUE
+                else:
+                    for e_i in e:
+                        e_i[:] = time_series.DEFAULT_ERROR_VALUE
+
+    # One single-channel time series:
+    if not isinstance(values[0], Iterable):
+        times, values, errors = [times], [values], [errors]
+    # One multi-channel time series:
+    elif isinstance(values, np.ndarray) and values.ndim == 2:
+        times, values, errors = [times], [values], [errors]
+
+    if names is None:
+        names = np.arange(len(times))
+
+    if isinstance(meta_features, pd.Series):
+        meta_features = meta_features.to_dict()
+    meta_features = pd.DataFrame(meta_features, index=names)
+
+    return times, values, errors, meta_features, names
+
+
+def featurize_time_series(times, values=None, errors=None, features_to_use=[],
                           meta_features={}, names=None,
                           custom_script_path=None, custom_functions=None,
-                          scheduler=dask.threaded.get, raise_exceptions=True):
+                          scheduler=dask.threaded.get, raise_exceptions=True,
+                          multiband=False, balance=False, n_batches=None,
+                          return_costs=False, time_budget=None,
+                          node_time_budget=None, shared_memory=False):
     """Versatile feature generation function for one or more time series.
 
     For a single time series, inputs may have the form:
@@ -150,14 +729,18 @@ def featurize_time_series(times, values, errors=None, features_to_use=[],
     featurized separately, and the index of the output featureset will contain
     a `channel` coordinate.
 
+    Alternatively, `times` may be a `TimeSeriesCollection`, in which case
+    `values`, `errors`, `meta_features` and `names` are taken from the
+    collection.
+
     Parameters
     ----------
-    times : array, list of array, or list of lists of array
+    times : array, list of array, list of lists of array or collection
         Array containing time values for a single time series, or a list of
         arrays each containing time values for a single time series, or a list
         of lists of arrays for multichannel data with different time values per
         channel
-    values : array or list of array
+    values : array or list of array, optional
         Array containing measurement values for a single time series, or a list
         of arrays each containing (possibly multivariate) measurement values
         for a single time series, or a list of lists of arrays for multichannel
@@ -195,73 +778,372 @@ def featurize_time_series(times, values, errors=None, features_to_use=[],
         If True, exceptions during feature computation are raised immediately;
         if False, exceptions are supressed and `np.nan` is returned for the
         given feature and any dependent features. Defaults to True.
+    multiband : bool, optional
+        If True, Lomb-Scargle features of multichannel time series are
+        computed from a joint fit with frequencies shared by all channels.
+        Defaults to False.
+    balance : bool, optional
+        If True, the cost of featurizing each time series is estimated from
+        its length and time baseline (see `estimate_featurization_cost`), and
+        the time series are split into `n_batches` tasks of similar total cost;
+        each task processes its most expensive series first, and series that
+        are more expensive than an even share of the total work are processed
+        in a task of their own. Otherwise each time series is a separate task.
+        Defaults to False.
+    n_batches : int, optional
+        Number of tasks used if `balance` is True; should be the number of
+        workers of `scheduler`. Defaults to the number of CPUs.
+    return_costs : bool, optional
+        If True, also return the predicted and actual computation time of each
+        time series. Defaults to False.
+    time_budget, node_time_budget : float, optional
+        Maximum time (in seconds) to spend on each time series and on each
+        feature of a time series; see `featurize_single_ts`. Defaults to None
+        (no limit).
+    shared_memory : bool, optional
+        If True, time series and feature values are exchanged with the workers
+        through memory-mapped files (see `cesium.transport`) instead of being
+        copied into each task and its result; this avoids serializing the data
+        for multiprocess or distributed schedulers whose workers share a
+        filesystem with the caller. Defaults to False.
 
     Returns
     -------
     pd.DataFrame
         DataFrame with columns containing feature values, indexed by name.
+    pd.DataFrame
+        If `return_costs` is True, DataFrame with columns `predicted` and
+        `actual` containing computation times (in seconds) and `batch`
+        containing the task number of each time series, indexed by name.
     """
-    if times is None:
-        times = copy.deepcopy(values)
-        if isinstance(times, np.ndarray) and (times.ndim == 1
-                                              or 1 in times.shape):
-            times[:] = np.linspace(0., time_series.DEFAULT_MAX_TIME,
-                                   times.size)
-        else:
-            for t in times:
-                if isinstance(t, np.ndarray) and (t.ndim == 1 or 1 in t.shape):
-                    t[:] = np.linspace(0., time_series.DEFAULT_MAX_TIME,
-                                       t.size)
-                else:
-                    for t_i in t:
-                        t_i[:] = np.linspace(0., time_series.DEFAULT_MAX_TIME,
-                                             t_i.size)
+    if isinstance(times, TimeSeriesCollection):
+        all_time_series, names = times, times.names
+    else:
+        times, values, errors, meta_features, names = _prepare_inputs(
+            times, values, errors, meta_features, names)
+        all_time_series = None
 
-    if errors is None:
-        errors = copy.deepcopy(values)
-        if isinstance(errors, np.ndarray) and (errors.ndim == 1
-                                               or 1 in errors.shape):
-            errors[:] = time_series.DEFAULT_ERROR_VALUE
+    feature_names = _output_feature_names(features_to_use, time_budget,
+                                          node_time_budget)
+    if balance or return_costs or shared_memory or all_time_series is not None:
+        if all_time_series is None:
+            all_time_series = [TimeSeries(t, m, e,
+                                          meta_features=meta_features.loc[name],
+                                          name=name)
+                               for t, m, e, name in zip(times, values, errors,
+                                                        names)]
+            predicted = [estimate_featurization_cost(ts, features_to_use)
+                         for ts in all_time_series]
         else:
-            for e in errors:
-                if isinstance(e, np.ndarray) and (e.ndim == 1 or 1 in e.shape):
-                    e[:] = time_series.DEFAULT_ERROR_VALUE
-                else:
-                    for e_i in e:
-                        e_i[:] = time_series.DEFAULT_ERROR_VALUE
-
-    # One single-channel time series:
-    if not isinstance(values[0], Iterable):
-        times, values, errors = [times], [values], [errors]
-    # One multi-channel time series:
-    elif isinstance(values, np.ndarray) and values.ndim == 2:
-        times, values, errors = [times], [values], [errors]
+            predicted = estimate_featurization_cost(all_time_series,
+                                                    features_to_use)
+        if balance:
+            batches = _balance_batches(predicted, n_batches or cpu_count())
+        else:
+            batches = [[i] for i in range(len(all_time_series))]
+        args = (features_to_use, custom_script_path, custom_functions,
+                raise_exceptions, multiband, time_budget, node_time_budget)
+        if shared_memory:
+            if isinstance(all_time_series, TimeSeriesCollection):
+                meta_features_list = all_time_series.meta_features_list()
+                n_channels = all_time_series.n_channels
+            else:
+                meta_features_list = [ts.meta_features
+                                      for ts in all_time_series]
+                n_channels = [ts.n_channels for ts in all_time_series]
+            shared = SharedTimeSeriesData(all_time_series, len(feature_names))
+            try:
+                batch_results = [delayed(_featurize_shared_batch, pure=True)(
+                                    shared, batch,
+                                    [meta_features_list[i] for i in batch],
+                                    *args)
+                                 for batch in batches]
+                batch_results, = dask.compute(batch_results, get=scheduler)
+                shared_features = shared.features()
+            finally:
+                shared.close()
+            batch_results = [[(shared_features[i, :, :n_channels[i]], elapsed)
+                              for i, (_, elapsed) in zip(batch, results)]
+                             for batch, results in zip(batches,
+                                                       batch_results)]
+        else:
+            batch_results = [delayed(_featurize_batch, pure=True)(
+                                _subset(all_time_series, batch), *args)
+                             for batch in batches]
+            batch_results, = dask.compute(batch_results, get=scheduler)
 
-    if names is None:
-        names = np.arange(len(times))
-
-    if isinstance(meta_features, pd.Series):
-        meta_features = meta_features.to_dict()
-    meta_features = pd.DataFrame(meta_features, index=names)
+        all_features = [None] * len(all_time_series)
+        actual = np.zeros(len(all_time_series))
+        batch_ids = np.zeros(len(all_time_series), dtype=int)
+        for b, (batch, results) in enumerate(zip(batches, batch_results)):
+            for i, (features, elapsed) in zip(batch, results):
+                all_features[i] = features
+                actual[i] = elapsed
+                batch_ids[i] = b
+        fset = assemble_featureset(all_features, all_time_series,
+                                   feature_names=feature_names)
+        costs = pd.DataFrame({'predicted': predicted, 'actual': actual,
+                              'batch': batch_ids}, index=names,
+                             columns=['predicted', 'actual', 'batch'])
+        return (fset, costs) if return_costs else fset
 
     all_time_series = [delayed(TimeSeries(t, m, e,
                                           meta_features=meta_features.loc[name],
                                           name=name), pure=True)
                        for t, m, e, name in zip(times, values, errors, names)]
 
-    all_features = [delayed(featurize_single_ts, pure=True)(ts, features_to_use,
-                                                            custom_script_path,
-                                                            custom_functions,
-                                                            raise_exceptions)
+    all_features = [delayed(_featurize_single_ts_values, pure=True)(
+                        ts, features_to_use, custom_script_path,
+                        custom_functions, raise_exceptions, multiband,
+                        time_budget, node_time_budget)
                     for ts in all_time_series]
-    result = delayed(assemble_featureset, pure=True)(all_features, all_time_series)
+    result = delayed(assemble_featureset, pure=True)(
+        all_features, all_time_series, feature_names=feature_names)
     return result.compute(get=scheduler)
 
 
+def featurize_windows(times, values=None, errors=None, features_to_use=[],
+                      window=None, stride=None, by='count', min_epochs=1,
+                      meta_features={}, names=None, custom_functions=None,
+                      scheduler=dask.threaded.get, raise_exceptions=True,
+                      time_budget=None, node_time_budget=None):
+    """Generate features for sliding windows over one or more time series.
+
+    Each channel of each time series is split into windows of a fixed number
+    of values or a fixed time interval, and features are computed for every
+    window. Statistics that can be updated as the windows slide (numbers of
+    values, time spans, moments, extrema and medians of the values, errors
+    and differences between times; see `cesium.windows`) are computed for all
+    windows of a channel at once; the remaining features are computed for
+    each window separately.
+
+    Parameters
+    ----------
+    times, values, errors : array, list or TimeSeriesCollection
+        Time series to be featurized, in any of the forms accepted by
+        `featurize_time_series`. Times must be sorted.
+    features_to_use : list of str, optional
+        List of feature names to be generated.
+    window : int or float
+        Length of each window, as a number of values (if `by` is 'count') or
+        a time interval (if `by` is 'time').
+    stride : int or float, optional
+        Offset between the starts of successive windows, in the same units as
+        `window`. Defaults to `window` (non-overlapping windows).
+    by : {'count', 'time'}, optional
+        If 'count', windows contain `window` successive values, starting at
+        every `stride` values, and windows that do not fit within a channel
+        are omitted. If 'time', windows contain the values in the half-open
+        interval `[start, start + window)`, with starts every `stride`
+        from the earliest time of any channel. Defaults to 'count'.
+    min_epochs : int, optional
+        Windows with fewer values than `min_epochs` are omitted. Defaults
+        to 1.
+    meta_features, names, custom_functions, scheduler, raise_exceptions
+        See `featurize_time_series`. Metafeatures are added to every window
+        of a time series.
+    time_budget, node_time_budget : float, optional
+        Maximum time (in seconds) to spend on each window and on each feature
+        of a window; see `featurize_single_ts`. Defaults to None (no limit).
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame with columns containing feature values, indexed by the name
+        of each time series and the start of each window (position of the
+        first value if `by` is 'count', start time if `by` is 'time'); windows
+        in which no channel has at least `min_epochs` values are omitted.
+    """
+    if window is None:
+        raise ValueError("A window length must be given")
+    if isinstance(times, TimeSeriesCollection):
+        all_time_series = times
+    else:
+        times, values, errors, meta_features, names = _prepare_inputs(
+            times, values, errors, meta_features, names)
+        all_time_series = [TimeSeries(t, m, e,
+                                      meta_features=meta_features.loc[name],
+                                      name=name)
+                           for t, m, e, name in zip(times, values, errors,
+                                                    names)]
+
+    plan = _FeaturePlan(features_to_use, custom_functions, raise_exceptions,
+                        time_budget=time_budget,
+                        node_time_budget=node_time_budget)
+    results = [delayed(_featurize_windows_values, pure=True)(
+                   plan, ts, window, stride, by, min_epochs)
+               for ts in all_time_series]
+    results, = dask.compute(results, get=scheduler)
+
+    features_list, meta_features_list, index = [], [], ([], [])
+    for ts, (starts, feature_values) in zip(all_time_series, results):
+        features_list.extend(feature_values)
+        meta_features_list.extend([ts.meta_features] * len(starts))
+        index[0].extend([ts.name] * len(starts))
+        index[1].extend(starts)
+    index = pd.MultiIndex.from_arrays(index, names=['name', 'window'])
+    return assemble_featureset(features_list,
+                               meta_features_list=meta_features_list,
+                               names=index, feature_names=plan.feature_names)
+
+
+def _featurize_windows_values(plan, ts, window, stride, by, min_epochs):
+    """Starts of the windows of `ts` (see `featurize_windows`) and their
+    feature values, as an (n_windows, n_features, n_channels) array."""
+    channels = list(ts.channels())
+    starts = window_starts([t for t, m, e in channels], window, stride, by)
+    feature_values = np.full((len(starts), len(plan.feature_names),
+                              len(channels)), np.nan)
+    used = np.zeros(len(starts), dtype=bool)
+    for i, (t, m, e) in enumerate(channels):
+        first, last = window_bounds(t, starts, window, by)
+        keep = last - first >= max(min_epochs, 1)
+        if by == 'count':
+            keep &= last - first == window
+        if keep.any():
+            feature_values[keep, :, i] = plan.window_values(
+                t, m, e, first[keep], last[keep], ts.meta_features)
+        used |= keep
+    return starts[used], feature_values[used]
+
+
+class Featurizer(object):
+    """Featurizes batches of time series with a fixed list of features.
+
+    Setting up featurization (generating the feature graph, and starting and
+    warming up worker processes) is done once, when the featurizer is
+    created, so that repeated calls of `featurize` (e.g. on many small
+    batches of time series) have low overhead. The workers are kept running
+    until `close` is called; featurizers can also be used as context
+    managers.
+
+    Parameters
+    ----------
+    features_to_use : list of str
+        List of feature names to be generated.
+    custom_functions : dict, optional
+        Custom feature functions or dask graph (see `featurize_time_series`);
+        functions must be picklable if `n_workers` is nonzero.
+    raise_exceptions, multiband, time_budget, node_time_budget : optional
+        See `featurize_time_series`.
+    n_workers : int, optional
+        Number of worker processes; defaults to the number of CPUs. If 0,
+        time series are featurized in the calling process.
+    warm_up : bool, optional
+        If True, each worker featurizes a small synthetic time series when it
+        starts, so that one-time costs (imports, caches) are not paid by the
+        first batch. Defaults to True.
+    """
+    def __init__(self, features_to_use, custom_functions=None,
+                 raise_exceptions=True, multiband=False, time_budget=None,
+                 node_time_budget=None, n_workers=None, warm_up=True):
+        self.plan = _FeaturePlan(features_to_use, custom_functions,
+                                 raise_exceptions, multiband, time_budget,
+                                 node_time_budget)
+        self.n_workers = cpu_count() if n_workers is None else n_workers
+        if self.n_workers > 0:
+            self._pool = multiprocessing.Pool(self.n_workers,
+                                              initializer=_init_worker,
+                                              initargs=(self.plan, warm_up))
+        else:
+            self._pool = None
+            if warm_up:
+                _warm_up(self.plan)
+
+    @property
+    def features_to_use(self):
+        return self.plan.features_to_use
+
+    def featurize(self, times, values=None, errors=None, meta_features={},
+                  names=None):
+        """Featurize one or more time series.
+
+        Parameters
+        ----------
+        times, values, errors, meta_features, names : optional
+            See `featurize_time_series`; `times` may also be a
+            `TimeSeriesCollection`.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with columns containing feature values, indexed by name.
+        """
+        if isinstance(times, TimeSeriesCollection):
+            all_time_series = times
+            predicted = estimate_featurization_cost(all_time_series,
+                                                    self.features_to_use)
+        else:
+            times, values, errors, meta_features, names = _prepare_inputs(
+                times, values, errors, meta_features, names)
+            all_time_series = [TimeSeries(t, m, e,
+                                          meta_features=meta_features.loc[name],
+                                          name=name)
+                               for t, m, e, name in zip(times, values, errors,
+                                                        names)]
+            predicted = [estimate_featurization_cost(ts, self.features_to_use)
+                         for ts in all_time_series]
+        if self._pool is None:
+            all_features = self.plan.batch_values(all_time_series)
+        else:
+            batches = _balance_batches(predicted, self.n_workers)
+            batch_results = self._pool.map(
+                _featurize_plan_batch,
+                [_subset(all_time_series, batch) for batch in batches],
+                chunksize=1)
+            all_features = [None] * len(all_time_series)
+            for batch, results in zip(batches, batch_results):
+                for i, features in zip(batch, results):
+                    all_features[i] = features
+        return assemble_featureset(all_features, all_time_series,
+                                   feature_names=self.plan.feature_names)
+
+    def close(self):
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Feature plan of the current worker process of a `Featurizer`
+_worker_plan = None
+
+
+def _init_worker(plan, warm_up):
+    global _worker_plan
+    _worker_plan = plan
+    if warm_up:
+        _warm_up(plan)
+
+
+def _warm_up(plan):
+    """Featurize a small synthetic time series with `plan`."""
+    t = np.linspace(0., time_series.DEFAULT_MAX_TIME, 50)
+    ts = TimeSeries(t, np.sin(t), np.full(t.shape,
+                                          time_series.DEFAULT_ERROR_VALUE))
+    try:
+        plan.values(ts)
+    except Exception:
+        pass
+
+
+def _featurize_plan_batch(ts_list):
+    return _worker_plan.batch_values(ts_list)
+
+
 def featurize_ts_files(ts_paths, features_to_use, custom_script_path=None,
                        custom_functions=None, scheduler=dask.threaded.get,
-                       raise_exceptions=True):
-    """Feature generation function for on-disk time series (.npz) files.
+                       raise_exceptions=True, multiband=False,
+                       time_budget=None, node_time_budget=None):
+    """Feature generation function for on-disk time series (.npz) files or
+    time series stores.
 
     By default, computes features concurrently using the
     `dask.threaded.get` scheduler. Other possible options include
@@ -274,9 +1156,10 @@ def featurize_ts_files(ts_paths, features_to_use, custom_script_path=None,
 
     Parameters
     ----------
-    ts_paths : list of str
-        List of paths to time series data, stored in `numpy` .npz format.
-        See `time_series.load` for details.
+    ts_paths : list of str, str, or TimeSeriesStore
+        List of paths to time series data, stored in `numpy` .npz format (see
+        `time_series.load` for details), or a time series store (or the path
+        of its directory; see `cesium.store.TimeSeriesStore`).
     features_to_use : list of str, optional
         List of feature names to be generated. Defaults to an empty list, which
         will result in only meta_features features being stored.
@@ -298,29 +1181,84 @@ def featurize_ts_files(ts_paths, features_to_use, custom_script_path=None,
         If True, exceptions during feature computation are raised immediately;
         if False, exceptions are supressed and `np.nan` is returned for the
         given feature and any dependent features. Defaults to True.
+    multiband : bool, optional
+        If True, Lomb-Scargle features of multichannel time series are
+        computed from a joint fit with frequencies shared by all channels.
+        Defaults to False.
+    time_budget, node_time_budget : float, optional
+        Maximum time (in seconds) to spend on each time series and on each
+        feature of a time series; see `featurize_single_ts`. Defaults to None
+        (no limit).
 
     Returns
     -------
     pd.DataFrame
         DataFrame with columns containing feature values, indexed by name.
+    tuple
+        Labels of the time series.
     """
-    all_time_series = [delayed(time_series.load, pure=True)(ts_path)
+    if isinstance(ts_paths, str):
+        ts_paths = TimeSeriesStore(ts_paths)
+    if isinstance(ts_paths, TimeSeriesStore):
+        return _featurize_store(ts_paths, features_to_use, custom_script_path,
+                                custom_functions, scheduler, raise_exceptions,
+                                multiband, time_budget, node_time_budget)
+
+    # Values are only read by the featurization tasks
+    all_time_series = [delayed(time_series.load, pure=True)(ts_path,
+                                                            lazy=True)
                        for ts_path in ts_paths]
-    all_features = [delayed(featurize_single_ts, pure=True)(ts, features_to_use,
-                                                            custom_script_path,
-                                                            custom_functions,
-                                                            raise_exceptions)
+    all_features = [delayed(_featurize_single_ts_values, pure=True)(
+                        ts, features_to_use, custom_script_path,
+                        custom_functions, raise_exceptions, multiband,
+                        time_budget, node_time_budget)
                     for ts in all_time_series]
     names, meta_feats, all_labels = zip(*[(ts.name, ts.meta_features, ts.label)
                                           for ts in all_time_series])
-    result = delayed(assemble_featureset, pure=True)(all_features,
-                                                     meta_features_list=meta_feats,
-                                                     names=names)
+    feature_names = _output_feature_names(features_to_use, time_budget,
+                                          node_time_budget)
+    result = delayed(assemble_featureset, pure=True)(
+        all_features, meta_features_list=meta_feats, names=names,
+        feature_names=feature_names)
     fset, labels = dask.compute(result, all_labels, get=scheduler)
 
     return fset, labels
 
 
+def _featurize_store(store, features_to_use, custom_script_path,
+                     custom_functions, scheduler, raise_exceptions, multiband,
+                     time_budget, node_time_budget):
+    """Featurize all time series of a `TimeSeriesStore` (see
+    `featurize_ts_files`). Each task reads its time series from the store
+    itself, so that no values are passed to the workers."""
+    collection = store.collection()
+    predicted = estimate_featurization_cost(collection, features_to_use)
+    batches = _balance_batches(predicted, cpu_count())
+    batch_results = [delayed(_featurize_store_batch, pure=True)(
+                        store, batch, features_to_use, custom_script_path,
+                        custom_functions, raise_exceptions, multiband,
+                        time_budget, node_time_budget)
+                     for batch in batches]
+    batch_results, = dask.compute(batch_results, get=scheduler)
+
+    all_features = [None] * len(collection)
+    for batch, results in zip(batches, batch_results):
+        for i, features in zip(batch, results):
+            all_features[i] = features
+    fset = assemble_featureset(all_features, collection,
+                               feature_names=_output_feature_names(
+                                   features_to_use, time_budget,
+                                   node_time_budget))
+    labels = (tuple(collection.labels) if collection.labels is not None
+              else (None,) * len(collection))
+    return fset, labels
+
+
+def _featurize_store_batch(store, indices, *args):
+    collection = store.collection()
+    return _batch_plan(*args).batch_values([collection[i] for i in indices])
+
+
 def impute_featureset(fset, strategy='constant', value=None, max_value=1e20,
                       inplace=False):
     """Replace NaN/Inf values with imputed values as defined by `strategy`.
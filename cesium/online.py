@@ -0,0 +1,311 @@
+"""Incremental featurization of time series that grow over time.
+
+An `OnlineFeatures` object keeps summaries of the values of a single-channel
+time series from which features can be computed without revisiting earlier
+values: counts, moments, extrema and quantile sketches of the measurements,
+errors and differences between successive times. Appending new values (or
+merging the summaries of a later part of the series) takes time proportional
+to the number of new values.
+
+Features computed from moments and extrema (`EXACT_FEATURES`) are exact. The
+remaining supported features (`SKETCHED_FEATURES`) depend on the full
+distribution of the values; they are computed from the stored values
+themselves, and are therefore exact, until a series exceeds `max_exact`
+values, after which they are approximated from a `QuantileSketch`.
+"""
+import numpy as np
+import pandas as pd
+
+from . import time_series
+from .featurize import _FeaturePlan
+from .features.common_functions import (compute_moments, merge_moments,
+                                        get_mean, get_std)
+
+
+__all__ = ['OnlineFeatures', 'QuantileSketch', 'EXACT_FEATURES',
+           'SKETCHED_FEATURES']
+
+
+EXACT_FEATURES = ['n_epochs', 'total_time', 'avgt', 'mean', 'std', 'skew',
+                  'weighted_average', 'avg_err', 'std_err', 'maximum',
+                  'minimum', 'amplitude', 'cads_avg', 'cads_std']
+
+# Input (measurements `m`, errors `e` or time differences `cads`) from which
+# each of the remaining features is computed
+SKETCHED_FEATURES = {feature: 'm' for feature in [
+    'median', 'median_absolute_deviation', 'percent_amplitude',
+    'percent_beyond_1_std', 'percent_close_to_median',
+    'percent_difference_flux_percentile', 'flux_percentile_ratio_mid20',
+    'flux_percentile_ratio_mid35', 'flux_percentile_ratio_mid50',
+    'flux_percentile_ratio_mid65', 'flux_percentile_ratio_mid80',
+    'stetson_j', 'stetson_k']}
+SKETCHED_FEATURES['med_err'] = 'e'
+SKETCHED_FEATURES.update({feature: 'cads' for feature in [
+    'cads_med', 'cad_probs_1', 'cad_probs_10', 'cad_probs_20', 'cad_probs_30',
+    'cad_probs_40', 'cad_probs_50', 'cad_probs_100', 'cad_probs_500',
+    'cad_probs_1000', 'cad_probs_5000', 'cad_probs_10000', 'cad_probs_50000',
+    'cad_probs_100000', 'cad_probs_500000', 'cad_probs_1000000',
+    'cad_probs_5000000', 'cad_probs_10000000']})
+
+
+def _merge_centroids(means, counts, compression):
+    """Combine sorted centroids into fewer, larger centroids.
+
+    Centroids are grouped by the integer part of the scale function
+    `compression / (2 * pi) * arcsin(2 * q - 1)` of their quantile `q` (the
+    `k_1` scale of Dunning & Ertl's t-digest), so that centroids near the
+    median hold many values and those in the tails only a few.
+    """
+    cum_counts = np.cumsum(counts)
+    q = (cum_counts - counts / 2.) / cum_counts[-1]
+    k = np.floor(compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+    _, groups = np.unique(k, return_inverse=True)
+    new_counts = np.bincount(groups, counts)
+    return np.bincount(groups, means * counts) / new_counts, new_counts
+
+
+class QuantileSketch(object):
+    """Mergeable summary of the distribution of a stream of values.
+
+    The values themselves are kept until there are more than `max_exact` of
+    them; the sketch is then compressed into weighted centroids as in a
+    t-digest, which approximates quantiles to within a fraction of a percent
+    with about `compression / 2` centroids. New values are buffered and
+    merged into the centroids in batches.
+
+    Parameters
+    ----------
+    compression : float, optional
+        Accuracy of the compressed sketch. Defaults to 100.
+    max_exact : int, optional
+        Maximum number of values kept exactly. Defaults to 1000.
+    """
+    def __init__(self, compression=100, max_exact=1000):
+        self.compression = compression
+        self.max_exact = max_exact
+        self.exact = True
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._means = np.empty(0)
+        self._counts = np.empty(0)
+        self._buffer = []
+
+    def update(self, values, counts=None):
+        """Add values (or centroids with the given `counts`) to the
+        sketch."""
+        values = np.asarray(values, dtype='float64').ravel()
+        if len(values) == 0:
+            return
+        counts = (np.ones(len(values)) if counts is None
+                  else np.asarray(counts, dtype='float64'))
+        self._buffer.append((values, counts))
+        self.n += counts.sum()
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        if self.exact and self.n > self.max_exact:
+            self.exact = False
+        if not self.exact and (sum(len(v) for v, c in self._buffer) >
+                               self.compression):
+            self._compress()
+
+    def merge(self, other):
+        """Add all values summarized by another sketch."""
+        if other.exact:
+            for values, counts in other._buffer:
+                self.update(values, counts)
+        else:
+            other._compress()
+            self.update(other._means, other._counts)
+            self.exact = False
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self._means] +
+                               [values for values, counts in self._buffer])
+        counts = np.concatenate([self._counts] +
+                                [counts for values, counts in self._buffer])
+        order = np.argsort(means, kind='mergesort')
+        self._means, self._counts = _merge_centroids(
+            means[order], counts[order], self.compression)
+        self._buffer = []
+
+    def values(self):
+        """All values added to the sketch, if it is exact."""
+        if not self.exact:
+            raise ValueError("Values of a compressed sketch are not stored")
+        return np.concatenate([values for values, counts in self._buffer]
+                              or [np.empty(0)])
+
+    def quantile(self, q):
+        """Approximate quantiles (between 0 and 1) of the values, linearly
+        interpolated between centroids and the extreme values."""
+        if self.exact:
+            return np.percentile(self.values(), 100 * np.asarray(q))
+        self._compress()
+        centers = np.cumsum(self._counts) - self._counts / 2.
+        return np.interp(np.asarray(q) * self.n,
+                         np.concatenate(([0.], centers, [self.n])),
+                         np.concatenate(([self.min], self._means,
+                                         [self.max])))
+
+    def sample(self):
+        """The values added to the sketch if it is exact, or `max_exact`
+        evenly spaced quantiles of them."""
+        if self.exact:
+            return self.values()
+        return self.quantile((np.arange(self.max_exact) + 0.5) /
+                             self.max_exact)
+
+
+_NO_MOMENTS = compute_moments([], [])
+
+
+_ONLINE_PLANS = {}
+
+
+def _online_plan(features_to_use):
+    """`_FeaturePlan` for the tuple `features_to_use`, built once per
+    tuple."""
+    if features_to_use not in _ONLINE_PLANS:
+        _ONLINE_PLANS[features_to_use] = _FeaturePlan(features_to_use)
+    return _ONLINE_PLANS[features_to_use]
+
+
+class OnlineFeatures(object):
+    """Incrementally updated features of a single-channel time series.
+
+    Values must be added in time order: times passed to `update` (or
+    summarized by a state passed to `merge`) cannot precede the latest time
+    already added.
+
+    Parameters
+    ----------
+    t, m, e : array, optional
+        Initial time, measurement and error values; errors default to
+        `time_series.DEFAULT_ERROR_VALUE`.
+    compression, max_exact : optional
+        Parameters of the `QuantileSketch` of measurements, errors and
+        differences between times.
+    """
+    def __init__(self, t=None, m=None, e=None, compression=100,
+                 max_exact=1000):
+        self.moments = self.time_moments = self.cad_moments = _NO_MOMENTS
+        self.first_time = self.last_time = np.nan
+        self.minimum, self.maximum = np.inf, -np.inf
+        self.sketches = {key: QuantileSketch(compression, max_exact)
+                         for key in ('m', 'e', 'cads')}
+        if t is not None:
+            self.update(t, m, e)
+
+    @property
+    def n_epochs(self):
+        return self.moments['n']
+
+    def update(self, t, m, e=None):
+        """Add new values to the time series."""
+        t = np.asarray(t, dtype='float64').ravel()
+        m = np.asarray(m, dtype='float64').ravel()
+        e = (np.full(len(t), time_series.DEFAULT_ERROR_VALUE) if e is None
+             else np.asarray(e, dtype='float64').ravel())
+        if len(t) == 0:
+            return
+        if np.any(t[1:] < t[:-1]):
+            order = np.argsort(t, kind='mergesort')
+            t, m, e = t[order], m[order], e[order]
+        sketches = self.sketches
+        compression = sketches['m'].compression
+        max_exact = sketches['m'].max_exact
+        new = OnlineFeatures(compression=compression, max_exact=max_exact)
+        new.moments = compute_moments(m, e)
+        new.time_moments = compute_moments(t, np.ones(len(t)))
+        cads = np.diff(t)
+        new.cad_moments = compute_moments(cads, np.ones(len(cads)))
+        new.first_time, new.last_time = t[0], t[-1]
+        new.minimum, new.maximum = m.min(), m.max()
+        for key, values in (('m', m), ('e', e), ('cads', cads)):
+            new.sketches[key].update(values)
+        self.merge(new)
+
+    def merge(self, other):
+        """Add the values summarized by the state of a later part of the time
+        series."""
+        if other.n_epochs == 0:
+            return
+        if self.n_epochs > 0:
+            if other.first_time < self.last_time:
+                raise ValueError("Added times must not precede the latest "
+                                 "time of the series")
+            gap = other.first_time - self.last_time
+            self.cad_moments = merge_moments(
+                self.cad_moments, compute_moments([gap], [1.]))
+            self.sketches['cads'].update([gap])
+        else:
+            self.first_time = other.first_time
+        self.last_time = other.last_time
+        self.moments = merge_moments(self.moments, other.moments)
+        self.time_moments = merge_moments(self.time_moments,
+                                          other.time_moments)
+        self.cad_moments = merge_moments(self.cad_moments, other.cad_moments)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        for key, sketch in self.sketches.items():
+            sketch.merge(other.sketches[key])
+
+    def _check_features(self, features_to_use):
+        unsupported = [feature for feature in features_to_use
+                       if feature not in EXACT_FEATURES and
+                       feature not in SKETCHED_FEATURES]
+        if unsupported:
+            raise ValueError("Features cannot be computed incrementally: {}"
+                             .format(unsupported))
+
+    def _index(self, features_to_use):
+        return pd.MultiIndex.from_product((features_to_use, [0]),
+                                          names=('feature', 'channel'))
+
+    def features(self, features_to_use):
+        """Current feature values, as returned by `featurize_single_ts`.
+
+        Parameters
+        ----------
+        features_to_use : list of str
+            Features among `EXACT_FEATURES` and `SKETCHED_FEATURES`.
+
+        Returns
+        -------
+        pd.Series
+            Feature values with (feature name, channel) multiindex.
+        """
+        self._check_features(features_to_use)
+        if self.n_epochs == 0:
+            raise ValueError("No values have been added")
+        precomputed = {key: sketch.sample()
+                       for key, sketch in self.sketches.items()}
+        precomputed.update({
+            '_moments': self.moments, 'n_epochs': self.n_epochs,
+            'total_time': self.last_time - self.first_time,
+            'avgt': get_mean(self.time_moments),
+            'maximum': self.maximum, 'minimum': self.minimum,
+            'amplitude': (self.maximum - self.minimum) / 2.,
+            'cads_avg': (get_mean(self.cad_moments)
+                         if self.cad_moments['n'] > 0 else np.nan),
+            'cads_std': (get_std(self.cad_moments)
+                         if self.cad_moments['n'] > 0 else np.nan)})
+        plan = _online_plan(tuple(features_to_use))
+        return pd.Series(plan.precomputed_values(precomputed),
+                         index=self._index(features_to_use))
+
+    def exact(self, features_to_use):
+        """Whether the current values of the features are exact (rather than
+        approximated from compressed quantile sketches), as a boolean series
+        indexed as the result of `features`."""
+        self._check_features(features_to_use)
+        return pd.Series([feature not in SKETCHED_FEATURES or
+                          self.sketches[SKETCHED_FEATURES[feature]].exact
+                          for feature in features_to_use],
+                         index=self._index(features_to_use))
@@ -0,0 +1,243 @@
+import itertools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .time_series import TimeSeries, TimeSeriesCollection
+
+
+__all__ = ['TimeSeriesStore']
+
+
+FORMAT_NAME = 'cesium-time-series-store'
+FORMAT_VERSION = 1
+HEADER_FILE = 'header.json'
+METADATA_FILE = 'metadata.jsonl'
+_OFFSETS = ['series_offsets', 'channel_offsets']
+_VALUES = ['time', 'measurement', 'error']
+_DTYPES = {'series_offsets': '<i8', 'channel_offsets': '<i8', 'time': '<f8',
+           'measurement': '<f8', 'error': '<f8'}
+
+
+def _to_json(x):
+    """Convert `numpy` scalars for JSON serialization."""
+    if isinstance(x, np.generic):
+        return x.item()
+    raise TypeError("{!r} is not JSON serializable".format(x))
+
+
+def _replace(src, dst):
+    """Rename `src` to `dst`, replacing any existing file (atomically, except
+    on Windows under Python 2, where `os.replace` is not available)."""
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        if os.name == 'nt' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+class TimeSeriesStore(object):
+    """Collection of time series stored in a single directory, with values
+    that can be accessed without reading them into memory.
+
+    The store consists of the following files:
+
+        - header.json: format version and number of stored series, channels,
+          values and bytes of metadata
+        - series_offsets.dat, channel_offsets.dat: offsets of the channels of
+          each time series and of the values of each channel, as raw
+          little-endian 64-bit integers (see `TimeSeriesCollection`)
+        - time.dat, measurement.dat, error.dat: values of all channels, as raw
+          little-endian 64-bit floats
+        - metadata.jsonl: name, label and metafeatures of each time series, as
+          one JSON object per line
+
+    The offset and value files are opened with `np.memmap` (see
+    `collection`), so that accessing any time series only reads its own
+    values. Time series can only be added at the end of the store (see
+    `append`); the header is replaced once all other files have been written,
+    so an interrupted append leaves the store unchanged.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the store.
+    mode : {'r', 'a', 'w'}, optional
+        'r' to read an existing store, 'a' to read and append to a store
+        (which is created if it does not exist), or 'w' to create a new empty
+        store, removing any time series stored at `path`. Defaults to 'r'.
+    """
+    def __init__(self, path, mode='r'):
+        if mode not in ('r', 'a', 'w'):
+            raise ValueError("Invalid mode '{}'".format(mode))
+        self.path = path
+        self.mode = mode
+        self._collection = None
+        if mode == 'w' or (mode == 'a' and not os.path.exists(
+                os.path.join(path, HEADER_FILE))):
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            self.header = {'format': FORMAT_NAME, 'version': FORMAT_VERSION,
+                           'n_series': 0, 'n_channels': 0, 'n_values': 0,
+                           'metadata_size': 0}
+            for key in _OFFSETS:
+                with open(self._file(key), 'wb') as f:
+                    np.zeros(1, dtype=_DTYPES[key]).tofile(f)
+            for key in _VALUES:
+                open(self._file(key), 'wb').close()
+            open(os.path.join(path, METADATA_FILE), 'wb').close()
+            self._write_header()
+        else:
+            with open(os.path.join(path, HEADER_FILE)) as f:
+                self.header = json.load(f)
+            if self.header.get('format') != FORMAT_NAME:
+                raise ValueError("{} is not a time series store".format(path))
+            if self.header['version'] > FORMAT_VERSION:
+                raise ValueError("Unsupported time series store version {}"
+                                 .format(self.header['version']))
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.dat')
+
+    def _shape(self, key):
+        if key == 'series_offsets':
+            return self.header['n_series'] + 1
+        elif key == 'channel_offsets':
+            return self.header['n_channels'] + 1
+        else:
+            return self.header['n_values']
+
+    def _write_header(self):
+        tmp_path = os.path.join(self.path, HEADER_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.header, f)
+        _replace(tmp_path, os.path.join(self.path, HEADER_FILE))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_collection'] = None
+        return state
+
+    def __len__(self):
+        return self.header['n_series']
+
+    def collection(self):
+        """`TimeSeriesCollection` of all stored time series, with values
+        backed by the files of the store."""
+        if self._collection is None:
+            arrays = {}
+            for key in _OFFSETS + _VALUES:
+                if self._shape(key) == 0:  # empty files cannot be mapped
+                    arrays[key] = np.empty(0, dtype=_DTYPES[key])
+                else:
+                    arrays[key] = np.memmap(self._file(key), mode='r',
+                                            dtype=_DTYPES[key],
+                                            shape=(self._shape(key),))
+            with open(os.path.join(self.path, METADATA_FILE), 'rb') as f:
+                lines = f.read(self.header['metadata_size']).splitlines()
+            records = [json.loads(line.decode('utf-8')) for line in lines]
+            labels = [record['label'] for record in records]
+            self._collection = TimeSeriesCollection(
+                names=np.array([record['name'] for record in records],
+                               dtype=object),
+                labels=(None if all(label is None for label in labels)
+                        else np.array(labels, dtype=object)),
+                meta_features=pd.DataFrame([record['meta_features']
+                                            for record in records],
+                                           index=range(len(records))),
+                **arrays)
+        return self._collection
+
+    def __getitem__(self, key):
+        return self.collection()[key]
+
+    def __iter__(self):
+        return iter(self.collection())
+
+    def append(self, time_series):
+        """Add time series to the end of the store.
+
+        Parameters
+        ----------
+        time_series : TimeSeries, list of TimeSeries or TimeSeriesCollection
+            Time series to be added. Metafeatures must be scalars; missing
+            values are not stored.
+        """
+        if self.mode == 'r':
+            raise ValueError("Time series store is opened read-only")
+        if isinstance(time_series, TimeSeries):
+            time_series = [time_series]
+        if not isinstance(time_series, TimeSeriesCollection):
+            time_series = TimeSeriesCollection.from_time_series(time_series)
+
+        labels = (time_series.labels if time_series.labels is not None
+                  else [None] * len(time_series))
+        meta_features_list = time_series.meta_features_list()
+        for meta in meta_features_list:
+            for k, v in meta.items():
+                if v is not None and not np.isscalar(v):
+                    raise ValueError("Metafeature '{}' is not a scalar: {!r}"
+                                     .format(k, v))
+        metadata = ''.join(
+            json.dumps({'name': name, 'label': label,
+                        'meta_features': {k: v for k, v in meta.items()
+                                          if not pd.isnull(v)}},
+                       default=_to_json) + '\n'
+            for name, label, meta in zip(
+                time_series.names, labels,
+                meta_features_list)).encode('utf-8')
+
+        header = dict(self.header)
+        new_values = {
+            'series_offsets': time_series.series_offsets[1:] +
+                              header['n_channels'],
+            'channel_offsets': time_series.channel_offsets[1:] +
+                               header['n_values'],
+            'time': time_series.time, 'measurement': time_series.measurement,
+            'error': time_series.error}
+        for key, values in new_values.items():
+            with open(self._file(key), 'r+b') as f:
+                # Discard any values left over by an interrupted append
+                size = self._shape(key) * np.dtype(_DTYPES[key]).itemsize
+                f.truncate(size)
+                f.seek(size)
+                np.asarray(values, dtype=_DTYPES[key]).tofile(f)
+
+        with open(os.path.join(self.path, METADATA_FILE), 'r+b') as f:
+            f.truncate(header['metadata_size'])
+            f.seek(header['metadata_size'])
+            f.write(metadata)
+
+        header['n_series'] += len(time_series)
+        header['n_channels'] += len(time_series.channel_offsets) - 1
+        header['n_values'] += len(time_series.time)
+        header['metadata_size'] += len(metadata)
+        self.header = header
+        self._write_header()
+        self._collection = None
+
+    def extend(self, time_series, batch_size=1000):
+        """Add time series from an iterable (such as a generator) to the end
+        of the store.
+
+        Time series are appended in batches of `batch_size` (see `append`),
+        so that only one batch is held in memory at a time.
+        """
+        time_series = iter(time_series)
+        while True:
+            batch = list(itertools.islice(time_series, batch_size))
+            if not batch:
+                break
+            self.append(batch)
+
+    def close(self):
+        self._collection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
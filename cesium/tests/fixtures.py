@@ -21,6 +21,33 @@ def sample_values(size=51, channels=1):
     return times, values, errors
 
 
+def sample_ts_list(size=51, channels=3):
+    """Single-channel, multichannel and ragged (channels of 2, 3, ...
+    values) time series with names, labels and metafeatures."""
+    t, m, e = sample_values(size=size, channels=channels)
+    return [TimeSeries(t, m[0], e[0], name='a', label='x',
+                       meta_features={'f': 1.}),
+            TimeSeries(t, m, e, name='b', label='y', meta_features={'f': 3.}),
+            TimeSeries([t[:i + 2] for i in range(channels)],
+                       [m[i][:i + 2] for i in range(channels)],
+                       [e[i][:i + 2] for i in range(channels)], name='c',
+                       label='z', meta_features={'f': 2.})]
+
+
+def assert_ts_equal(ts1, ts2):
+    for x1, x2 in zip((ts1.time, ts1.measurement, ts1.error),
+                      (ts2.time, ts2.measurement, ts2.error)):
+        assert type(x1) == type(x2)
+        if isinstance(x1, np.ndarray):
+            assert np.array_equal(x1, x2)
+        else:
+            assert all(np.array_equal(x1_i, x2_i)
+                       for x1_i, x2_i in zip(x1, x2))
+    assert ts1.label == ts2.label
+    assert ts1.meta_features == ts2.meta_features
+    assert ts1.name == ts2.name
+
+
 @contextmanager
 def sample_ts_files(size, labels=[None]):
     temp_dir = tempfile.mkdtemp()
@@ -7,7 +7,9 @@ from os.path import join as pjoin
 import shutil
 import numpy as np
 from cesium import data_management
+from cesium import time_series
 from cesium import util
+from cesium.store import TimeSeriesStore
 
 import numpy.testing as npt
 import pytest
@@ -40,6 +42,70 @@ def test_parse_ts_data(tmpdir):
     with pytest.raises(ValueError):
         data_management.parse_ts_data(to_str(values[:, []]))
 
+    # Extra columns are ignored; values are returned as contiguous rows
+    ts_data = data_management.parse_ts_data(to_str(np.c_[values, values]))
+    npt.assert_allclose(ts_data, values.T)
+    assert ts_data.flags['C_CONTIGUOUS']
+
+    whitespace = StringIO('# comment\n' + '\n'.join(
+        ' '.join(row) for row in values.astype(str).tolist()))
+    npt.assert_allclose(data_management.parse_ts_data(whitespace, sep=None),
+                        values.T)
+
+    # Lines with missing, extra or empty values are rejected, even when the
+    # total number of values fits the number of columns
+    for text in ['1,2,3\n4,5\n6,7,8,9\n', '1,2,3\n4,5,6,7\n', '1,,3\n4,5,6\n',
+                 '1, ,3\n4,5,6\n', '1,2,3,\n4,5,6,\n', '1,2,3\n4,5,6,\n',
+                 '# comment\n1,2,3\n4,5\n', '# comment\n1,,3\n4,5,6\n']:
+        with pytest.raises(ValueError):
+            data_management.parse_ts_data(StringIO(text))
+    with pytest.raises(ValueError):
+        data_management.parse_ts_data(StringIO('1 2 3\n4 5\n6 7 8 9\n'),
+                                      sep=None)
+
+
+def test_parse_ts_files():
+    """Test parallel parsing of time series data files."""
+    paths = [pjoin(DATA_PATH, f) for f in ["dotastro_215153.dat",
+                                           "247327.dat"]] * 3
+    for n_workers in [1, 2]:
+        all_ts_data = data_management.parse_ts_files(paths,
+                                                     n_workers=n_workers,
+                                                     chunksize=2)
+        assert len(all_ts_data) == len(paths)
+        for path, ts_data in zip(paths, all_ts_data):
+            npt.assert_array_equal(ts_data, np.loadtxt(path, delimiter=',').T)
+
+
+def test_iter_time_series(tmpdir):
+    """Test parsing time series from an archive without extracting it."""
+    data_file_path = pjoin(DATA_PATH, "asas_training_subset.tar.gz")
+    header_path = pjoin(DATA_PATH,
+                        "asas_training_subset_classes_with_metadata.dat")
+    with util.extract_time_series(data_file_path, cleanup_archive=False,
+                                  cleanup_files=True,
+                                  extract_dir=str(tmpdir)) as ts_paths:
+        expected = {util.shorten_fname(path):
+                    data_management.parse_ts_data(path)
+                    for path in ts_paths}
+    labels, meta_features = data_management.parse_headerfile(header_path)
+
+    for n_workers in [1, 2]:
+        time_series = list(data_management.iter_time_series(
+            data_file_path, header_path, n_workers=n_workers, batch_size=3))
+        assert sorted(ts.name for ts in time_series) == sorted(expected)
+        for ts in time_series:
+            npt.assert_array_equal(np.vstack([ts.time, ts.measurement,
+                                              ts.error]),
+                                   expected[ts.name])
+            assert ts.label == labels.loc[ts.name]
+            assert ts.meta_features == meta_features.loc[ts.name].to_dict()
+
+    with pytest.raises(ValueError):
+        list(data_management.iter_time_series(
+            data_file_path, pjoin(DATA_PATH,
+                                  "215153_215176_218272_218934_metadata.dat")))
+
 
 def test_parse_headerfile():
     """Test header file parsing."""
@@ -86,3 +152,71 @@ def test_parsing_and_saving(tmpdir):
     for ts in time_series:
         assert isinstance(ts, str)
         assert os.path.exists(ts)
+
+
+def test_parsing_and_saving_parallel(tmpdir):
+    """Test parallel parsing into separate files and into a store."""
+    data_file_path = pjoin(DATA_PATH, "asas_training_subset.tar.gz")
+    header_path = pjoin(DATA_PATH,
+                        "asas_training_subset_classes_with_metadata.dat")
+    ts_paths = data_management.parse_and_store_ts_data(
+        data_file_path, str(tmpdir), header_path, cleanup_archive=False,
+        cleanup_header=False, n_workers=2)
+    expected = {util.shorten_fname(path): time_series.load(path)
+                for path in ts_paths}
+    assert len(expected) == len(ts_paths) == 7
+    labels, meta_features = data_management.parse_headerfile(header_path)
+    for name, ts in expected.items():
+        assert ts.name == name
+        assert ts.label == labels.loc[name]
+        assert ts.meta_features == meta_features.loc[name].to_dict()
+
+    store_path = pjoin(str(tmpdir), 'store')
+    for n_workers in [1, 2]:
+        index = data_management.parse_and_store_ts_data(
+            data_file_path, store_path, header_path, cleanup_archive=False,
+            cleanup_header=False, n_workers=n_workers, store=True)
+        assert sorted(index.index) == sorted(expected)
+        store = TimeSeriesStore(store_path)
+        for name, i in index.items():
+            ts = store[i]
+            npt.assert_array_equal(ts.measurement, expected[name].measurement)
+            assert ts.label == expected[name].label
+            assert ts.meta_features == expected[name].meta_features
+    assert len(store) == 14
+    npt.assert_array_equal(index.values, np.arange(7, 14))
+
+
+def test_missing_meta_features(tmpdir):
+    """Test that missing metafeatures are kept as NaN by all parsers."""
+    data_file_path = pjoin(DATA_PATH, "215153_215176_218272_218934.tar.gz")
+    full_header_path = pjoin(DATA_PATH,
+                             "215153_215176_218272_218934_metadata.dat")
+    header_path = pjoin(str(tmpdir), "header.dat")
+    with open(full_header_path) as f:
+        header = f.read().replace('3423.234234', '')
+    with open(header_path, 'w') as f:
+        f.write(header)
+    expected = {'dotastro_215176': {'meta1': 1.23423, 'meta2': np.nan,
+                                    'meta3': 14.223},
+                'dotastro_218272': {'meta1': 2.23423, 'meta2': 523.234234,
+                                    'meta3': 410.223}}
+
+    ts_paths = data_management.parse_and_store_ts_data(
+        data_file_path, str(tmpdir), header_path, cleanup_archive=False,
+        cleanup_header=False)
+    parsed = {'files': {util.shorten_fname(path): time_series.load(path)
+                        for path in ts_paths},
+              'archive': {ts.name: ts for ts in
+                          data_management.iter_time_series(data_file_path,
+                                                           header_path)}}
+    store_path = pjoin(str(tmpdir), 'store')
+    index = data_management.parse_and_store_ts_data(
+        data_file_path, store_path, header_path, cleanup_archive=False,
+        cleanup_header=False, store=True)
+    store = TimeSeriesStore(store_path)
+    parsed['store'] = {name: store[i] for name, i in index.items()}
+    for time_series_by_name in parsed.values():
+        for name, meta_features in expected.items():
+            npt.assert_equal(time_series_by_name[name].meta_features,
+                             meta_features)
@@ -6,6 +6,7 @@ import scipy.stats
 import dask
 
 from cesium import featurize
+from cesium.time_series import TimeSeries, TimeSeriesCollection
 from cesium.tests.fixtures import (sample_values, sample_ts_files,
                                    sample_featureset)
 
@@ -95,6 +96,248 @@ def test_featurize_time_series_uneven_multichannel():
     assert 'meta1' in fset.columns
 
 
+def test_featurize_time_series_multiband():
+    """Test joint multiband Lomb-Scargle fit of multichannel time series"""
+    from cesium.features.lomb_scargle_multiband import (
+        lomb_scargle_multiband_model)
+    state = np.random.RandomState(0)
+    frequency = 1.3676
+    amplitudes = [1., 0.5, 0.2]
+    t = [np.sort(state.uniform(0., 300., 100)) for a in amplitudes]
+    m = [a * np.sin(2 * np.pi * frequency * t_i) + state.normal(0, 0.1, 100)
+         for a, t_i in zip(amplitudes, t)]
+    e = [0.1 * np.ones(100) for a in amplitudes]
+    features_to_use = ['freq1_freq', 'freq1_amplitude1', 'amplitude']
+    fset = featurize.featurize_time_series([t], [m], [e], features_to_use,
+                                           scheduler=dask.get, multiband=True)
+    npt.assert_allclose(fset['freq1_freq'].values, frequency, rtol=1e-3)
+    npt.assert_allclose(fset['freq1_amplitude1'].values.ravel(), amplitudes,
+                        atol=0.05)
+    single = featurize.featurize_time_series([t], [m], [e], ['amplitude'],
+                                             scheduler=dask.get)
+    npt.assert_allclose(fset['amplitude'], single['amplitude'])
+
+    # The number of frequencies and harmonics of the joint fit follows the
+    # requested features
+    features_to_use = ['freq4_freq', 'freq1_amplitude10']
+    fset = featurize.featurize_time_series([t], [m], [e], features_to_use,
+                                           scheduler=dask.get, multiband=True)
+    expected = lomb_scargle_multiband_model(t, m, e, nharm=10, nfreq=4)
+    for i, model in enumerate(expected):
+        npt.assert_allclose(fset['freq4_freq'][i].values,
+                            model['freq_fits'][3]['freq'])
+        npt.assert_allclose(fset['freq1_amplitude10'][i].values,
+                            model['freq_fits'][0]['amplitude'][9])
+
+
+def test_featurize_time_series_balanced():
+    """Test cost-balanced featurization of series of different lengths"""
+    sizes = [20, 30, 5000, 40, 25, 1000, 35]
+    list_of_series = [sample_values(size=size) for size in sizes]
+    times, values, errors = [list(x) for x in zip(*list_of_series)]
+    features_to_use = ['amplitude', 'std_err', 'freq1_freq']
+    fset, costs = featurize.featurize_time_series(
+        times, values, errors, features_to_use, scheduler=dask.get,
+        balance=True, n_batches=3, return_costs=True)
+    unbalanced = featurize.featurize_time_series(times, values, errors,
+                                                 features_to_use,
+                                                 scheduler=dask.get)
+    npt.assert_array_equal(fset.values, unbalanced.values)
+    assert fset.columns.equals(unbalanced.columns)
+    assert fset.index.equals(unbalanced.index)
+
+    assert list(costs.columns) == ['predicted', 'actual', 'batch']
+    assert (costs.actual > 0).all()
+    assert costs.predicted.idxmax() == 2
+    # The longest series is processed separately; the other two tasks are
+    # balanced, with the second-longest series in one of them
+    assert (costs.batch == costs.batch[2]).sum() == 1
+    assert costs.batch.nunique() == 3
+    loads = costs.predicted.groupby(costs.batch).sum().drop(costs.batch[2])
+    assert loads.max() < costs.predicted[5] + costs.predicted.drop([2, 5]).sum()
+
+
+def test_featurize_time_series_collection():
+    """Test featurization of a TimeSeriesCollection"""
+    sizes = [20, 30, 500, 40]
+    list_of_series = [sample_values(size=size) for size in sizes]
+    times, values, errors = [list(x) for x in zip(*list_of_series)]
+    meta_features = pd.DataFrame({'meta1': [1., 2., 3., 4.]})
+    features_to_use = ['amplitude', 'std_err', 'freq1_freq']
+    expected = featurize.featurize_time_series(times, values, errors,
+                                               features_to_use, meta_features,
+                                               scheduler=dask.get)
+    collection = TimeSeriesCollection.from_time_series(
+        [TimeSeries(t, m, e, meta_features=meta_features.loc[i], name=i)
+         for i, (t, m, e) in enumerate(list_of_series)])
+    costs = featurize.estimate_featurization_cost(collection, features_to_use)
+    npt.assert_allclose(costs, [featurize.estimate_featurization_cost(
+                                    ts, features_to_use) for ts in collection])
+    for kwargs in [{}, {'balance': True, 'n_batches': 2},
+                   {'shared_memory': True}]:
+        fset = featurize.featurize_time_series(collection,
+                                               features_to_use=features_to_use,
+                                               scheduler=dask.get, **kwargs)
+        npt.assert_array_equal(fset.values, expected.values)
+        assert fset.columns.equals(expected.columns)
+        assert fset.index.equals(expected.index)
+
+
+def test_featurize_time_series_vectorized(monkeypatch):
+    """Test batched evaluation of vectorized feature nodes"""
+    from cesium.features import feature_registry
+    batch_sizes = {}
+
+    def counted(key, batch_func):
+        def counted_batch_func(*args, **kwargs):
+            batch_sizes[key] = len(args[0])
+            return batch_func(*args, **kwargs)
+        return counted_batch_func
+
+    vectorized = ['_stetson_mean', 'qso_model', '_qso_drw_fit']
+    for key in vectorized:
+        spec = feature_registry[key]
+        monkeypatch.setitem(feature_registry.specs, key, spec._replace(
+            batch_func=counted(key, spec.batch_func)))
+
+    sizes = [20, 30, 200, 40]
+    list_of_series = [sample_values(size=size, channels=2) for size in sizes]
+    times, values, errors = [list(x) for x in zip(*list_of_series)]
+    features_to_use = ['stetson_j', 'qso_log_chi2_qsonu', 'qso_tau',
+                       'amplitude']
+    expected = featurize.featurize_time_series(times, values, errors,
+                                               features_to_use,
+                                               scheduler=dask.get)
+    assert not batch_sizes
+    for kwargs in [{'balance': True, 'n_batches': 1},
+                   {'balance': True, 'n_batches': 1, 'shared_memory': True}]:
+        fset = featurize.featurize_time_series(times, values, errors,
+                                               features_to_use,
+                                               scheduler=dask.get, **kwargs)
+        assert batch_sizes == dict.fromkeys(vectorized, 2 * len(sizes))
+        npt.assert_allclose(fset.values, expected.values, rtol=1e-10)
+        batch_sizes.clear()
+
+    # Time budgets apply to each series separately
+    featurize.featurize_time_series(times, values, errors, features_to_use,
+                                    scheduler=dask.get, balance=True,
+                                    n_batches=1, time_budget=60.)
+    assert not batch_sizes
+
+
+def test_featurize_float32():
+    """Test featurization of time series stored in single precision"""
+    t, m, e = sample_values(size=200)
+    features_to_use = ['amplitude', 'std_err', 'freq1_freq',
+                       'qso_log_chi2_qsonu']
+    ts = TimeSeries(t, m, e)
+    ts32 = TimeSeries(t, m, e, dtype='float32')
+    features = featurize.featurize_single_ts(ts, features_to_use)
+    features32 = featurize.featurize_single_ts(ts32, features_to_use)
+    npt.assert_allclose(features32.values, features.values, rtol=1e-4)
+
+
+def test_featurizer():
+    """Test repeated featurization with a persistent featurizer"""
+    features_to_use = ['amplitude', 'std_err', 'freq1_freq']
+    for n_workers in [0, 2]:
+        with featurize.Featurizer(features_to_use,
+                                  n_workers=n_workers) as featurizer:
+            for sizes in [[20, 30, 500], [40]]:
+                times, values, errors = [list(x) for x in zip(
+                    *[sample_values(size=size) for size in sizes])]
+                fset = featurizer.featurize(times, values, errors)
+                expected = featurize.featurize_time_series(
+                    times, values, errors, features_to_use,
+                    scheduler=dask.get)
+                npt.assert_array_equal(fset.values, expected.values)
+                assert fset.columns.equals(expected.columns)
+                assert fset.index.equals(expected.index)
+        assert featurizer._pool is None
+
+
+def test_featurize_windows():
+    """Test featurization of sliding windows"""
+    t, m, e = sample_values(size=200, channels=2)
+    m[0, 50:90] = 1.
+    features_to_use = ['n_epochs', 'total_time', 'std', 'skew', 'maximum',
+                       'median', 'cads_med', 'percent_beyond_1_std',
+                       'max_slope', 'stetson_k']
+    for by, window, stride in [('count', 40, 3), ('count', 40, None),
+                               ('time', 0.5, 0.2)]:
+        fset = featurize.featurize_windows(
+            t, m, e, features_to_use, window=window, stride=stride, by=by,
+            meta_features={'meta1': 1.}, scheduler=dask.get)
+        assert fset.index.names == ['name', 'window']
+        assert (fset['meta1'] == 1.).all().all()
+        for (name, start), row in fset.iterrows():
+            if by == 'count':
+                inds = slice(start, start + window)
+            else:
+                inds = slice(np.searchsorted(t, start),
+                             np.searchsorted(t, start + window))
+            expected = featurize.featurize_time_series(
+                t[inds], m[:, inds], e[:, inds], features_to_use,
+                meta_features={'meta1': 1.}, scheduler=dask.get)
+            # Moments of nearly constant windows lose some precision
+            npt.assert_allclose(row.values, expected.values[0], rtol=1e-6,
+                                atol=1e-12)
+    starts = fset.index.get_level_values('window')
+    npt.assert_allclose(np.diff(starts), 0.2)
+    assert len(fset) == int(np.ptp(t) / 0.2) + 1
+
+    with pytest.raises(ValueError):
+        featurize.featurize_windows(t, m, e, features_to_use)
+
+
+def test_featurize_time_series_time_budget():
+    """Test featurization with time budgets"""
+    import time
+    t = np.sort(np.random.uniform(0., 1000., 500))
+    m = np.sin(2 * np.pi * 0.3 * t) + np.random.normal(0., 0.1, 500)
+    e = 0.1 * np.ones(500)
+    features_to_use = ['amplitude', 'freq1_freq', 'freq2_freq']
+    full = featurize.featurize_time_series(t, m, e, features_to_use,
+                                           scheduler=dask.get)
+    # Full Lomb-Scargle model predicted to exceed the budget, fallback is not
+    fset = featurize.featurize_time_series(t, m, e, features_to_use,
+                                           scheduler=dask.get,
+                                           node_time_budget=0.45)
+    assert fset['time_budget_exceeded'].values == 1
+    npt.assert_allclose(fset[['amplitude', 'freq1_freq']],
+                        full[['amplitude', 'freq1_freq']])
+    assert np.isnan(fset['freq2_freq'].values)
+
+    fset = featurize.featurize_time_series(t, m, e, features_to_use,
+                                           scheduler=dask.get,
+                                           time_budget=1e-9)
+    assert np.isnan(fset[features_to_use].values).all()
+    assert (fset['time_budget_exceeded'].values > 0).all()
+
+    # The joint multiband model is predicted to exceed the budget, so each
+    # channel falls back to its single-band approximation
+    fset = featurize.featurize_time_series([[t, t]], [[m, m]], [[e, e]],
+                                           features_to_use,
+                                           scheduler=dask.get, multiband=True,
+                                           node_time_budget=0.45)
+    assert (fset['time_budget_exceeded'].values == 1).all()
+    npt.assert_allclose(fset['freq1_freq'].values,
+                        full['freq1_freq'].values[0, 0])
+    assert np.isnan(fset['freq2_freq'].values).all()
+
+    # Long-running functions are interrupted
+    custom_functions = {'slow': (lambda t: time.sleep(10.) or 1., 't'),
+                        'slow_plus_one': (lambda x: x + 1, 'slow')}
+    start = time.time()
+    fset = featurize.featurize_time_series(
+        t, m, e, ['amplitude', 'slow', 'slow_plus_one'], scheduler=dask.get,
+        custom_functions=custom_functions, node_time_budget=0.1)
+    assert time.time() - start < 5.
+    assert np.isnan(fset[['slow', 'slow_plus_one']].values).all()
+    assert not np.isnan(fset['amplitude'].values).any()
+    assert fset['time_budget_exceeded'].values == 1
+
+
 def test_featurize_time_series_custom_functions():
     """Test featurize wrapper function for time series w/ custom functions"""
     n_channels = 3
@@ -192,6 +435,28 @@ def test_featurize_time_series_pandas_metafeatures():
     npt.assert_allclose(fset['meta2'], 0.8)
 
 
+def test_assemble_featureset_arrays():
+    """Test assembling featureset from arrays of feature values"""
+    feature_names = ['amplitude', 'std_err']
+    features_list = [np.random.random((2, 2)), np.random.random((2, 1))]
+    meta_features_list = [{'meta1': 0.5}, {'meta1': 0.2}]
+    fset = featurize.assemble_featureset(features_list,
+                                         meta_features_list=meta_features_list,
+                                         names=['a', 'b'],
+                                         feature_names=feature_names)
+    index = pd.MultiIndex.from_product((feature_names, range(2)),
+                                       names=('feature', 'channel'))
+    series_fset = featurize.assemble_featureset(
+        [pd.Series(values.ravel(), index=index[:values.size])
+         for values in features_list[:1]] +
+        [pd.Series(features_list[1].ravel(), index=index[::2])],
+        meta_features_list=meta_features_list, names=['a', 'b'])
+    npt.assert_array_equal(fset.values, series_fset.values)
+    assert fset.columns.equals(series_fset.columns)
+    assert np.isnan(fset.loc['b', ('amplitude', 1)])
+    npt.assert_array_equal(fset['meta1'].values.ravel(), [0.5, 0.2])
+
+
 def test_impute():
     """Test imputation of missing Featureset values."""
     fset, labels = sample_featureset(5, 1, ['amplitude'], ['class1', 'class2'],
@@ -0,0 +1,78 @@
+import numpy.testing as npt
+import numpy as np
+import pytest
+import dask
+from cesium import featurize
+from cesium.online import (OnlineFeatures, QuantileSketch, EXACT_FEATURES,
+                           SKETCHED_FEATURES)
+from cesium.tests.fixtures import sample_values
+
+
+FEATURES = EXACT_FEATURES + sorted(SKETCHED_FEATURES)
+
+
+def test_online_features():
+    """Test incremental features against features of the full series"""
+    t, m, e = sample_values(size=300)
+    state = OnlineFeatures(t[:100], m[:100], e[:100])
+    for i in range(100, 200, 7):
+        state.update(t[i:min(i + 7, 200)], m[i:min(i + 7, 200)],
+                     e[i:min(i + 7, 200)])
+    state.merge(OnlineFeatures(t[200:], m[200:], e[200:]))
+    assert state.n_epochs == 300
+    fset = featurize.featurize_time_series(t, m, e, FEATURES,
+                                           scheduler=dask.get)
+    features = state.features(FEATURES)
+    assert features.index.equals(fset.columns)
+    npt.assert_allclose(features.values, fset.values[0], rtol=1e-10)
+    assert state.exact(FEATURES).all()
+
+    with pytest.raises(ValueError):
+        state.update(t[:10], m[:10], e[:10])
+    with pytest.raises(ValueError):
+        state.features(['freq1_freq'])
+    with pytest.raises(ValueError):
+        OnlineFeatures().features(['mean'])
+
+
+def test_online_features_sketched():
+    """Test approximate features once values exceed the exact limit"""
+    t, m, e = sample_values(size=2000)
+    state = OnlineFeatures(compression=100, max_exact=500)
+    for i in range(0, 2000, 100):
+        state.update(t[i:i + 100], m[i:i + 100], e[i:i + 100])
+    fset = featurize.featurize_time_series(t, m, e, FEATURES,
+                                           scheduler=dask.get)
+    features = state.features(FEATURES)
+    exact = state.exact(FEATURES)
+    assert exact[EXACT_FEATURES].all() and not exact.all()
+    # Select (feature, channel) pairs in order, since selecting a list of
+    # features from the multiindex keeps the order of the index in some
+    # versions of pandas
+    select = lambda values, names: [values[name, 0] for name in names]
+    npt.assert_allclose(select(features, EXACT_FEATURES),
+                        select(fset.iloc[0], EXACT_FEATURES), rtol=1e-10)
+    sketched = ['median', 'median_absolute_deviation', 'stetson_k',
+                'cads_med']
+    npt.assert_allclose(select(features, sketched),
+                        select(fset.iloc[0], sketched), rtol=0.05, atol=0.01)
+
+
+def test_quantile_sketch():
+    """Test merged quantile sketches"""
+    x = np.random.normal(size=10000)
+    sketch = QuantileSketch(max_exact=100)
+    sketch.update(x[:5000])
+    other = QuantileSketch(max_exact=100)
+    for i in range(5000, 10000, 50):
+        other.update(x[i:i + 50])
+    sketch.merge(other)
+    assert not sketch.exact and sketch.n == len(x)
+    assert len(sketch._means) <= sketch.compression
+    q = np.array([0., 0.01, 0.25, 0.5, 0.75, 0.99, 1.])
+    quantiles = sketch.quantile(q)
+    assert quantiles[0] == x.min() and quantiles[-1] == x.max()
+    npt.assert_allclose(np.searchsorted(np.sort(x), quantiles) / len(x), q,
+                        atol=0.002)
+    with pytest.raises(ValueError):
+        sketch.values()
@@ -0,0 +1,68 @@
+import os
+import pickle
+import numpy.testing as npt
+import numpy as np
+import pytest
+import dask
+from cesium import featurize, time_series
+from cesium.store import TimeSeriesStore
+from cesium.time_series import TimeSeriesCollection
+from cesium.tests.fixtures import (sample_ts_list, sample_ts_files,
+                                   assert_ts_equal)
+
+
+def test_time_series_store(tmpdir):
+    path = os.path.join(str(tmpdir), 'store')
+    time_series = sample_ts_list()
+    store = TimeSeriesStore(path, 'w')
+    assert len(store) == 0
+    assert len(store.collection()) == 0
+    store.append(time_series[0])
+    store.append(TimeSeriesCollection.from_time_series(time_series[1:]))
+    assert len(store) == 3
+
+    store = pickle.loads(pickle.dumps(TimeSeriesStore(path)))
+    assert isinstance(store.collection().time, np.memmap)
+    for ts, stored_ts in zip(time_series, store):
+        assert_ts_equal(ts, stored_ts)
+    with pytest.raises(ValueError):
+        store.append(time_series)
+    store = TimeSeriesStore(path, 'a')
+    ts = sample_ts_list()[0]
+    ts.meta_features['f'] = np.arange(3.)
+    with pytest.raises(ValueError):
+        store.append(ts)
+    assert len(store) == 3
+
+    # Values written by an interrupted append are discarded
+    with open(os.path.join(path, 'time.dat'), 'ab') as f:
+        f.write(b'\0' * 24)
+    store = TimeSeriesStore(path, 'a')
+    assert len(store) == 3
+    store.append(time_series[::-1])
+    assert len(store) == 6
+    for ts, stored_ts in zip(time_series + time_series[::-1], store):
+        assert_ts_equal(ts, stored_ts)
+
+    with pytest.raises(IOError):
+        TimeSeriesStore(str(tmpdir), 'r')
+
+    store = TimeSeriesStore(path, 'w')
+    store.extend((ts for ts in time_series * 3), batch_size=2)
+    assert len(store) == 9
+    for ts, stored_ts in zip(time_series * 3, store):
+        assert_ts_equal(ts, stored_ts)
+
+
+def test_featurize_store(tmpdir):
+    path = os.path.join(str(tmpdir), 'store')
+    with sample_ts_files(size=4, labels=['A', 'B']) as ts_paths:
+        fset, labels = featurize.featurize_ts_files(ts_paths, ['std_err'],
+                                                    scheduler=dask.get)
+        with TimeSeriesStore(path, 'w') as store:
+            store.append([time_series.load(ts_path) for ts_path in ts_paths])
+    store_fset, store_labels = featurize.featurize_ts_files(
+        path, ['std_err'], scheduler=dask.get)
+    npt.assert_array_equal(store_fset.values, fset.values)
+    assert list(store_fset.index) == list(fset.index)
+    assert store_labels == labels
@@ -1,9 +1,12 @@
 import os
+import pickle
 from uuid import uuid4
 import numpy.testing as npt
 import numpy as np
+import pytest
 from cesium import time_series
-from cesium.time_series import TimeSeries
+from cesium.time_series import TimeSeries, TimeSeriesCollection
+from cesium.tests.fixtures import sample_ts_list, assert_ts_equal
 
 
 def sample_time_series(size=51, channels=1):
@@ -33,20 +36,6 @@ def test__compatible_shapes():
     assert compat([0, 1], np.arange(2))
 
 
-def assert_ts_equal(ts1, ts2):
-    for x1, x2 in zip((ts1.time, ts1.measurement, ts1.error),
-                      (ts2.time, ts2.measurement, ts2.error)):
-        assert type(x1) == type(x2)
-        if isinstance(x1, np.ndarray):
-            assert np.array_equal(x1, x2)
-        else:
-            assert all(np.array_equal(x1_i, x2_i)
-                       for x1_i, x2_i in zip(x1, x2))
-    assert ts1.label == ts2.label
-    assert ts1.meta_features == ts2.meta_features
-    assert ts1.name == ts2.name
-
-
 def test_time_series_init_1d():
     t, m, e = sample_time_series(channels=1)
     ts = TimeSeries(t, m, e)
@@ -171,6 +160,76 @@ def test_time_series_npz(tmpdir):
     assert_ts_equal(ts, ts_loaded)
 
 
+def test_time_series_sorted_no_copy():
+    t, m, e = sample_time_series(channels=1)
+    ts = TimeSeries(t, m, e)
+    assert ts.time is t and ts.measurement is m and ts.error is e
+
+    t, m, e = sample_time_series(channels=3)
+    t_orig, m_orig = t.copy(), m.copy()
+    ts = TimeSeries(t, m, e)
+    assert ts.time is t
+    t[:, :2] = t[:, 1::-1]
+    ts = TimeSeries(t, m, e)
+    npt.assert_array_equal(ts.time, t_orig)
+    # Inputs are not sorted in place
+    npt.assert_array_equal(t[:, :2], t_orig[:, 1::-1])
+    npt.assert_array_equal(m, m_orig)
+    ts = TimeSeries(t, m, e, assume_sorted=True)
+    assert ts.time is t
+
+
+def test_time_series_lazy_load(tmpdir, monkeypatch):
+    n_channels = 3
+    t, m, e = sample_time_series(channels=n_channels)
+    t = [t[i][0:i+2] for i in range(len(t))]
+    m = [m[i][0:i+2] for i in range(len(m))]
+    e = [e[i][0:i+2] for i in range(len(e))]
+    ts = TimeSeries(t, m, e, label='A', meta_features={'meta1': 1.},
+                    name='a')
+    ts_path = os.path.join(str(tmpdir), str(uuid4()) + '.npz')
+    ts.save(ts_path)
+
+    ts_lazy = time_series.load(ts_path, lazy=True)
+    assert isinstance(ts_lazy, time_series.LazyTimeSeries)
+    loaded_paths = []
+    load = time_series.load
+    monkeypatch.setattr(time_series, 'load',
+                        lambda path: loaded_paths.append(path) or load(path))
+    assert (ts_lazy.name, ts_lazy.label) == ('a', 'A')
+    assert ts_lazy.meta_features == {'meta1': 1.}
+    assert loaded_paths == []
+    assert ts_lazy.n_channels == n_channels
+    assert ts_lazy.channel_names[-1] == 'channel_2'
+    assert_ts_equal(ts, ts_lazy)
+    assert loaded_paths == [ts_path]
+
+
+def test_time_series_lazy_pickle(tmpdir, monkeypatch):
+    t, m, e = sample_time_series()
+    ts = TimeSeries(t, m, e, label='A', meta_features={'meta1': 1.},
+                    name='a')
+    ts_path = os.path.join(str(tmpdir), str(uuid4()) + '.npz')
+    ts.save(ts_path)
+
+    loaded_paths = []
+    load = time_series.load
+    monkeypatch.setattr(time_series, 'load',
+                        lambda path: loaded_paths.append(path) or load(path))
+    ts_lazy = pickle.loads(pickle.dumps(time_series.LazyTimeSeries(ts_path)))
+    assert loaded_paths == []
+    assert isinstance(ts_lazy, time_series.LazyTimeSeries)
+    assert (ts_lazy.name, ts_lazy.label, ts_lazy.path) == ('a', 'A', ts_path)
+    assert ts_lazy.meta_features == {'meta1': 1.}
+    assert_ts_equal(ts, ts_lazy)
+    assert loaded_paths == [ts_path]
+
+    # Values that have already been read are pickled along with the metadata
+    ts_loaded = pickle.loads(pickle.dumps(ts_lazy))
+    assert_ts_equal(ts, ts_loaded)
+    assert loaded_paths == [ts_path]
+
+
 def test_time_series_sort():
     t, m, e = sample_time_series(channels=1)
     t[:2] = t[1::-1]
@@ -193,3 +252,84 @@ def test_time_series_sort():
         npt.assert_allclose(ts.time[i], np.sort(t[0]))
         npt.assert_allclose(ts.measurement[i], m[i][np.argsort(t[0])])
         npt.assert_allclose(ts.error[i], e[0][np.argsort(t[0])])
+
+
+def sample_collection():
+    time_series = sample_ts_list()
+    return time_series, TimeSeriesCollection.from_time_series(time_series)
+
+
+def test_time_series_collection():
+    time_series, collection = sample_collection()
+    assert len(collection) == 3
+    npt.assert_array_equal(collection.n_channels, [1, 3, 3])
+    npt.assert_array_equal(collection.n_epochs, [51, 51, 51, 51, 2, 3, 4])
+    npt.assert_array_equal(collection.names, ['a', 'b', 'c'])
+    npt.assert_allclose(collection.baselines()[:4],
+                        np.ptp(time_series[0].time))
+    for ts, ts_collection in zip(time_series, collection):
+        assert_ts_equal(ts, ts_collection)
+
+    # Channels are views of the flat arrays
+    t, m, e = collection.channels(1)[2]
+    assert np.shares_memory(m, collection.measurement)
+    npt.assert_array_equal(m, time_series[1].measurement[2])
+    times, values, errors = collection.channel_arrays()
+    assert len(values) == 7
+    npt.assert_array_equal(values[6], time_series[2].measurement[2])
+
+    with pytest.raises(ValueError):
+        TimeSeriesCollection(t, m, e[:-1], [0, len(t)])
+
+
+def test_time_series_collection_indexing():
+    time_series, collection = sample_collection()
+    assert_ts_equal(collection[-1], time_series[2])
+    with pytest.raises(IndexError):
+        collection[3]
+
+    subset = collection[1:]
+    assert np.shares_memory(subset.time, collection.time)
+    assert len(subset) == 2 and list(subset.names) == ['b', 'c']
+    assert_ts_equal(subset[0], time_series[1])
+    assert_ts_equal(subset[1], time_series[2])
+    assert len(collection[2:1]) == 0
+
+    for key in ([2, 0], np.array([False, False, True]), slice(None, None, 2)):
+        subset = collection[key]
+        indices = np.arange(3)[key]
+        assert len(subset) == len(indices)
+        for i, ts in zip(indices, subset):
+            assert_ts_equal(ts, time_series[i])
+
+    by_feature = collection.sort_by('f')
+    assert list(by_feature.names) == ['a', 'c', 'b']
+    by_length = collection.sort_by(collection.n_channels, ascending=False)
+    assert by_length.names[-1] == 'a'
+
+
+def test_time_series_collection_sort():
+    t, m, e = sample_time_series(size=10, channels=2)
+    collection = TimeSeriesCollection(t[:, ::-1].ravel(), m[:, ::-1].ravel(),
+                                      e[:, ::-1].ravel(), [0, 10, 20])
+    collection.sort()
+    for i, (t_i, m_i, e_i) in enumerate(zip(*collection.channel_arrays())):
+        npt.assert_array_equal(t_i, t[i])
+        npt.assert_array_equal(m_i, m[i])
+        npt.assert_array_equal(e_i, e[i])
+
+
+def test_time_series_compact():
+    t, m, e = sample_time_series(channels=3)
+    ts = TimeSeries(t, m, e, dtype='float32')
+    assert not hasattr(ts, '__dict__')
+    assert ts.time.dtype == np.float64
+    assert ts.measurement.dtype == ts.error.dtype == np.float32
+    npt.assert_allclose(ts.measurement, m, rtol=1e-6)
+    assert ts.channel_names == ['channel_0', 'channel_1', 'channel_2']
+    ts.channel_names = ['g', 'r', 'i']
+    assert ts.channel_names == ['g', 'r', 'i']
+
+    collection = TimeSeriesCollection.from_time_series([ts])
+    assert collection.measurement.dtype == np.float32
+    assert collection[0].measurement.dtype == np.float32
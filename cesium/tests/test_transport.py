@@ -0,0 +1,62 @@
+import os
+import pickle
+import numpy.testing as npt
+import numpy as np
+import dask
+import dask.multiprocessing
+from cesium import featurize
+from cesium.transport import SharedTimeSeriesData
+from cesium.tests.fixtures import sample_ts_list
+
+
+def test_shared_time_series_data():
+    """Test storing time series and features in shared files"""
+    time_series = sample_ts_list(channels=2)
+    shared = SharedTimeSeriesData(time_series, 3)
+    assert os.path.isdir(shared.path)
+    assert len(shared) == 3
+    shared = pickle.loads(pickle.dumps(shared))
+    for i, ts in enumerate(time_series):
+        shared_ts = shared.get(i, name=ts.name)
+        assert shared_ts.name == ts.name
+        assert shared_ts.n_channels == ts.n_channels
+        for (t1, m1, e1), (t2, m2, e2) in zip(ts.channels(),
+                                              shared_ts.channels()):
+            npt.assert_array_equal(t1, t2)
+            npt.assert_array_equal(m1, m2)
+            npt.assert_array_equal(e1, e2)
+
+    assert np.isnan(shared.features()).all()
+    shared.set_features(0, np.arange(3.).reshape(3, 1))
+    shared.set_features(1, np.ones((3, 2)))
+    features = shared.features()
+    assert features.shape == (3, 3, 2)
+    npt.assert_array_equal(features[0, :, 0], np.arange(3.))
+    assert np.isnan(features[0, :, 1]).all()
+    npt.assert_array_equal(features[1], 1.)
+    assert np.isnan(features[2]).all()
+    # Written values are shared with other instances once flushed
+    shared.flush()
+    npt.assert_array_equal(pickle.loads(pickle.dumps(shared)).features(),
+                           features)
+
+    shared.close()
+    assert not os.path.exists(shared.path)
+
+
+def test_featurize_time_series_shared_memory():
+    """Test featurization through shared files"""
+    time_series = sample_ts_list()
+    times, values, errors = zip(*[(ts.time, ts.measurement, ts.error)
+                                  for ts in time_series[:2]])
+    features_to_use = ['amplitude', 'std_err', 'freq1_freq']
+    fset = featurize.featurize_time_series(times, values, errors,
+                                           features_to_use,
+                                           scheduler=dask.get)
+    for scheduler in [dask.get, dask.multiprocessing.get]:
+        shared_fset = featurize.featurize_time_series(
+            times, values, errors, features_to_use, scheduler=scheduler,
+            shared_memory=True)
+        npt.assert_array_equal(shared_fset.values, fset.values)
+        assert shared_fset.columns.equals(fset.columns)
+        assert shared_fset.index.equals(fset.index)
@@ -1,4 +1,6 @@
 import os
+import tarfile
+import zipfile
 from cesium import util
 import numpy.testing as npt
 
@@ -29,3 +31,27 @@ def test_remove_files(tmpdir):
 
     # File does not exist, should not raise exception
     util.remove_files(fpath)
+
+
+def test_iter_archive(tmpdir):
+    """Test util.iter_archive"""
+    contents = {'a.dat': b'1,2,3\n', 'b/c.dat': b'4,5,6\n'}
+    tar_path = os.path.join(str(tmpdir), 'data.tar.gz')
+    zip_path = os.path.join(str(tmpdir), 'data.zip')
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        for name, data in contents.items():
+            archive.writestr(name, data)
+    with tarfile.open(tar_path, 'w:gz') as archive:
+        archive.add(zip_path, 'dir/data.zip')
+        for name, data in contents.items():
+            path = os.path.join(str(tmpdir), name.replace('/', '_'))
+            with open(path, 'wb') as f:
+                f.write(data)
+            archive.add(path, name)
+    assert dict(util.iter_archive(zip_path)) == contents
+    members = dict(util.iter_archive(tar_path))
+    with open(zip_path, 'rb') as f:
+        assert members.pop('dir/data.zip') == f.read()
+    assert members == contents
+    path = os.path.join(str(tmpdir), 'a.dat')
+    assert list(util.iter_archive(path)) == [(path, b'1,2,3\n')]
@@ -0,0 +1,55 @@
+import numpy.testing as npt
+import numpy as np
+from cesium import windows
+from cesium.features.common_functions import compute_moments
+
+
+def sample_windows(n=300):
+    starts = np.sort(np.random.randint(0, n, 50))
+    ends = np.minimum(starts + np.random.randint(0, 40, 50), n)
+    return starts, np.maximum.accumulate(ends)
+
+
+def test_rolling_statistics():
+    """Test statistics of all windows against values of each window"""
+    x = np.random.normal(10., 1., 300)
+    x[100:150] = 12.
+    e = np.random.uniform(0.1, 1., 300)
+    starts, ends = sample_windows()
+    lo, hi = windows.rolling_extrema(x, starts, ends)
+    moments = windows.rolling_moments(x, e, starts, ends)
+    for k, (s, e_k) in enumerate(zip(starts, ends)):
+        if e_k == s:
+            assert np.isnan(lo[k]) and np.isnan(hi[k])
+            continue
+        assert lo[k] == x[s:e_k].min() and hi[k] == x[s:e_k].max()
+        expected = compute_moments(x[s:e_k], e[s:e_k])
+        for key in expected:
+            npt.assert_allclose(moments[key][k], expected[key], rtol=1e-8,
+                                atol=1e-10)
+
+    # Heavily overlapping windows use a sorted buffer, others do not
+    for starts, ends in [(np.arange(0, 200, 2), np.arange(100, 300, 2)),
+                         (np.arange(0, 260, 40), np.arange(40, 300, 40))]:
+        medians = windows.rolling_median(x, starts, ends)
+        for k, (s, e_k) in enumerate(zip(starts, ends)):
+            if e_k > s:
+                assert medians[k] == np.median(x[s:e_k])
+            else:
+                assert np.isnan(medians[k])
+
+
+def test_window_starts():
+    """Test starts and bounds of count- and time-based windows"""
+    t = np.array([0., 0.5, 1., 3., 3.5])
+    starts = windows.window_starts([t, t[:3]], 2, 1)
+    npt.assert_array_equal(starts, [0, 1, 2, 3])
+    first, last = windows.window_bounds(t[:3], starts, 2)
+    npt.assert_array_equal(first, [0, 1, 2, 3])
+    npt.assert_array_equal(last, [2, 3, 3, 3])
+
+    starts = windows.window_starts([t, t + 0.2], 1., by='time')
+    npt.assert_array_equal(starts, [0., 1., 2., 3.])
+    first, last = windows.window_bounds(t, starts, 1., by='time')
+    npt.assert_array_equal(first, [0, 2, 3, 3])
+    npt.assert_array_equal(last, [2, 3, 3, 5])
@@ -1,10 +1,10 @@
-import copy
 from collections import Iterable
 import numpy as np
+import pandas as pd
 
 
-__all__ = ['load', 'TimeSeries', 'DEFAULT_MAX_TIME',
-           'DEFAULT_ERROR_VALUE']
+__all__ = ['load', 'TimeSeries', 'LazyTimeSeries', 'TimeSeriesCollection',
+           'DEFAULT_MAX_TIME', 'DEFAULT_ERROR_VALUE']
 
 
 DEFAULT_MAX_TIME = 1.0
@@ -59,49 +59,92 @@ def _default_values_like(old_values, value=None, upper=None):
     else:
         raise ValueError("Either `value` or `upper` must be provided.")
 
-    new_values = copy.deepcopy(old_values)
     if _ndim(old_values) == 1 or (isinstance(old_values, np.ndarray) and 1 in
                                   old_values.shape):
+        new_values = np.empty_like(old_values)
         new_values[:] = np.linspace(lower, upper, len(new_values))
+    elif isinstance(old_values, np.ndarray):
+        new_values = np.empty_like(old_values)
+        new_values[:] = np.linspace(lower, upper, new_values.shape[1])
     else:
-        for new_array in new_values:
-            new_array[:] = np.linspace(lower, upper, len(new_array))
+        new_values = [np.linspace(lower, upper, len(old_array)).astype(
+                          np.asarray(old_array).dtype)
+                      for old_array in old_values]
 
     return new_values
 
 
-def _make_array_if_possible(x):
+def _make_array_if_possible(x, dtype='float64'):
     """Helper function to cast (1, n) arrays to (n,) arrrays, or uniform lists
-    of arrays to (p, n) arrays.
+    of arrays to (p, n) arrays, of type `dtype`; ragged lists are converted to
+    lists of arrays of type `dtype`.
     """
     try:
-        x = np.asfarray(x).squeeze()
+        x = np.asarray(x, dtype=dtype).squeeze()
     except ValueError:
-        pass
+        x = [np.asarray(x_i, dtype=dtype) for x_i in x]
     return x
 
 
-def load(ts_path):
-    """Load serialized TimeSeries from .npz file."""
-    with np.load(ts_path) as npz_file:
-        data = dict(npz_file)
+def _load_metadata(npz_file):
+    """Read name, label and metafeatures from an open .npz file of a
+    `TimeSeries`, without reading its values."""
+    files = npz_file.files
+    # Convert 0d arrays to single values
+    return {'name': npz_file['name'].item() if 'name' in files else None,
+            'label': npz_file['label'].item() if 'label' in files else None,
+            'meta_features': dict(zip(npz_file['meta_feat_names'],
+                                      npz_file['meta_feat_values']))}
+
 
+def _load_values(npz_file):
+    """Read time, measurement and error values from an open .npz file of a
+    `TimeSeries`."""
+    values = {}
     for key in ['time', 'measurement', 'error']:
-        if key not in data:  # combine channel arrays into list
-            n_channels = sum(1 for c in data.keys() if key in c)  # time0, ...
-            data[key] = [data[key + str(i)] for i in range(n_channels)]
+        if key in npz_file.files:
+            values[key] = npz_file[key]
+        else:  # combine channel arrays into list
+            n_channels = sum(1 for c in npz_file.files
+                             if c[len(key):].isdigit() and c.startswith(key))
+            values[key] = ([npz_file[key + str(i)] for i in range(n_channels)]
+                           if n_channels > 0 else None)
+    return values
+
+
+def _is_sorted(x):
+    """Check whether the values of the 1d array `x` are in ascending order."""
+    return bool(np.all(x[1:] >= x[:-1]))
+
+
+def _take_channels(x, inds):
+    """Reorder the values of each channel of `x` (a 1d or 2d array or a list
+    of 1d arrays) by the index array `inds`, or by a list of index arrays
+    for each channel."""
+    if _ndim(x) == 1:
+        return x[inds]
+    elif not isinstance(inds, list):
+        return x[:, inds] if isinstance(x, np.ndarray) else [x_i[inds]
+                                                             for x_i in x]
+    channels = [x_i[inds_i] for x_i, inds_i in zip(x, inds)]
+    return np.array(channels) if isinstance(x, np.ndarray) else channels
+
+
+def load(ts_path, lazy=False):
+    """Load serialized TimeSeries from .npz file.
+
+    If `lazy` is True, only the name, label and metafeatures are read, and the
+    values are read when first accessed (see `LazyTimeSeries`).
+    """
+    if lazy:
+        return LazyTimeSeries(ts_path)
 
-    # Convert 0d arrays to single values
-    if 'name' in data:
-        data['name'] = data['name'].item()
-    if 'label' in data:
-        data['label'] = data['label'].item()
+    with np.load(ts_path) as npz_file:
+        values = _load_values(npz_file)
+        metadata = _load_metadata(npz_file)
 
-    return TimeSeries(t=data.get('time'), m=data.get('measurement'),
-                      e=data.get('error'),
-                      meta_features=dict(zip(data['meta_feat_names'],
-                                             data['meta_feat_values'])),
-                      name=data.get('name'), label=data.get('label'))
+    return TimeSeries(t=values['time'], m=values['measurement'],
+                      e=values['error'], **metadata)
 
 
 class TimeSeries(object):
@@ -152,11 +195,23 @@ class TimeSeries(object):
         `channel_{i}`, but can be arbitrary depending on the nature of the
         different measurement channels.
     """
+    __slots__ = ('time', 'measurement', 'error', 'label', 'meta_features',
+                 'name', 'path', 'n_channels', '_channel_names')
+
     def __init__(self, t=None, m=None, e=None, label=None, meta_features={},
-                 name=None, path=None, channel_names=None):
+                 name=None, path=None, channel_names=None, assume_sorted=False,
+                 dtype='float64'):
         """Create a `TimeSeries` object from measurement values/metadata.
 
-        See `TimeSeries` documentation for parameter values.
+        See `TimeSeries` documentation for parameter values. Values are sorted
+        by time unless they are already sorted, or `assume_sorted` is True (in
+        which case they are not checked); arrays of floats are used without
+        copying when they do not need to be sorted.
+
+        Measurements and errors are stored as `dtype`; 'float32' halves their
+        memory use, for data that do not need double precision (times are
+        always stored as float64). Features that are sensitive to rounding
+        errors are computed in double precision regardless.
         """
         if t is None and m is None:
             raise ValueError("Either times or measurements must be provided.")
@@ -189,9 +244,10 @@ class TimeSeries(object):
                              " arrays.")
 
         self.time = _make_array_if_possible(t)
-        self.measurement = _make_array_if_possible(m)
-        self.error = _make_array_if_possible(e)
-        self.sort()  # re-order by time before broadcasting
+        self.measurement = _make_array_if_possible(m, dtype)
+        self.error = _make_array_if_possible(e, dtype)
+        if not assume_sorted:
+            self.sort()  # re-order by time before broadcasting
 
         if _ndim(self.time) == 1 and _ndim(self.measurement) == 2:
             if isinstance(self.measurement, np.ndarray):
@@ -217,11 +273,17 @@ class TimeSeries(object):
         self.meta_features = dict(meta_features)
         self.name = name
         self.path = path
-        if channel_names is None:
-            self.channel_names = ["channel_{}".format(i)
-                                  for i in range(self.n_channels)]
-        else:
-            self.channel_names = channel_names
+        self.channel_names = channel_names
+
+    @property
+    def channel_names(self):
+        if self._channel_names is None:
+            return ["channel_{}".format(i) for i in range(self.n_channels)]
+        return self._channel_names
+
+    @channel_names.setter
+    def channel_names(self, channel_names):
+        self._channel_names = channel_names
 
     def channels(self):
         """Iterates over measurement channels (whether one or multiple)."""
@@ -241,27 +303,21 @@ class TimeSeries(object):
         return zip(t_channels, m_channels, e_channels)
 
     def sort(self):
-        """Sort times, measurements, and errors by time."""
+        """Sort times, measurements, and errors by time.
+
+        Values that are already sorted are left unchanged (without copying).
+        """
         if _ndim(self.time) == 1:
+            if _is_sorted(self.time):
+                return
             inds = np.argsort(self.time)
-            self.time = self.time[inds]
-            if _ndim(self.measurement) == 1:
-                self.measurement = self.measurement[inds]
-            else:
-                for i in range(len(self.measurement)):
-                   self.measurement[i] = self.measurement[i][inds]
-            if _ndim(self.error) == 1:
-                self.error = self.error[inds]
-            else:
-                for i in range(len(self.error)):
-                   self.error[i] = self.error[i][inds]
         else:  # if time is 2d, so are measurement and error
-            for i in range(len(self.time)):
-                inds = np.argsort(self.time[i])
-                self.time[i] = self.time[i][inds]
-                self.measurement[i] = self.measurement[i][inds]
-                self.error[i] = self.error[i][inds]
-
+            if all(_is_sorted(t_i) for t_i in self.time):
+                return
+            inds = [np.argsort(t_i) for t_i in self.time]
+        self.time = _take_channels(self.time, inds)
+        self.measurement = _take_channels(self.measurement, inds)
+        self.error = _take_channels(self.error, inds)
 
     def save(self, path=None):
         """Store TimeSeries object as a single .npz file.
@@ -297,3 +353,273 @@ class TimeSeries(object):
         if self.label:
             data['label'] = self.label
         np.savez(path, **data)
+
+
+class LazyTimeSeries(TimeSeries):
+    """`TimeSeries` stored in a .npz file (see `TimeSeries.save`), of which
+    only the name, label and metafeatures are read until the values are
+    first accessed.
+
+    Parameters
+    ----------
+    path : str
+        Path of the .npz file.
+    """
+    __slots__ = ()
+    # Attributes that are only available once the values have been read
+    _value_attributes = ('time', 'measurement', 'error', 'n_channels',
+                         '_channel_names')
+
+    def __init__(self, path):
+        with np.load(path) as npz_file:
+            metadata = _load_metadata(npz_file)
+        self.label = metadata['label']
+        self.meta_features = metadata['meta_features']
+        self.name = metadata['name']
+        self.path = path
+
+    def __getattr__(self, key):
+        # Only called for attributes that have not been set
+        if key not in self._value_attributes:
+            raise AttributeError(key)
+        ts = load(self.path)
+        for attr in self._value_attributes:
+            setattr(self, attr, getattr(ts, attr))
+        return getattr(self, key)
+
+    def __getstate__(self):
+        # Only include the values if they have already been read, so that
+        # pickling (e.g. to send the series to another process) does not load
+        # them
+        state = {}
+        for attr in TimeSeries.__slots__:
+            try:
+                state[attr] = object.__getattribute__(self, attr)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
+
+def _ranges(starts, counts):
+    """Concatenation of the ranges `start:start + count` for each pair of
+    `starts`, `counts`."""
+    ends = np.cumsum(counts)
+    total = ends[-1] if len(ends) > 0 else 0
+    return np.repeat(starts - ends + counts, counts) + np.arange(total)
+
+
+class TimeSeriesCollection(object):
+    """Class representing many time series stored as flat arrays.
+
+    Rather than storing separate arrays for each time series, the values of
+    all channels of all time series are concatenated into single `time`,
+    `measurement` and `error` arrays, along with the offsets of each channel
+    and of the channels of each time series; metadata is stored in a single
+    table. Individual time series (as `TimeSeries` objects) and their channels
+    are available as views of the flat arrays, without copying any values
+    (see `channels`).
+
+    Indexing with an integer returns a `TimeSeries`; indexing with a slice,
+    an array of integers or a boolean mask returns a `TimeSeriesCollection`,
+    which shares the value arrays of the original collection in the case of
+    slices with unit step.
+
+    Attributes
+    ----------
+    time, measurement, error : (n_values,) array
+        Values of all channels of all time series, concatenated.
+    channel_offsets : (n_channels + 1,) array of int
+        Index of the first value of each channel in the value arrays, followed
+        by the total number of values.
+    series_offsets : (n_series + 1,) array of int
+        Index of the first channel of each time series, followed by the total
+        number of channels.
+    names : (n_series,) array
+        Identifying name of each time series.
+    labels : (n_series,) array or None
+        Class label or regression target of each time series (if applicable).
+    meta_features : pd.DataFrame
+        Metafeatures (columns) of each time series (rows, in order).
+    """
+    def __init__(self, time, measurement, error, channel_offsets,
+                 series_offsets=None, names=None, labels=None,
+                 meta_features=None):
+        """Create a `TimeSeriesCollection` from flat arrays of values and
+        offsets; the arrays are used without copying.
+
+        See `TimeSeriesCollection` documentation for parameter values; by
+        default each channel is a separate time series.
+        """
+        self.time = np.asanyarray(time)
+        self.measurement = np.asanyarray(measurement)
+        self.error = np.asanyarray(error)
+        self.channel_offsets = np.asarray(channel_offsets, dtype='int64')
+        if series_offsets is None:
+            series_offsets = np.arange(len(self.channel_offsets))
+        self.series_offsets = np.asarray(series_offsets, dtype='int64')
+        n_series = len(self.series_offsets) - 1
+        self.names = (np.arange(n_series) if names is None
+                      else np.asarray(names))
+        self.labels = None if labels is None else np.asarray(labels)
+        if meta_features is None:
+            meta_features = pd.DataFrame(index=range(n_series))
+        self.meta_features = pd.DataFrame(meta_features).reset_index(drop=True)
+
+        if not (len(self.time) == len(self.measurement) == len(self.error) ==
+                self.channel_offsets[-1]):
+            raise ValueError("times, values, errors and channel offsets are "
+                             "not of compatible sizes.")
+        if self.series_offsets[-1] != len(self.channel_offsets) - 1:
+            raise ValueError("Series offsets do not match the number of "
+                             "channels.")
+        if (len(self.names) != n_series or len(self.meta_features) != n_series
+                or (self.labels is not None and len(self.labels) != n_series)):
+            raise ValueError("Names, labels and metafeatures must be given "
+                             "for each time series.")
+
+    @classmethod
+    def from_time_series(cls, time_series):
+        """Create a `TimeSeriesCollection` from a list of `TimeSeries`."""
+        channels = [channel for ts in time_series for channel in ts.channels()]
+        n_epochs = [len(t) for t, m, e in channels]
+        time, measurement, error = [
+            np.concatenate([channel[j] for channel in channels])
+            if channels else np.empty(0) for j in range(3)]
+        labels = [ts.label for ts in time_series]
+        return cls(time, measurement, error,
+                   channel_offsets=np.cumsum([0] + n_epochs),
+                   series_offsets=np.cumsum(
+                       [0] + [ts.n_channels for ts in time_series]),
+                   names=[ts.name for ts in time_series],
+                   labels=(None if all(label is None for label in labels)
+                           else labels),
+                   meta_features=pd.DataFrame([ts.meta_features
+                                               for ts in time_series],
+                                              index=range(len(time_series))))
+
+    def __len__(self):
+        return len(self.series_offsets) - 1
+
+    @property
+    def n_channels(self):
+        """Number of channels of each time series."""
+        return np.diff(self.series_offsets)
+
+    @property
+    def n_epochs(self):
+        """Number of values of each channel."""
+        return np.diff(self.channel_offsets)
+
+    def baselines(self):
+        """Time spanned by each channel (0 for empty channels)."""
+        n_epochs = self.n_epochs
+        baselines = np.zeros(len(n_epochs))
+        starts = self.channel_offsets[:-1][n_epochs > 0]
+        if len(starts) > 0:
+            baselines[n_epochs > 0] = (np.maximum.reduceat(self.time, starts) -
+                                       np.minimum.reduceat(self.time, starts))
+        return baselines
+
+    def meta_features_list(self):
+        """Metafeatures of each time series, as a list of dicts."""
+        if len(self.meta_features.columns) == 0:
+            return [{} for i in range(len(self))]
+        return self.meta_features.to_dict('records')
+
+    def channels(self, i):
+        """List of (time, measurement, error) views for each channel of time
+        series `i`."""
+        offsets = self.channel_offsets[self.series_offsets[i]:
+                                       self.series_offsets[i + 1] + 1]
+        return [(self.time[start:end], self.measurement[start:end],
+                 self.error[start:end])
+                for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def channel_arrays(self):
+        """Lists of time, measurement and error views of all channels of all
+        time series (e.g. for batched feature functions)."""
+        split = self.channel_offsets[1:-1]
+        return (np.split(self.time, split), np.split(self.measurement, split),
+                np.split(self.error, split))
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            i = range(len(self))[key]
+            t, m, e = zip(*self.channels(i))
+            if len(t) == 1:
+                t, m, e = t[0], m[0], e[0]
+            else:
+                t, m, e = list(t), list(m), list(e)
+            return TimeSeries(t, m, e,
+                              label=(None if self.labels is None
+                                     else self.labels[i]),
+                              meta_features=self.meta_features.iloc[i]
+                              .to_dict(),
+                              name=self.names[i],
+                              dtype=self.measurement.dtype)
+        elif isinstance(key, slice) and key.step in (None, 1):
+            start, stop, _ = key.indices(len(self))
+            stop = max(start, stop)
+            first, last = self.series_offsets[[start, stop]]
+            values = slice(self.channel_offsets[first],
+                           self.channel_offsets[last])
+            return TimeSeriesCollection(
+                self.time[values], self.measurement[values],
+                self.error[values],
+                self.channel_offsets[first:last + 1] - values.start,
+                self.series_offsets[start:stop + 1] - first,
+                names=self.names[start:stop],
+                labels=(None if self.labels is None
+                        else self.labels[start:stop]),
+                meta_features=self.meta_features.iloc[start:stop])
+        elif isinstance(key, slice):
+            return self.take(np.arange(len(self))[key])
+        else:
+            key = np.asarray(key)
+            if key.dtype == bool:
+                key = np.flatnonzero(key)
+            return self.take(key)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def take(self, indices):
+        """Collection of the time series `indices` (in order), with copies of
+        their values."""
+        indices = np.asarray(indices, dtype='int64')
+        n_channels = self.n_channels[indices]
+        channels = _ranges(self.series_offsets[indices], n_channels)
+        n_epochs = self.n_epochs[channels]
+        values = _ranges(self.channel_offsets[channels], n_epochs)
+        return TimeSeriesCollection(
+            self.time[values], self.measurement[values], self.error[values],
+            np.concatenate(([0], np.cumsum(n_epochs))),
+            np.concatenate(([0], np.cumsum(n_channels))),
+            names=self.names[indices],
+            labels=None if self.labels is None else self.labels[indices],
+            meta_features=self.meta_features.iloc[indices])
+
+    def sort(self):
+        """Sort times, measurements, and errors of each channel by time."""
+        channel_ids = np.repeat(np.arange(len(self.n_epochs)), self.n_epochs)
+        unsorted = np.diff(self.time) < 0
+        if np.any(unsorted & (np.diff(channel_ids) == 0)):
+            inds = np.lexsort((self.time, channel_ids))
+            self.time = self.time[inds]
+            self.measurement = self.measurement[inds]
+            self.error = self.error[inds]
+
+    def sort_by(self, key, ascending=True):
+        """Collection of the time series ordered by `key`, the name of a
+        metafeature or an array with a value for each time series."""
+        if isinstance(key, str):
+            key = self.meta_features[key].values
+        order = np.argsort(np.asarray(key), kind='mergesort')
+        if not ascending:
+            order = order[::-1]
+        return self.take(order)
@@ -0,0 +1,153 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .time_series import TimeSeries, TimeSeriesCollection
+
+
+__all__ = ['SharedTimeSeriesData']
+
+
+_VALUES = ['time', 'measurement', 'error']
+# Memory-backed filesystem used for shared files where available
+SHARED_MEMORY_DIR = '/dev/shm'
+
+
+def _shared_temp_dir():
+    """Create a temporary directory, in memory if possible."""
+    if os.path.isdir(SHARED_MEMORY_DIR) and os.access(SHARED_MEMORY_DIR,
+                                                      os.W_OK):
+        return tempfile.mkdtemp(prefix='cesium-', dir=SHARED_MEMORY_DIR)
+    return tempfile.mkdtemp(prefix='cesium-')
+
+
+class SharedTimeSeriesData(object):
+    """Time series and feature values shared between processes through
+    memory-mapped files.
+
+    The time, measurement and error values of all channels of a list of time
+    series are stored as flat arrays, along with the offsets of each channel,
+    so that any process can access a single time series without copying the
+    data between processes (see `get`). Feature values computed by worker
+    processes are written to a shared (n_series, n_features, n_channels)
+    array (see `set_features`) rather than returned.
+
+    Instances only hold the location and size of the data, so they are cheap
+    to pickle; the files are removed by `close`.
+
+    Parameters
+    ----------
+    time_series : list of TimeSeries or TimeSeriesCollection
+        Time series to be shared.
+    n_features : int
+        Number of feature values per channel to be stored for each series.
+    path : str, optional
+        Directory in which to store the data; defaults to a new temporary
+        directory (on a memory-backed filesystem where available).
+    """
+    def __init__(self, time_series, n_features, path=None):
+        self.path = path if path is not None else _shared_temp_dir()
+        if not isinstance(time_series, TimeSeriesCollection):
+            time_series = TimeSeriesCollection.from_time_series(time_series)
+        self.n_series = len(time_series)
+        self.n_channels = len(time_series.channel_offsets) - 1
+        self.n_values = len(time_series.time)
+        self.features_shape = (self.n_series, n_features,
+                               max(list(time_series.n_channels) or [1]))
+        self._arrays = {}
+        self._collection = None
+
+        for key in ['series_offsets', 'channel_offsets'] + _VALUES:
+            self._open(key, 'w+')[:] = getattr(time_series, key)
+        self._open('features', 'w+')[:] = np.nan
+        self.flush()
+        self._arrays = {}
+
+    def _shape(self, key):
+        if key == 'series_offsets':
+            return (self.n_series + 1,)
+        elif key == 'channel_offsets':
+            return (self.n_channels + 1,)
+        elif key == 'features':
+            return self.features_shape
+        else:
+            return (self.n_values,)
+
+    def _open(self, key, mode='r'):
+        """Memory-mapped array `key`, cached for read-only access."""
+        if mode == 'r' and key in self._arrays:
+            return self._arrays[key]
+        dtype = 'int64' if key.endswith('offsets') else 'float64'
+        shape = self._shape(key)
+        if np.prod(shape) == 0:  # empty files cannot be mapped
+            array = np.empty(shape, dtype=dtype)
+        else:
+            array = np.memmap(os.path.join(self.path, key + '.dat'),
+                              dtype=dtype, mode=mode, shape=shape)
+        self._arrays[key] = array
+        return array
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_arrays'] = {}
+        state['_collection'] = None
+        return state
+
+    def __len__(self):
+        return self.n_series
+
+    def get(self, i, meta_features={}, name=None):
+        """Time series `i`, with values backed by the shared files.
+
+        Metadata is not stored in the shared files, and can be passed as
+        `meta_features` and `name`.
+        """
+        t, m, e = zip(*self.collection().channels(i))
+        if len(m) == 1:
+            t, m, e = t[0], m[0], e[0]
+        else:
+            t, m, e = list(t), list(m), list(e)
+        return TimeSeries(t, m, e, meta_features=meta_features, name=name)
+
+    def collection(self):
+        """`TimeSeriesCollection` backed by the shared files."""
+        if self._collection is None:
+            self._collection = TimeSeriesCollection(
+                *[self._open(key) for key in _VALUES + ['channel_offsets',
+                                                        'series_offsets']])
+        return self._collection
+
+    def set_features(self, i, values):
+        """Store the (n_features, n_channels) feature values of series `i`.
+
+        The shared array is opened for writing once; values are only
+        guaranteed to be visible to other processes after `flush`.
+        """
+        features = self._arrays.get('features')
+        if features is None or not features.flags.writeable:
+            features = self._open('features', 'r+')
+        features[i, :, :values.shape[1]] = values
+
+    def features(self):
+        """Copy of the (n_series, n_features, n_channels) feature values."""
+        return np.array(self._open('features'))
+
+    def flush(self):
+        """Write any changes of the shared arrays to their files."""
+        for array in self._arrays.values():
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    def close(self):
+        """Remove the shared files."""
+        self._arrays = {}
+        self._collection = None
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
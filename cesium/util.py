@@ -6,7 +6,8 @@ import tempfile
 import zipfile
 
 
-__all__ = ['shorten_fname', 'remove_files', 'extract_time_series']
+__all__ = ['shorten_fname', 'remove_files', 'extract_time_series',
+           'iter_archive']
 
 
 def shorten_fname(file_path):
@@ -104,3 +105,35 @@ def extract_time_series(data_path, cleanup_archive=True, cleanup_files=False,
     finally:
         if cleanup_files:
             remove_files(file_paths)
+
+
+def iter_archive(data_path):
+    """Iterate over the files of a zip- or tarfile without extracting them.
+
+    Tarfiles (including compressed ones) are read sequentially as a stream,
+    so that only one member is held in memory at a time. If the given file is
+    not a tar- or zipfile then it is treated as a single time series file.
+
+    Parameters
+    ----------
+    data_path : str
+        Path to data archive or single data file.
+
+    Yields
+    ------
+    (str, bytes)
+        Name (path within the archive) and contents of each file.
+    """
+    if tarfile.is_tarfile(data_path):
+        with tarfile.open(data_path, mode='r|*') as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, archive.extractfile(member).read()
+    elif zipfile.is_zipfile(data_path):
+        with zipfile.ZipFile(data_path) as archive:
+            for info in archive.infolist():
+                if not info.filename.endswith('/'):
+                    yield info.filename, archive.read(info)
+    else:
+        with open(data_path, 'rb') as f:
+            yield data_path, f.read()
@@ -0,0 +1,276 @@
+"""Sliding windows over the channels of a time series.
+
+The functions below compute statistics of many (possibly overlapping) windows
+of a channel at once, without slicing out each window: sums and moments are
+differences of cumulative sums, extrema are looked up in tables of running
+minima and maxima over spans of doubling length, and medians are maintained in
+a sorted buffer that is updated as values enter and leave the windows. They
+are used by `cesium.featurize.featurize_windows` in place of the corresponding
+nodes of the feature graph (see `window_statistics`).
+
+Windows are given by arrays `starts` and `ends` of positions, so that window
+`k` of a channel `x` consists of `x[starts[k]:ends[k]]`; both arrays must be
+non-decreasing, as for windows that slide forward in time.
+"""
+import bisect
+
+import numpy as np
+
+
+__all__ = ['window_starts', 'window_bounds', 'rolling_sums', 'rolling_mean',
+           'rolling_moments', 'rolling_extrema', 'rolling_median',
+           'window_statistics', 'WINDOW_STATISTICS']
+
+
+WINDOW_STATISTICS = ['n_epochs', 'total_time', 'avgt', '_moments', 'maximum',
+                     'minimum', 'amplitude', 'median', 'med_err', 'cads_avg',
+                     'cads_std', 'cads_med']
+
+
+def window_starts(times, window, stride=None, by='count'):
+    """Starts of sliding windows over the channels of a time series.
+
+    Parameters
+    ----------
+    times : list of array
+        Sorted time values of each channel.
+    window : int or float
+        Length of each window, as a number of values (if `by` is 'count') or
+        a time interval (if `by` is 'time').
+    stride : int or float, optional
+        Offset between the starts of successive windows, in the same units as
+        `window`. Defaults to `window` (non-overlapping windows).
+    by : {'count', 'time'}, optional
+        Whether windows contain a fixed number of values or cover a fixed
+        time interval. Defaults to 'count'.
+
+    Returns
+    -------
+    np.ndarray
+        Position of the first value of each window (if `by` is 'count'), for
+        every window that fits within the longest channel, or start time of
+        each window (if `by` is 'time'), from the earliest time of any channel
+        to the latest.
+    """
+    if by not in ('count', 'time'):
+        raise ValueError("Invalid window type '{}'".format(by))
+    if stride is None:
+        stride = window
+    if not window > 0 or not stride > 0:
+        raise ValueError("Window length and stride must be positive")
+    if by == 'count':
+        n_max = max([len(t) for t in times] or [0])
+        return np.arange(0, n_max - window + 1, stride)
+    times = [t for t in times if len(t) > 0]
+    if not times:
+        return np.empty(0)
+    origin = min(t[0] for t in times)
+    stop = max(t[-1] for t in times)
+    return origin + stride * np.arange(int((stop - origin) // stride) + 1)
+
+
+def window_bounds(t, starts, window, by='count'):
+    """Bounds of the windows of a channel starting at `starts` (see
+    `window_starts`), as arrays of first and (one past the) last positions.
+
+    Windows that extend past the end of a channel with fewer values than
+    others are cut short.
+    """
+    if by == 'count':
+        return (np.minimum(starts, len(t)),
+                np.minimum(starts + window, len(t)))
+    return (np.searchsorted(t, starts, side='left'),
+            np.searchsorted(t, starts + window, side='left'))
+
+
+def rolling_sums(x, starts, ends):
+    """Sum of `x` over each window, from cumulative sums.
+
+    Returns the window sums along with a bound on their rounding error, which
+    grows with the sum of absolute values up to the end of each window.
+    """
+    x = np.asarray(x, dtype='float64')
+    cumsum = np.concatenate(([0.], np.cumsum(x)))
+    abs_cumsum = np.concatenate(([0.], np.cumsum(np.abs(x))))
+    return (cumsum[ends] - cumsum[starts],
+            4 * np.finfo('float64').eps * abs_cumsum[ends])
+
+
+def rolling_mean(x, starts, ends):
+    """Mean of `x` over each window (`np.nan` for empty windows)."""
+    x = np.asarray(x, dtype='float64')
+    shift = x.mean() if len(x) > 0 else 0.
+    s1, _ = rolling_sums(x - shift, starts, ends)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return shift + s1 / (ends - starts)
+
+
+def _centered_sums(x, starts, ends, weights=None):
+    """Count (or sum of `weights`), (weighted) mean and (weighted) sums of
+    squared and cubed deviations from the mean of `x` over each window.
+
+    Values are shifted by their overall mean before accumulating. Windows
+    whose sums of squared deviations are within their rounding error of zero
+    are treated as constant, with no spread and a mean equal to their first
+    value. Cubed
+    deviations are only accumulated without weights.
+    """
+    x = np.asarray(x, dtype='float64')
+    shift = np.average(x, weights=weights) if len(x) > 0 else 0.
+    d = x - shift
+    if weights is None:
+        n = (ends - starts).astype('float64')
+        s1, err1 = rolling_sums(d, starts, ends)
+        s2, err2 = rolling_sums(d * d, starts, ends)
+        s3, _ = rolling_sums(d * d * d, starts, ends)
+    else:
+        n, _ = rolling_sums(weights, starts, ends)
+        s1, err1 = rolling_sums(weights * d, starts, ends)
+        s2, err2 = rolling_sums(weights * d * d, starts, ends)
+        s3 = np.zeros_like(s1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a = s1 / n
+        M2 = s2 - s1 * a
+        M3 = s3 - 3 * a * s2 + 2 * n * a**3
+        flat = M2 <= err2 + 2 * np.abs(a) * err1
+    mean = shift + a
+    mean[flat] = x[starts[flat]]
+    M2[flat] = 0.
+    M3[flat] = 0.
+    return n, mean, M2, M3
+
+
+def rolling_moments(x, e, starts, ends):
+    """Moments of `x` and `e` over each window, with the same keys as
+    `cesium.features.common_functions.compute_moments`.
+
+    Returns
+    -------
+    dict
+        Dictionary of arrays of moments, one value per window.
+    """
+    e = np.asarray(e, dtype='float64')
+    n, mean, M2, M3 = _centered_sums(x, starts, ends)
+    weight_sum, weighted_mean, weighted_M2, _ = _centered_sums(
+        x, starts, ends, weights=1. / (e**2))
+    _, err_mean, err_M2, _ = _centered_sums(e, starts, ends)
+    return {'n': ends - starts, 'mean': mean, 'M2': M2, 'M3': M3,
+            'weight_sum': weight_sum, 'weighted_mean': weighted_mean,
+            'weighted_M2': weighted_M2, 'err_mean': err_mean,
+            'err_M2': err_M2}
+
+
+def rolling_extrema(x, starts, ends):
+    """Minimum and maximum of `x` over each window (`np.nan` for empty
+    windows).
+
+    Running minima and maxima over spans of 1, 2, 4, ... values are built in
+    turn, and each window of length `n` is covered by two (overlapping) spans
+    of the largest length not exceeding `n`, so that the cost is
+    proportional to the length of `x` times the logarithm of the longest
+    window, regardless of the overlap between windows.
+    """
+    x = np.asarray(x, dtype='float64')
+    lengths = ends - starts
+    lo = np.full(len(starts), np.nan)
+    hi = np.full(len(starts), np.nan)
+    levels = np.where(lengths > 0, np.frexp(np.maximum(lengths, 1))[1] - 1,
+                      -1)
+    span_lo = span_hi = x
+    for level in range(levels.max() + 1 if len(levels) else 0):
+        if level > 0:
+            step = 1 << (level - 1)
+            span_lo = np.minimum(span_lo[:-step], span_lo[step:])
+            span_hi = np.maximum(span_hi[:-step], span_hi[step:])
+        selected = levels == level
+        first = starts[selected]
+        last = ends[selected] - (1 << level)
+        lo[selected] = np.minimum(span_lo[first], span_lo[last])
+        hi[selected] = np.maximum(span_hi[first], span_hi[last])
+    return lo, hi
+
+
+def rolling_median(x, starts, ends):
+    """Median of `x` over each window (`np.nan` for empty windows).
+
+    When windows overlap heavily, the values of the current window are kept
+    in a sorted buffer into which values are inserted and from which they are
+    removed as the window slides, so that each value is only handled twice;
+    otherwise each window is partitioned separately.
+    """
+    x = np.asarray(x, dtype='float64')
+    medians = np.full(len(starts), np.nan)
+    if len(starts) == 0:
+        return medians
+    n_moved = (ends[-1] - ends[0]) + (starts[-1] - starts[0])
+    if 4 * n_moved >= (ends - starts).sum():
+        for k, (s, e) in enumerate(zip(starts, ends)):
+            if e > s:
+                medians[k] = np.median(x[s:e])
+        return medians
+
+    values = x.tolist()
+    buffer = sorted(values[starts[0]:ends[0]])
+    lo, hi = starts[0], ends[0]
+    for k, (s, e) in enumerate(zip(starts, ends)):
+        if s >= hi:
+            buffer = sorted(values[s:e])
+        else:
+            for value in values[hi:e]:
+                bisect.insort(buffer, value)
+            for value in values[lo:s]:
+                del buffer[bisect.bisect_left(buffer, value)]
+        lo, hi = s, e
+        n = len(buffer)
+        if n > 0:
+            medians[k] = (buffer[(n - 1) // 2] + buffer[n // 2]) / 2.
+    return medians
+
+
+def window_statistics(keys, t, m, e, starts, ends):
+    """Values of the feature graph nodes among `keys` that are computed for
+    all windows of a channel at once (see `WINDOW_STATISTICS`).
+
+    Windows must contain at least one value.
+
+    Returns
+    -------
+    dict
+        Dictionary with node names as keys and sequences of node values (one
+        per window) as values.
+    """
+    keys = set(keys) & set(WINDOW_STATISTICS)
+    stats = {}
+    if 'n_epochs' in keys:
+        stats['n_epochs'] = ends - starts
+    if 'total_time' in keys:
+        stats['total_time'] = t[ends - 1] - t[starts]
+    if 'avgt' in keys:
+        stats['avgt'] = rolling_mean(t, starts, ends)
+    if '_moments' in keys:
+        moments = rolling_moments(m, e, starts, ends)
+        stats['_moments'] = [dict(zip(moments, values))
+                             for values in zip(*moments.values())]
+    if keys & {'maximum', 'minimum', 'amplitude'}:
+        lo, hi = rolling_extrema(m, starts, ends)
+        stats.update({'maximum': hi, 'minimum': lo,
+                      'amplitude': (hi - lo) / 2.})
+    if 'median' in keys:
+        stats['median'] = rolling_median(m, starts, ends)
+    if 'med_err' in keys:
+        stats['med_err'] = rolling_median(e, starts, ends)
+
+    # Differences between successive times within window `k` are
+    # `cads[starts[k]:ends[k] - 1]`
+    if keys & {'cads_avg', 'cads_std', 'cads_med'}:
+        cads = np.diff(t)
+        cad_ends = ends - 1
+        if 'cads_avg' in keys:
+            stats['cads_avg'] = rolling_mean(cads, starts, cad_ends)
+        if 'cads_std' in keys:
+            n, _, M2, _ = _centered_sums(cads, starts, cad_ends)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                stats['cads_std'] = np.sqrt(M2 / n)
+        if 'cads_med' in keys:
+            stats['cads_med'] = rolling_median(cads, starts, cad_ends)
+    return {key: value for key, value in stats.items() if key in keys}
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""Measure the throughput of parsing raw time series data files.
+
+The ASAS light curves of the test data are copied repeatedly into a temporary
+directory, which is then parsed with `np.loadtxt` (the previous parser),
+serially with `parse_ts_data`, and in parallel with `parse_ts_files`.
+
+Usage: benchmark_ingest.py [n_files] [n_workers]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+
+import numpy as np
+
+from cesium import data_management
+
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'cesium', 'tests',
+                         'data', 'asas_training_subset.tar.gz')
+
+
+def make_files(n_files, path):
+    with tarfile.open(DATA_PATH) as archive:
+        members = [m for m in archive.getmembers() if m.isfile()]
+        contents = [archive.extractfile(m).read() for m in members]
+    paths = []
+    for i in range(n_files):
+        paths.append(os.path.join(path, '{}.dat'.format(i)))
+        with open(paths[-1], 'wb') as f:
+            f.write(contents[i % len(contents)])
+    return paths
+
+
+def report(name, paths, elapsed):
+    size = sum(os.path.getsize(p) for p in paths) / 1e6
+    print('{:<28} {:8.1f} s {:10.0f} files/s {:8.1f} MB/s'.format(
+        name, elapsed, len(paths) / elapsed, size / elapsed))
+
+
+if __name__ == '__main__':
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    path = tempfile.mkdtemp()
+    try:
+        paths = make_files(n_files, path)
+
+        start = time.time()
+        for p in paths:
+            np.loadtxt(p, delimiter=',', ndmin=2)
+        report('np.loadtxt', paths, time.time() - start)
+
+        start = time.time()
+        for p in paths:
+            data_management.parse_ts_data(p)
+        report('parse_ts_data', paths, time.time() - start)
+
+        start = time.time()
+        data_management.parse_ts_files(paths, n_workers=n_workers)
+        report('parse_ts_files', paths, time.time() - start)
+    finally:
+        shutil.rmtree(path)